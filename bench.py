@@ -0,0 +1,1185 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""
+Benchmarks for the Bouncing Balls demo. Each benchmark is a sub-command,
+run ./bench.py --help to list them. The benchmarks run headless using
+SDL's dummy video and audio drivers.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+MAIN_DIR = os.path.split(os.path.abspath(__file__))[0]
+
+HEADLESS_ENV = dict(
+    os.environ,
+    SDL_VIDEODRIVER="dummy",
+    SDL_AUDIODRIVER="dummy",
+    PYGAME_HIDE_SUPPORT_PROMPT="1",
+)
+
+# Starts the demo and exits as soon as the first frame is on the screen.
+# The soundtrack is not in the repository so the music is not played.
+FIRST_FRAME = """
+import os
+import pygame
+from game import game
+pygame.mixer.music.load = lambda *args: None
+pygame.mixer.music.play = lambda *args: None
+display_update = pygame.display.update
+def update(*args):
+    display_update(*args)
+    os._exit(0)
+pygame.display.update = update
+demo = game.BounceDemo(5)
+demo.build_scene_graph()
+demo.run()
+"""
+
+
+def headless_scene(num_balls, size=(800, 600), **options):
+    """Return a started BouncingBallsScene drawing to a headless window.
+    The rewind history is off unless it is asked for."""
+    # pylint: disable-next=import-outside-toplevel
+    import pygame
+    # pylint: disable-next=import-outside-toplevel
+    from game.options import SceneOptions
+    # pylint: disable-next=import-outside-toplevel
+    from game.scene import BouncingBallsScene
+
+    pygame.display.init()
+    screen = pygame.display.set_mode(size)
+    options.setdefault("rewind_memory", 0)
+    scene = BouncingBallsScene(
+        num_balls, screen, (0, 0, 0), 60, options=SceneOptions(**options)
+    )
+    scene.start_scene()
+    return scene
+
+
+def quiet(scene):
+    """Turn the explosions and sound effects of a scene off. Explosions
+    are sprites that only expire when they are drawn, and the mixer's
+    thread does not survive tracemalloc stopping."""
+    # pylint: disable-next=import-outside-toplevel
+    import pygame
+
+    for key in (pygame.K_e, pygame.K_s):
+        scene.process_event(pygame.event.Event(pygame.KEYDOWN, key=key))
+
+
+def import_times(module):
+    """Import module in a fresh interpreter with -X importtime and return
+    a list of (cumulative microseconds, self microseconds, name)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=MAIN_DIR,
+        env=HEADLESS_ENV,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        (self_us, cumulative_us, name) = line[len("import time:"):].split("|")
+        times.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return times
+
+
+def bench_startup(args):
+    """Report import times and the time it takes to show the first frame."""
+    times = import_times("game.game")
+    slowest = sorted(times, reverse=True)[: args.top]
+    own = [entry for entry in times if entry[2].strip().startswith("game")]
+    for (title, entries) in (
+        (f"Slowest {args.top} imports of game.game", slowest),
+        ("Imports of the game package", own),
+    ):
+        print(f"{title} (cumulative, self):")
+        for (cumulative_us, self_us, name) in entries:
+            cumulative = f"{cumulative_us / 1e3:9.1f} ms"
+            print(cumulative, f"{self_us / 1e3:9.1f} ms", name)
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", FIRST_FRAME],
+            cwd=MAIN_DIR,
+            env=HEADLESS_ENV,
+            stdout=subprocess.DEVNULL,
+            check=False,
+        )
+        samples.append(time.perf_counter() - start)
+    print(
+        f"Time to first frame: median {statistics.median(samples) * 1000:.1f}"
+        f" ms, best {min(samples) * 1000:.1f} ms over {args.repeat} runs"
+    )
+
+
+def bench_allocations(args):
+    """Trace the memory update_scene allocates per frame as N grows."""
+    print(" balls  peak bytes/frame  bytes kept/frame")
+    peaks = []
+    for num_balls in args.balls:
+        scene = headless_scene(num_balls)
+        quiet(scene)
+        for _ in range(10):
+            scene.update_scene()
+        tracemalloc.start()
+        worst_peak = 0
+        (start, _) = tracemalloc.get_traced_memory()
+        for _ in range(args.frames):
+            (current, _) = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            scene.update_scene()
+            worst_peak = max(
+                worst_peak, tracemalloc.get_traced_memory()[1] - current
+            )
+        (end, _) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        kept = (end - start) / args.frames
+        print(f"{num_balls:6} {worst_peak:17} {kept:17.1f}")
+        peaks.append(worst_peak)
+    if args.check and max(peaks) > min(peaks) + args.slack:
+        sys.exit("The memory allocated per frame grows with the ball count.")
+
+
+def bench_engines(args):
+    """Compare the stepping and event driven engines frame by frame and
+    fast forwarding."""
+    print(" balls  engine  ms/frame  events/frame  fast forward ms")
+    for num_balls in args.balls:
+        for engine in ("step", "event"):
+            scene = headless_scene(num_balls, engine=engine)
+            quiet(scene)
+            # Let most of the balls die first, as they do when playing.
+            scene.fast_forward(args.warmup)
+            start = time.perf_counter()
+            for _ in range(args.frames):
+                scene.update_scene()
+            per_frame = (time.perf_counter() - start) * 1000 / args.frames
+            events = 0.0
+            if scene._event_engine:
+                events = scene._event_engine.events / (
+                    args.warmup + args.frames
+                )
+            start = time.perf_counter()
+            scene.fast_forward(args.fast_forward)
+            jump = (time.perf_counter() - start) * 1000
+            print(
+                f"{num_balls:6} {engine:>7} {per_frame:9.3f}"
+                f" {events:13.2f} {jump:16.1f}"
+            )
+
+
+def bench_neighbors(args):
+    """Time the stepping engine with and without neighbor lists."""
+    print(" balls  list          ms/frame  rebuilds  pairs/frame  skin px")
+    runs = [("all pairs", None, False)]
+    runs += [(f"skin {skin:g}", skin, False) for skin in args.skins]
+    runs += [("tuned", args.skins[0], True)]
+    for num_balls in args.balls:
+        for (title, skin, tune) in runs:
+            scene = headless_scene(
+                num_balls, neighbor_skin=skin, tune_skin=tune
+            )
+            quiet(scene)
+            start = time.perf_counter()
+            for _ in range(args.frames):
+                scene.update_scene()
+            per_frame = (time.perf_counter() - start) * 1000 / args.frames
+            line = f"{num_balls:6}  {title:12} {per_frame:9.3f}"
+            neighbors = scene._neighbor_list
+            if neighbors:
+                line += (
+                    f" {neighbors.rebuild_rate:9.1%}"
+                    f" {neighbors.mean_pairs:12.1f} {neighbors.skin:8.1f}"
+                )
+            print(line)
+
+
+def mixed_balls(count, size, radii, rng):
+    """Return count balls scattered over size without overlapping, with
+    radii spread evenly on a log scale between the two radii, so most are
+    small and a few are huge."""
+    # pylint: disable-next=import-outside-toplevel
+    from game.ball import Ball
+
+    (width, height) = size
+    (low, high) = radii
+    balls = []
+    while len(balls) < count:
+        radius = low * (high / low) ** rng.random()
+        x = rng.uniform(radius, width - radius)
+        y = rng.uniform(radius, height - radius)
+        if not any(
+            ball.too_close(x, y, radius + ball.radius) for ball in balls
+        ):
+            balls.append(Ball(len(balls), x, y, False, radius))
+    return balls
+
+
+def bench_quadtree(args):
+    """Time the stepping engine finding nearby balls in the loose quadtree
+    against checking every pair, for balls of widely mixed radii."""
+    # pylint: disable-next=import-outside-toplevel
+    import random
+
+    print(" balls  all pairs ms/frame  quadtree ms/frame  same result")
+    size = tuple(args.size)
+    for count in args.balls:
+        results = []
+        for quadtree in (False, True):
+            scene = headless_scene(3, size, quadtree=quadtree)
+            quiet(scene)
+            # Each ball draws its velocity and color from random.
+            random.seed(count)
+            scene._balls = mixed_balls(
+                count, size, args.radii, random.Random(count)
+            )
+            start = time.perf_counter()
+            for _ in range(args.frames):
+                scene.update_scene()
+            elapsed = (time.perf_counter() - start) * 1000 / args.frames
+            state = [tuple(ball.center) for ball in scene._balls]
+            results.append((elapsed, state))
+        ((every, every_state), (tree, tree_state)) = results
+        print(
+            f"{count:6} {every:19.2f} {tree:18.2f}"
+            f" {'yes' if every_state == tree_state else 'no':>12}"
+        )
+
+
+def bench_walls(args):
+    """Time the boundary stage against moving and reflecting the balls
+    one by one."""
+    # pylint: disable-next=import-outside-toplevel
+    import random
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.ball import Ball
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.walls import BoundaryStage
+
+    # The balls need the mixer for their sounds.
+    headless_scene(3)
+    bounds = (0, 800, 0, 600)
+    print(" balls  one by one ms  boundary stage ms  same result")
+    for count in args.balls:
+        results = []
+        for staged in (False, True):
+            random.seed(count)
+            balls = [
+                Ball(name, random.uniform(0, 800), random.uniform(0, 600))
+                for name in range(count)
+            ]
+            for ball in balls:
+                ball.toggle_sound()
+            stage = BoundaryStage(bounds)
+            elapsed = 0.0
+            for _ in range(args.frames):
+                start = time.perf_counter()
+                if staged:
+                    # The stage moves the balls itself.
+                    stage.apply(balls)
+                else:
+                    for ball in balls:
+                        ball.update()
+                        ball.wall_reflect(*bounds)
+                elapsed += time.perf_counter() - start
+            state = [(*ball.center, *ball.velocity) for ball in balls]
+            results.append((elapsed * 1000 / args.frames, state))
+        ((single, single_state), (staged, staged_state)) = results
+        same = "yes" if single_state == staged_state else "no"
+        print(f"{count:6} {single:14.3f} {staged:18.3f} {same:>12}")
+
+
+def bench_churn(args):
+    """Spawn and remove balls every frame and report how even the frame
+    times stay."""
+    # pylint: disable-next=import-outside-toplevel
+    import random
+
+    rng = random.Random(args.balls)
+    print("rewind  spawned/s  median ms  99th ms  worst ms  store ops us")
+    for rewind_mb in (0, args.rewind_mb):
+        scene = headless_scene(3, rewind_memory=int(rewind_mb * 2**20))
+        quiet(scene)
+        handles = [
+            scene.spawn_ball(rng.uniform(0, 800), rng.uniform(0, 600))
+            for _ in range(args.balls)
+        ]
+        (frames, store_time) = ([], 0.0)
+        for _ in range(args.frames):
+            start = time.perf_counter()
+            for _ in range(args.per_frame):
+                victim = handles.pop(rng.randrange(len(handles)))
+                scene.despawn_ball(victim)
+                handles.append(
+                    scene.spawn_ball(rng.uniform(0, 800), rng.uniform(0, 600))
+                )
+            store_time += time.perf_counter() - start
+            scene.update_scene()
+            frames.append(time.perf_counter() - start)
+        frames.sort()
+        per_op = store_time * 1e6 / (args.frames * args.per_frame * 2)
+        print(
+            f"{rewind_mb:4g}MB {args.per_frame * 60:10}"
+            f" {statistics.median(frames) * 1000:10.2f}"
+            f" {frames[int(len(frames) * 0.99)] * 1000:8.2f}"
+            f" {frames[-1] * 1000:9.2f} {per_op:13.1f}"
+        )
+
+
+def bench_labels(args):
+    """Time drawing the balls with their names off, drawn from the glyph
+    atlas and drawn from a surface rendered for each ball."""
+    # pylint: disable-next=import-outside-toplevel
+    import random
+
+    # pylint: disable-next=import-outside-toplevel
+    import pygame
+
+    # pylint: disable-next=import-outside-toplevel
+    from game import rgbcolors
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.ball import Ball
+
+    print(" balls  labels  draw ms  label memory KB")
+    for count in args.balls:
+        random.seed(count)
+        scene = headless_scene(0)
+        quiet(scene)
+        for _ in range(count):
+            scene.spawn_ball(random.uniform(0, 800), random.uniform(0, 600))
+        screen = scene._screen
+        font = pygame.font.SysFont(None, Ball.default_radius)
+        texts = None
+        for labels in ("off", "atlas", "per ball"):
+            if labels == "per ball":
+                texts = [
+                    font.render(str(ball.name), True, rgbcolors.black)
+                    for ball in scene._balls
+                ]
+                surfaces = texts
+            elif labels == "atlas":
+                scene.process_event(
+                    pygame.event.Event(pygame.KEYDOWN, key=pygame.K_a)
+                )
+                scene.draw()
+                surfaces = [scene._labels._glyphs["0"].get_parent()]
+            else:
+                surfaces = []
+            memory = sum(
+                surface.get_bytesize() * surface.get_width()
+                * surface.get_height()
+                for surface in surfaces
+            )
+            start = time.perf_counter()
+            for _ in range(args.frames):
+                if texts is None:
+                    scene.draw()
+                    continue
+                # The way the balls used to draw their own names.
+                scene.process_event(
+                    pygame.event.Event(pygame.KEYDOWN, key=pygame.K_a)
+                )
+                scene.draw()
+                scene.process_event(
+                    pygame.event.Event(pygame.KEYDOWN, key=pygame.K_a)
+                )
+                for (ball, text) in zip(scene._balls, texts):
+                    screen.blit(text, text.get_rect(center=ball.center))
+            elapsed = (time.perf_counter() - start) * 1000 / args.frames
+            memory /= 1024
+            print(f"{count:6} {labels:>8} {elapsed:8.2f} {memory:16.1f}")
+
+
+def bench_lod(args):
+    """Time drawing many small balls as circles against drawing them with
+    the level of detail each one's size calls for."""
+    # pylint: disable-next=import-outside-toplevel
+    import random
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.ball import Ball
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.lod import LevelOfDetail
+
+    scene = headless_scene(0)
+    screen = scene._screen
+    print("  balls  circles ms  levels ms  circles/points")
+    for count in args.balls:
+        random.seed(count)
+        balls = [
+            Ball(
+                name,
+                random.uniform(0, 800),
+                random.uniform(0, 600),
+                False,
+                0.5 * (args.largest / 0.5) ** random.random(),
+            )
+            for name in range(count)
+        ]
+        detail = LevelOfDetail()
+        times = []
+        for leveled in (False, True):
+            start = time.perf_counter()
+            for _ in range(args.frames):
+                if leveled:
+                    detail.draw(screen, balls)
+                else:
+                    for ball in balls:
+                        ball.draw(screen)
+            times.append((time.perf_counter() - start) * 1000 / args.frames)
+        levels = "/".join(str(level) for level in detail.counts)
+        print(f"{count:7} {times[0]:11.2f} {times[1]:10.2f}  {levels}")
+    # More of the balls become points while drawing them does not fit in
+    # the budget.
+    detail = LevelOfDetail(args.budget_ms / 1000)
+    for frame in range(args.frames):
+        start = time.perf_counter()
+        detail.draw(screen, balls)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"frame {frame:3}: {elapsed:7.2f} ms, {detail}")
+
+
+def bench_stamp(args):
+    """Time drawing small balls with pygame.draw.circle, with blits of
+    cached sprites and by stamping circle masks into the pixels, and the
+    stamping alone, from arrays gathered up front."""
+    # pylint: disable-next=import-outside-toplevel
+    import random
+
+    # pylint: disable-next=import-outside-toplevel
+    import pygame
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.ball import Ball
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.lod import centers, map_colors, packed_colors, radii
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.stamp import StampRenderer
+
+    scene = headless_scene(0)
+    screen = scene._screen
+    print(
+        "   balls  draw.circle ms  cached blits ms  stamped ms"
+        "  stamping only ms"
+    )
+    (smallest, largest) = args.radii
+    for count in args.balls:
+        random.seed(count)
+        balls = [
+            Ball(
+                name,
+                random.uniform(0, 800),
+                random.uniform(0, 600),
+                False,
+                smallest * (largest / smallest) ** random.random(),
+            )
+            for name in range(count)
+        ]
+        # A sprite for each color and whole pixel radius, made up front.
+        sprites = {}
+        for ball in balls:
+            radius = max(1, round(ball.radius))
+            key = (int(ball.color), radius)
+            if key not in sprites:
+                sprite = pygame.Surface((2 * radius + 1, 2 * radius + 1))
+                sprite.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+                pygame.draw.circle(
+                    sprite, ball.color, (radius, radius), radius
+                )
+                sprites[key] = sprite
+
+        def cached_blits():
+            sequence = []
+            for ball in balls:
+                radius = max(1, round(ball.radius))
+                (x, y) = ball.center
+                sequence.append(
+                    (
+                        sprites[(int(ball.color), radius)],
+                        (x - radius, y - radius),
+                    )
+                )
+            screen.blits(sequence, False)
+
+        def circles():
+            for ball in balls:
+                ball.draw(screen)
+
+        stamper = StampRenderer(max(args.radii))
+        gathered = (
+            centers(balls),
+            radii(balls),
+            map_colors(screen, packed_colors(balls)),
+        )
+        times = []
+        for draw in (
+            circles,
+            cached_blits,
+            lambda: stamper.draw(screen, balls),
+            lambda: stamper.stamp(screen, *gathered),
+        ):
+            draw()
+            start = time.perf_counter()
+            for _ in range(args.frames):
+                draw()
+            times.append((time.perf_counter() - start) * 1000 / args.frames)
+        print(
+            f"{count:8} {times[0]:15.2f} {times[1]:16.2f} {times[2]:11.2f}"
+            f" {times[3]:17.2f}"
+        )
+
+
+def bench_tiles(args):
+    """Time drawing the balls in tiles on 1 to n threads against drawing
+    them straight onto the screen."""
+    # pylint: disable-next=import-outside-toplevel
+    import random
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.ball import Ball
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.lod import LevelOfDetail
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.tiles import TileRenderer
+
+    scene = headless_scene(0)
+    screen = scene._screen
+    random.seed(args.balls)
+    (smallest, largest) = args.radii
+    balls = [
+        Ball(
+            name,
+            random.uniform(0, 800),
+            random.uniform(0, 600),
+            False,
+            smallest * (largest / smallest) ** random.random(),
+        )
+        for name in range(args.balls)
+    ]
+
+    def frame_ms(renderer):
+        renderer.draw(screen, balls)
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            renderer.draw(screen, balls)
+        return (time.perf_counter() - start) * 1000 / args.frames
+
+    print(f"{os.cpu_count()} cores, {args.balls} balls")
+    print(f"untiled: {frame_ms(LevelOfDetail()):.2f} ms")
+    print("threads  tiled ms  speedup")
+    single = None
+    for workers in args.threads:
+        renderer = TileRenderer(screen.get_size(), args.grid, workers)
+        elapsed = frame_ms(renderer)
+        renderer.close()
+        single = single or elapsed
+        print(f"{workers:7} {elapsed:9.2f} {single / elapsed:8.2f}")
+
+
+def bench_scale(args):
+    """Time drawing the frame at lower render scales, and the scale a
+    dynamic resolution settles on for a budget."""
+    # pylint: disable-next=import-outside-toplevel
+    import random
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.ball import Ball
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.resolution import RenderScale
+
+    scene = headless_scene(0)
+    random.seed(args.balls)
+    (smallest, largest) = args.radii
+    scene._balls = [
+        Ball(
+            name,
+            random.uniform(0, 800),
+            random.uniform(0, 600),
+            False,
+            smallest * (largest / smallest) ** random.random(),
+        )
+        for name in range(args.balls)
+    ]
+
+    def frame_ms():
+        scene.draw()
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            scene.draw()
+        return (time.perf_counter() - start) * 1000 / args.frames
+
+    print(f"{args.balls} balls")
+    print("scale  ms/frame")
+    for scale in args.scales:
+        scene._resolution = None if scale == 1 else RenderScale(scale)
+        print(f"{scale:5.2f} {frame_ms():9.2f}")
+    budget = args.budget / 1000
+    scene._resolution = RenderScale(1.0, budget)
+    for _ in range(args.frames):
+        scene._frame_start = time.perf_counter()
+        scene.draw()
+    print(f"a {args.budget:g} ms budget settles at {scene._resolution}")
+
+
+def bench_palette(args):
+    """Time drawing frames into 32 bit pixels against 8 bit pixels that
+    index the palette."""
+    # pylint: disable-next=import-outside-toplevel
+    import random
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.ball import Ball
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.palette import PALETTE
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.resolution import RenderScale
+
+    print("balls  stamp  32 bit ms  8 bit ms")
+    for count in args.balls:
+        scene = headless_scene(0)
+        random.seed(count)
+        (smallest, largest) = args.radii
+        scene._balls = [
+            Ball(
+                name,
+                random.uniform(0, 800),
+                random.uniform(0, 600),
+                False,
+                smallest * (largest / smallest) ** random.random(),
+            )
+            for name in range(count)
+        ]
+        for stamp in (False, True):
+            scene._stamp = stamp
+            scene._renderer = None
+            times = []
+            for palette in (None, PALETTE):
+                scene._resolution = None
+                if palette:
+                    scene._resolution = RenderScale(palette=palette)
+                scene.draw()
+                start = time.perf_counter()
+                for _ in range(args.frames):
+                    scene.draw()
+                times.append(
+                    (time.perf_counter() - start) * 1000 / args.frames
+                )
+            print(f"{count:5} {stamp!s:>6} {times[0]:10.2f} {times[1]:9.2f}")
+
+
+def bench_camera(args):
+    """Time drawing the camera's view of worlds of growing size with the
+    same density of balls, culled through the quadtree, culled with NumPy
+    and not culled at all."""
+    # pylint: disable-next=import-outside-toplevel
+    import random
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.ball import Ball
+
+    print("world      balls  in view  quadtree ms  numpy ms  everything ms")
+    for multiple in args.multiples:
+        size = (800 * multiple, 600 * multiple)
+        scene = headless_scene(0, world_size=size, quadtree=True)
+        random.seed(multiple)
+        balls = scene._balls = [
+            Ball(
+                name,
+                random.uniform(0, size[0]),
+                random.uniform(0, size[1]),
+                False,
+                random.uniform(2, 12),
+            )
+            for name in range(args.density * multiple * multiple)
+        ]
+        scene._quadtree.rebuild(balls)
+        camera = scene._camera
+
+        def frame_ms(cull):
+            scene._visible_balls = cull
+            scene.draw()
+            start = time.perf_counter()
+            for _ in range(args.frames):
+                scene.draw()
+            return (time.perf_counter() - start) * 1000 / args.frames
+
+        scene._quadtree_balls = balls
+        in_view = len(scene._visible_balls())
+        times = [
+            frame_ms(lambda: camera.cull(balls, scene._quadtree)),
+            frame_ms(lambda: camera.cull(balls)),
+            frame_ms(lambda: balls),
+        ]
+        print(
+            f"{size[0]:5}x{size[1]:<5} {len(balls):6} {in_view:8}"
+            f" {times[0]:12.2f} {times[1]:9.2f} {times[2]:14.2f}"
+        )
+
+
+def bench_trails(args):
+    """Time drawing frames with and without trails, for more balls and
+    longer trails."""
+    # pylint: disable-next=import-outside-toplevel
+    import random
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.ball import Ball
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.trails import Trails
+
+    print("balls   fade  plain ms  trails ms  difference")
+    for count in args.balls:
+        scene = headless_scene(0)
+        random.seed(count)
+        scene._balls = [
+            Ball(
+                name,
+                random.uniform(0, 800),
+                random.uniform(0, 600),
+                False,
+                random.uniform(2, 12),
+            )
+            for name in range(count)
+        ]
+        for fade in args.fades:
+            times = []
+            for trails in (None, Trails(fade)):
+                scene._trails = trails
+                scene.draw()
+                start = time.perf_counter()
+                for _ in range(args.frames):
+                    scene.draw()
+                times.append(
+                    (time.perf_counter() - start) * 1000 / args.frames
+                )
+            print(
+                f"{count:5} {fade:6.2f} {times[0]:9.2f} {times[1]:10.2f}"
+                f" {times[1] - times[0]:11.2f}"
+            )
+
+
+def bench_heatmap(args):
+    """Time counting the balls into the heatmap each step against
+    gathering their centers alone, and drawing the overlay."""
+    # pylint: disable-next=import-outside-toplevel
+    import random
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.ball import Ball
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.heatmap import Heatmap
+
+    # pylint: disable-next=import-outside-toplevel
+    from game.lod import centers
+
+    scene = headless_scene(0)
+    print("balls  contacts  centers ms  add ms  overlay ms")
+    for count in args.balls:
+        random.seed(count)
+        balls = [
+            Ball(
+                name,
+                random.uniform(0, 800),
+                random.uniform(0, 600),
+                False,
+                random.uniform(2, 12),
+            )
+            for name in range(count)
+        ]
+        # About as many collisions a step as the balls touching.
+        pairs = [
+            (random.choice(balls), random.choice(balls))
+            for _ in range(count // 20)
+        ]
+        heatmap = Heatmap((800, 600), args.cell)
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            centers(balls)
+        gather = (time.perf_counter() - start) * 1000 / args.frames
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            for (ball, other_ball) in pairs:
+                heatmap.touched(ball, other_ball)
+            heatmap.add(balls)
+        add = (time.perf_counter() - start) * 1000 / args.frames
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            heatmap.draw(scene._screen)
+        overlay = (time.perf_counter() - start) * 1000 / args.frames
+        print(
+            f"{count:6} {len(pairs):9} {gather:11.2f} {add:7.2f}"
+            f" {overlay:11.2f}"
+        )
+
+
+def bench_static(args):
+    """Time drawing the background, obstacles and border from the layer
+    drawn once against drawing them every frame."""
+    # pylint: disable-next=import-outside-toplevel
+    import random
+
+    rng = random.Random(386)
+    print("obstacles  cached ms  every frame ms")
+    for count in args.obstacles:
+        scene = headless_scene(0)
+        scene.set_obstacles(random_obstacles(count, (800, 600), rng))
+        scene.draw()
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            scene.draw()
+        cached = (time.perf_counter() - start) * 1000 / args.frames
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            scene._static_layer = None
+            scene.draw()
+        every = (time.perf_counter() - start) * 1000 / args.frames
+        print(f"{count:9} {cached:10.3f} {every:15.3f}")
+
+
+def random_obstacles(count, size, rng):
+    """Return count small segments and circles scattered over size."""
+    # pylint: disable-next=import-outside-toplevel
+    from game.obstacles import CircleObstacle, Segment
+
+    (width, height) = size
+    obstacles = []
+    for i in range(count):
+        (x, y) = (rng.uniform(0, width), rng.uniform(0, height))
+        if i % 2:
+            obstacles.append(CircleObstacle(x, y, rng.uniform(1, 4)))
+        else:
+            (dx, dy) = (rng.uniform(-8, 8), rng.uniform(-8, 8))
+            obstacles.append(Segment(x, y, x + dx, y + dy))
+    return obstacles
+
+
+def bench_obstacles(args):
+    """Time the frames and the obstacle queries as obstacles are added,
+    against testing every obstacle against every ball."""
+    # pylint: disable-next=import-outside-toplevel
+    import random
+
+    rng = random.Random(386)
+    print("obstacles  depth  ms/frame  tree query ms  every obstacle ms")
+    for count in args.obstacles:
+        scene = headless_scene(args.balls)
+        quiet(scene)
+        scene.set_obstacles(random_obstacles(count, (800, 600), rng))
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            scene.update_scene()
+        per_frame = (time.perf_counter() - start) * 1000 / args.frames
+        tree = scene._obstacles
+        boxes = []
+        for ball in scene._balls:
+            ((x, y), radius) = (ball.center, ball.radius)
+            boxes.append((x - radius, y - radius, x + radius, y + radius))
+        start = time.perf_counter()
+        for box in boxes:
+            tree.query(*box)
+        query = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for ball in scene._balls:
+            for obstacle in tree.obstacles:
+                obstacle.contact(*ball.center, ball.radius)
+        every = (time.perf_counter() - start) * 1000
+        print(
+            f"{count:9} {tree.depth:6} {per_frame:9.3f} {query:14.3f}"
+            f" {every:18.3f}"
+        )
+
+
+def worst_overlaps(scene):
+    """Return how far the deepest ball is past a wall and into another
+    ball, in pixels."""
+    (width, height) = scene._screen.get_size()
+    balls = scene._balls
+    (wall, overlap) = (0.0, 0.0)
+    for (i, ball) in enumerate(balls):
+        (x, y) = ball.center
+        radius = ball.radius
+        wall = max(wall, radius - x, x + radius - width)
+        wall = max(wall, radius - y, y + radius - height)
+        for other_ball in balls[i + 1:]:
+            reach = radius + other_ball.radius
+            overlap = max(
+                overlap, reach - ball.center.distance_to(other_ball.center)
+            )
+    return (wall, overlap)
+
+
+def bench_tunneling(args):
+    """Run the swept engine at falling physics rates and report its cost
+    and how deep balls end up in walls and each other."""
+    print("engine      Hz  ms/second  worst wall px  worst overlap px")
+    runs = [("step", 60)] + [("swept", rate) for rate in args.rates]
+    for (engine, rate) in runs:
+        scene = headless_scene(
+            args.balls, engine=engine, physics_step=60 / rate
+        )
+        quiet(scene)
+        for ball in scene._balls:
+            ball.velocity.scale_to_length(ball.velocity.length() * args.speed)
+        (wall, overlap, elapsed) = (0.0, 0.0, 0.0)
+        for _ in range(args.seconds * 60):
+            start = time.perf_counter()
+            scene.update_scene()
+            elapsed += time.perf_counter() - start
+            (frame_wall, frame_overlap) = worst_overlaps(scene)
+            wall = max(wall, frame_wall)
+            overlap = max(overlap, frame_overlap)
+        print(
+            f"{engine:>6} {rate:7g} {elapsed * 1000 / args.seconds:10.2f}"
+            f" {wall:14.2f} {overlap:17.2f}"
+        )
+
+
+def main():
+    """Parse the command line and run the chosen benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    startup = commands.add_parser("startup", help=bench_startup.__doc__)
+    startup.add_argument("--top", type=int, default=15)
+    startup.add_argument("--repeat", type=int, default=10)
+    startup.set_defaults(run=bench_startup)
+    allocations = commands.add_parser(
+        "allocations", help=bench_allocations.__doc__
+    )
+    allocations.add_argument(
+        "--balls", type=int, nargs="+", default=[10, 20, 40, 80]
+    )
+    allocations.add_argument("--frames", type=int, default=200)
+    allocations.add_argument(
+        "--check",
+        action="store_true",
+        help="fail if the peak grows by more than --slack bytes with N",
+    )
+    allocations.add_argument("--slack", type=int, default=1024)
+    allocations.set_defaults(run=bench_allocations)
+    engines = commands.add_parser("engines", help=bench_engines.__doc__)
+    engines.add_argument(
+        "--balls", type=int, nargs="+", default=[10, 20, 40, 80]
+    )
+    engines.add_argument("--frames", type=int, default=300)
+    engines.add_argument("--warmup", type=int, default=600)
+    engines.add_argument(
+        "--fast-forward",
+        type=int,
+        default=3600,
+        help="frames to skip in one go",
+    )
+    engines.set_defaults(run=bench_engines)
+    neighbors = commands.add_parser("neighbors", help=bench_neighbors.__doc__)
+    neighbors.add_argument(
+        "--balls", type=int, nargs="+", default=[10, 20, 40, 80]
+    )
+    neighbors.add_argument("--frames", type=int, default=1000)
+    neighbors.add_argument(
+        "--skins", type=float, nargs="+", default=[10, 20, 40]
+    )
+    neighbors.set_defaults(run=bench_neighbors)
+    obstacles = commands.add_parser("obstacles", help=bench_obstacles.__doc__)
+    obstacles.add_argument("--balls", type=int, default=40)
+    obstacles.add_argument("--frames", type=int, default=300)
+    obstacles.add_argument(
+        "--obstacles", type=int, nargs="+", default=[0, 10, 100, 1000, 10000]
+    )
+    obstacles.set_defaults(run=bench_obstacles)
+    quadtree = commands.add_parser("quadtree", help=bench_quadtree.__doc__)
+    quadtree.add_argument(
+        "--balls", type=int, nargs="+", default=[100, 200, 400, 800]
+    )
+    quadtree.add_argument("--frames", type=int, default=50)
+    quadtree.add_argument(
+        "--radii", type=float, nargs=2, default=[2, 200], metavar="PX"
+    )
+    quadtree.add_argument(
+        "--size", type=int, nargs=2, default=[6400, 4800], metavar="PX"
+    )
+    quadtree.set_defaults(run=bench_quadtree)
+    walls = commands.add_parser("walls", help=bench_walls.__doc__)
+    walls.add_argument(
+        "--balls", type=int, nargs="+", default=[10, 100, 1000, 10000]
+    )
+    walls.add_argument("--frames", type=int, default=200)
+    walls.set_defaults(run=bench_walls)
+    churn = commands.add_parser("churn", help=bench_churn.__doc__)
+    churn.add_argument("--balls", type=int, default=200)
+    churn.add_argument("--frames", type=int, default=300)
+    churn.add_argument(
+        "--per-frame",
+        type=int,
+        default=50,
+        help="balls removed and spawned each frame",
+    )
+    churn.add_argument("--rewind-mb", type=float, default=16)
+    churn.set_defaults(run=bench_churn)
+    labels = commands.add_parser("labels", help=bench_labels.__doc__)
+    labels.add_argument(
+        "--balls", type=int, nargs="+", default=[1000, 10000]
+    )
+    labels.add_argument("--frames", type=int, default=30)
+    labels.set_defaults(run=bench_labels)
+    lod = commands.add_parser("lod", help=bench_lod.__doc__)
+    lod.add_argument("--balls", type=int, nargs="+", default=[10000, 50000])
+    lod.add_argument("--frames", type=int, default=10)
+    lod.add_argument(
+        "--largest", type=float, default=12, help="largest radius"
+    )
+    lod.add_argument(
+        "--budget-ms",
+        type=float,
+        default=8,
+        help="drawing budget for the most balls",
+    )
+    lod.set_defaults(run=bench_lod)
+    stamp = commands.add_parser("stamp", help=bench_stamp.__doc__)
+    stamp.add_argument(
+        "--balls", type=int, nargs="+", default=[10000, 50000, 100000]
+    )
+    stamp.add_argument("--frames", type=int, default=5)
+    stamp.add_argument(
+        "--radii",
+        type=float,
+        nargs=2,
+        default=[0.5, 4],
+        help="smallest and largest radius",
+    )
+    stamp.set_defaults(run=bench_stamp)
+    tiles = commands.add_parser("tiles", help=bench_tiles.__doc__)
+    tiles.add_argument("--balls", type=int, default=20000)
+    tiles.add_argument("--frames", type=int, default=10)
+    tiles.add_argument(
+        "--radii",
+        type=float,
+        nargs=2,
+        default=[2, 25],
+        help="smallest and largest radius",
+    )
+    tiles.add_argument(
+        "--grid",
+        type=int,
+        nargs=2,
+        default=[4, 4],
+        metavar=("COLUMNS", "ROWS"),
+    )
+    tiles.add_argument(
+        "--threads", type=int, nargs="+", default=[1, 2, 4, 8]
+    )
+    tiles.set_defaults(run=bench_tiles)
+    scale = commands.add_parser("scale", help=bench_scale.__doc__)
+    scale.add_argument("--balls", type=int, default=2000)
+    scale.add_argument("--frames", type=int, default=30)
+    scale.add_argument(
+        "--radii",
+        type=float,
+        nargs=2,
+        default=[10, 60],
+        help="smallest and largest radius",
+    )
+    scale.add_argument(
+        "--scales", type=float, nargs="+", default=[1, 0.75, 0.5, 0.25]
+    )
+    scale.add_argument(
+        "--budget", type=float, default=4, help="milliseconds a frame"
+    )
+    scale.set_defaults(run=bench_scale)
+    palette = commands.add_parser("palette", help=bench_palette.__doc__)
+    palette.add_argument(
+        "--balls", type=int, nargs="+", default=[0, 1000, 10000]
+    )
+    palette.add_argument("--frames", type=int, default=20)
+    palette.add_argument(
+        "--radii",
+        type=float,
+        nargs=2,
+        default=[1, 20],
+        help="smallest and largest radius",
+    )
+    palette.set_defaults(run=bench_palette)
+    camera = commands.add_parser("camera", help=bench_camera.__doc__)
+    camera.add_argument(
+        "--multiples",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8],
+        help="world sizes, in screens across",
+    )
+    camera.add_argument(
+        "--density", type=int, default=500, help="balls per screen"
+    )
+    camera.add_argument("--frames", type=int, default=20)
+    camera.set_defaults(run=bench_camera)
+    trails = commands.add_parser("trails", help=bench_trails.__doc__)
+    trails.add_argument(
+        "--balls", type=int, nargs="+", default=[100, 1000, 5000]
+    )
+    trails.add_argument(
+        "--fades", type=float, nargs="+", default=[0.5, 0.9, 0.99]
+    )
+    trails.add_argument("--frames", type=int, default=20)
+    trails.set_defaults(run=bench_trails)
+    heatmap = commands.add_parser("heatmap", help=bench_heatmap.__doc__)
+    heatmap.add_argument(
+        "--balls", type=int, nargs="+", default=[1000, 10000, 100000]
+    )
+    heatmap.add_argument("--cell", type=int, default=16)
+    heatmap.add_argument("--frames", type=int, default=50)
+    heatmap.set_defaults(run=bench_heatmap)
+    static = commands.add_parser("static", help=bench_static.__doc__)
+    static.add_argument(
+        "--obstacles", type=int, nargs="+", default=[0, 100, 1000]
+    )
+    static.add_argument("--frames", type=int, default=200)
+    static.set_defaults(run=bench_static)
+    tunneling = commands.add_parser("tunneling", help=bench_tunneling.__doc__)
+    tunneling.add_argument("--balls", type=int, default=40)
+    tunneling.add_argument("--seconds", type=int, default=10)
+    tunneling.add_argument(
+        "--rates", type=float, nargs="+", default=[60, 30, 15, 6]
+    )
+    tunneling.add_argument(
+        "--speed", type=float, default=3, help="multiply every velocity"
+    )
+    tunneling.set_defaults(run=bench_tunneling)
+    args = parser.parse_args()
+    os.environ.update(HEADLESS_ENV)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
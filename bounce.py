@@ -14,17 +14,174 @@
 Imports the Bounce demo and executes the main function.
 """
 
-import sys
+import argparse
 from game import game
+from game.options import SceneOptions
 
 if __name__ == "__main__":
-    NUM_BALLS = 5
-    if len(sys.argv) > 1:
-        NUM_BALLS = int(sys.argv[1])
+    parser = argparse.ArgumentParser(description="Bouncing Balls!")
+    parser.add_argument("num_balls", nargs="?", type=int, default=5)
+    parser.add_argument(
+        "--record", metavar="FILE", help="record the ball trajectories to FILE"
+    )
+    parser.add_argument(
+        "--replay", metavar="FILE", help="play back a recording from FILE"
+    )
+    parser.add_argument(
+        "--snapshot",
+        metavar="FILE",
+        help="resume from FILE if it exists; F5 saves to it, F9 loads it",
+    )
+    parser.add_argument(
+        "--snapshot-every",
+        metavar="STEPS",
+        type=int,
+        help="also save the snapshot every STEPS steps",
+    )
+    parser.add_argument(
+        "--rewind-mb",
+        metavar="MB",
+        type=float,
+        default=16,
+        help="memory for the rewind history, r to rewind; 0 turns it off",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("step", "swept", "event"),
+        default="step",
+        help="move the balls frame by frame, in swept physics steps or from"
+        " collision to collision",
+    )
+    parser.add_argument(
+        "--physics-hz",
+        metavar="HZ",
+        type=float,
+        default=60,
+        help="physics steps per second for the swept engine",
+    )
+    parser.add_argument(
+        "--neighbor-skin",
+        metavar="PX",
+        type=float,
+        help="check only balls within PX of touching, from a neighbor list",
+    )
+    parser.add_argument(
+        "--tune-skin",
+        action="store_true",
+        help="adjust the neighbor list skin as the game runs",
+    )
+    parser.add_argument(
+        "--obstacles",
+        metavar="FILE",
+        help="bounce off of the segments and circles described in FILE",
+    )
+    parser.add_argument(
+        "--quadtree",
+        action="store_true",
+        help="find the balls near each ball in a loose quadtree",
+    )
+    parser.add_argument(
+        "--emit-rate",
+        metavar="N",
+        type=float,
+        default=60,
+        help="balls a second the left mouse button spawns; the right"
+        " button removes balls and c removes the dead ones",
+    )
+    parser.add_argument(
+        "--stamp",
+        action="store_true",
+        help="draw small balls by stamping circle masks into the screen's"
+        " pixels with NumPy",
+    )
+    parser.add_argument(
+        "--render-threads",
+        metavar="N",
+        type=int,
+        default=0,
+        help="draw the screen in tiles on N threads",
+    )
+    parser.add_argument(
+        "--render-scale",
+        metavar="S",
+        type=float,
+        default=1.0,
+        help="draw the balls at S times the window's resolution and stretch"
+        " them over it",
+    )
+    parser.add_argument(
+        "--dynamic-resolution",
+        action="store_true",
+        help="lower the render scale while frames take too long",
+    )
+    parser.add_argument(
+        "--vsync",
+        action="store_true",
+        help="open a scaled, double buffered window that waits for vsync",
+    )
+    parser.add_argument(
+        "--palette",
+        action="store_true",
+        help="draw the balls into 8 bit pixels indexing a 256 color palette",
+    )
+    parser.add_argument(
+        "--world",
+        metavar=("WIDTH", "HEIGHT"),
+        type=int,
+        nargs=2,
+        help="make the arena WIDTH by HEIGHT and look at it through a"
+        " camera; the arrow keys and the middle mouse button pan it and"
+        " the wheel zooms",
+    )
+    parser.add_argument(
+        "--trails",
+        metavar="FADE",
+        type=float,
+        nargs="?",
+        const=0.9,
+        help="leave trails behind the balls that keep FADE of their"
+        " brightness every frame",
+    )
+    parser.add_argument(
+        "--heatmap",
+        metavar="FILE",
+        nargs="?",
+        const="",
+        help="count where the balls are and where they collide; h shows"
+        " the counts, and they are saved to FILE, an .npz, at the end",
+    )
+    args = parser.parse_args()
+    if args.obstacles and args.engine == "event":
+        parser.error("the event engine does not support obstacles")
+    if args.trails and args.palette:
+        parser.error("trails need colors, not a palette")
+    NUM_BALLS = args.num_balls
     if NUM_BALLS >= 50:
         NUM_BALLS = 49
     if NUM_BALLS < 3:
         NUM_BALLS = 3
-    video_game = game.BounceDemo(NUM_BALLS)
+    options = SceneOptions(
+        record_path=args.record,
+        snapshot_path=args.snapshot,
+        snapshot_every=args.snapshot_every,
+        rewind_memory=int(args.rewind_mb * 2**20),
+        engine=args.engine,
+        physics_step=60 / args.physics_hz,
+        neighbor_skin=args.neighbor_skin,
+        tune_skin=args.tune_skin,
+        obstacles_path=args.obstacles,
+        quadtree=args.quadtree,
+        emit_rate=args.emit_rate,
+        world_size=args.world,
+        stamp=args.stamp,
+        render_threads=args.render_threads,
+        render_scale=args.render_scale,
+        dynamic_resolution=args.dynamic_resolution,
+        palette=args.palette,
+        trails=args.trails,
+        heatmap=args.heatmap is not None,
+        heatmap_path=args.heatmap or None,
+    )
+    video_game = game.BounceDemo(NUM_BALLS, args.replay, args.vsync, options)
     video_game.build_scene_graph()
     video_game.run()
@@ -32,24 +32,48 @@ class Explosion(pygame.sprite.Sprite):
     defaultlife = 12
     animcycle = 3
     images = []
+    # The explosion image decoded ahead of the display, see read_image().
+    _decoded = None
 
     def __init__(self, actor):
         pygame.sprite.Sprite.__init__(self, self.containers)
-        try:
-            surface = pygame.image.load(Explosion.image_path)
-        except pygame.error as pygame_error:
-            raise SystemExit(
-                f'Could not load image "{Explosion.image_path}"  \
-                    {pygame.get_error()}'
-            ) from pygame_error
-        img = surface.convert()
-        if not Explosion.images:
-            Explosion.images = [img, pygame.transform.flip(img, 1, 1)]
+        Explosion.load_images()
         self.image = self.images[0]
         self.rect = self.image.get_rect(center=actor.rect.center)
         self.life = Explosion.defaultlife
         self.pylint_pass = False
 
+    @classmethod
+    def read_image(cls):
+        """Decode the explosion image without converting it to the
+        display's format, so it can be done on a background thread."""
+        if cls.images or cls._decoded is not None:
+            return
+        try:
+            cls._decoded = pygame.image.load(cls.image_path)
+        except pygame.error:
+            # load_images() loads it again and reports it.
+            pass
+
+    @classmethod
+    def load_images(cls):
+        """Load the explosion frames once, from the image read_image()
+        decoded if it did; later calls are free."""
+        if cls.images:
+            return
+        surface = cls._decoded
+        cls._decoded = None
+        if surface is None:
+            try:
+                surface = pygame.image.load(cls.image_path)
+            except pygame.error as pygame_error:
+                raise SystemExit(
+                    f'Could not load image "{cls.image_path}"  \
+                        {pygame.get_error()}'
+                ) from pygame_error
+        img = surface.convert()
+        cls.images = [img, pygame.transform.flip(img, 1, 1)]
+
     def update(self):
         """Update the animation."""
         self.life = self.life - 1
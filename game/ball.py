@@ -13,10 +13,14 @@
 """A Ball class for the bouncing ball demo."""
 
 import os.path
+from io import BytesIO
 from random import randint
-from math import isclose
+from math import inf, isclose, sqrt
 import pygame
-from game import rgbcolors
+
+
+# Shared by every dead ball, do not modify it.
+DEAD_COLOR = pygame.Color(255, 250, 250)
 
 
 def random_velocity(min_val=-3, max_val=3):
@@ -35,33 +39,85 @@ def random_color():
     return pygame.Color(randint(0, 255), randint(0, 255), randint(0, 255))
 
 
+def contact_time(dx, dy, dvx, dvy, reach):
+    """Return how long until two circles whose centers are (dx, dy) apart
+    and moving apart at (dvx, dvy) come within reach of each other, 0 if
+    they already overlap and are closing in, or inf if they never touch.
+    This is the swept circle test: the earliest root of
+    |d + dv t| = reach."""
+    approach = dx * dvx + dy * dvy
+    if approach >= 0:
+        return inf
+    gap = dx * dx + dy * dy - reach * reach
+    if gap <= 0:
+        return 0.0
+    discriminant = approach * approach - (dvx * dvx + dvy * dvy) * gap
+    if discriminant < 0:
+        return inf
+    # The smaller root, written so it does not cancel when gap is small.
+    return gap / (-approach + sqrt(discriminant))
+
+
+def wall_time(position, speed, radius, low, high):
+    """Return how long until a circle moving along one axis at speed
+    touches the wall at low or high, 0 if it is already past the wall it
+    moves towards, or inf if it is not moving."""
+    if speed > 0:
+        return max(0.0, (high - radius - position) / speed)
+    if speed < 0:
+        return max(0.0, (low + radius - position) / speed)
+    return inf
+
+
 # This is the class we discussed in class. You can have this as a standalone
 # definition of a circle's geometry or you can fold the Circle and Ball classes
 # together into a single class definition. Your choice.
 class Circle:
-    """Class representing a circle with a bounding rect."""
+    """Class representing a circle with a bounding rect. The center is
+    updated in place and the bounding rect is cached until the circle
+    moves, so a moving circle does not allocate anything."""
+
+    __slots__ = ("_center", "_radius", "_rect", "_rect_is_valid")
 
     def __init__(self, center_x, center_y, radius):
         self._center = pygame.Vector2(center_x, center_y)
-        self._radius = radius
+        # A float, so the squares and sums of radii come from the float
+        # free list where ints above 256 would each be allocated.
+        self._radius = float(radius)
+        self._rect = pygame.Rect(0, 0, 0, 0)
+        self._rect_is_valid = False
 
     @property
     def radius(self):
         """Return the circle's radius"""
         return self._radius
 
+    @radius.setter
+    def radius(self, radius):
+        """Change the circle's radius."""
+        self._radius = float(radius)
+        self._rect_is_valid = False
+
     @property
     def center(self):
-        """Return the circle's center."""
+        """Return the circle's center. Move the circle with move_ip() or
+        move_to() rather than changing the vector so the rect follows."""
         return self._center
 
     @property
     def rect(self):
-        """Return bounding Rect; calculate it and create a new Rect instance"""
-        upper_left_corner = self._center - \
-            pygame.Vector2(self._radius, self._radius)
-        width = self._radius * 2
-        return pygame.Rect(upper_left_corner, (width, width))
+        """Return the bounding Rect. It is only recalculated after the
+        circle has moved."""
+        if not self._rect_is_valid:
+            width = self._radius * 2
+            self._rect.update(
+                self._center.x - self._radius,
+                self._center.y - self._radius,
+                width,
+                width,
+            )
+            self._rect_is_valid = True
+        return self._rect
 
     @property
     def width(self):
@@ -75,32 +131,49 @@ class Circle:
 
     def squared_distance_from(self, other_circle):
         """Squared distance from self to other circle."""
-        return (other_circle.center - self.center).length_squared()
+        return self._center.distance_squared_to(other_circle.center)
 
     def distance_from(self, other_circle):
         """Distance from self to other circle"""
-        return (other_circle.center - self._center).length()
+        center = other_circle._center
+        dx = center.x - self._center.x
+        dy = center.y - self._center.y
+        return sqrt(dx * dx + dy * dy)
 
     def move_ip(self, x_point, y_point):
         """Move circle in place, update the circle's center"""
-        self._center = self._center + pygame.Vector2(x_point, y_point)
+        self._center.x += x_point
+        self._center.y += y_point
+        self._rect_is_valid = False
+
+    def move_by_ip(self, offset):
+        """Move circle in place by a vector, such as a velocity."""
+        self._center += offset
+        self._rect_is_valid = False
+
+    def move_to(self, x_point, y_point):
+        """Move the circle's center to a point."""
+        # Setting the parts makes no bound method, unlike update().
+        self._center.x = x_point
+        self._center.y = y_point
+        self._rect_is_valid = False
 
     def move(self, x_point, y_point):
         """Move circle, return a new Circle instance"""
-        center = self._center + pygame.Vector2(x_point, y_point)
-        return Circle(center, self._radius)
+        return Circle(
+            self._center.x + x_point, self._center.y + y_point, self._radius
+        )
 
     def stay_in_bounds(self, xmin, xmax, ymin, ymax):
         """Update the position of the circle so that it remains
         within the rectangle defined by xmin, xmax, ymin, ymax."""
-        if self._center.x <= xmin:
-            self._center.x = self._radius
-        elif self._center.x >= xmax:
-            self._center.x = xmax - self._radius
-        elif self._center.y <= ymin:
-            self._center.y = self._radius
-        elif self._center.y >= ymax:
-            self._center.y = ymax - self._radius
+        (x, y) = self._center
+        radius = self._radius
+        inside_x = min(max(x, xmin + radius), xmax - radius)
+        inside_y = min(max(y, ymin + radius), ymax - radius)
+        if inside_x != x or inside_y != y:
+            self._center.update(inside_x, inside_y)
+            self._rect_is_valid = False
 
 
 class Ball:
@@ -116,138 +189,190 @@ class Ball:
     # the license.
     bounce_sound = os.path.join(data_dir, "Boing.aiff")
     reflect_sound = os.path.join(data_dir, "Monkey.aiff")
-
-    def __init__(self, name, center_x, center_y, sound_on=True):
-        """Initialize a bouncing ball."""
+    _sounds = {}
+    # The sound effect files read ahead of the mixer, by path.
+    _sound_files = {}
+
+    __slots__ = (
+        "_name",
+        "_circle",
+        "_center",
+        "_color",
+        "_palette_index",
+        "_velocity",
+        "_sound_on",
+        "_bounce_count",
+        "_is_alive",
+        "_draw_text",
+        "_bounce_sound",
+        "_bounce_channel",
+        "_reflect_sound",
+        "_reflect_channel",
+    )
+
+    def __init__(self, name, center_x, center_y, sound_on=True, radius=None):
+        """Initialize a bouncing ball, of default_radius unless a radius is
+        given."""
         # The name can be any string. The best choice is an integer.
         self._name = name
         # Yes, we could define the details about our geometry in the Ball
         # class or we can define the geometry in an instance variable.
         # It is up to you if you want to separate them out or integrate them
         # together.
-        self._circle = Circle(center_x, center_y, Ball.default_radius)
+        self._circle = Circle(
+            center_x, center_y, radius or Ball.default_radius
+        )
+        # The circle's center is only ever changed in place, so the ball can
+        # keep a reference to it and skip a property lookup.
+        self._center = self._circle.center
         self._color = random_color()
+        # Only looked up when the ball is drawn into an 8 bit surface.
+        self._palette_index = None
         self._velocity = random_velocity()
         self._sound_on = sound_on
         self._bounce_count = randint(5, 10)
         self._is_alive = True
         self._draw_text = False
-        font = pygame.font.SysFont(None, Ball.default_radius)
-        self._name_text = font.render(str(self._name), True, rgbcolors.black)
-        try:
-            self._bounce_sound = pygame.mixer.Sound(Ball.bounce_sound)
-            self._bounce_sound.set_volume(1)
-            self._bounce_channel = pygame.mixer.Channel(2)
-        except pygame.error as pygame_error:
-            print(f"Cannot open {Ball.bounce_sound}")
-            raise SystemExit(1) from pygame_error
-        try:
-            self._reflect_sound = pygame.mixer.Sound(Ball.reflect_sound)
-            self._reflect_sound.set_volume(1)
-            self._reflect_channel = pygame.mixer.Channel(3)
-        except pygame.error as pygame_error:
-            print(f"Cannot open {Ball.reflect_sound}")
-            raise SystemExit(1) from pygame_error
+        Ball.load_sounds()
+        self._bounce_sound = Ball._sounds[Ball.bounce_sound]
+        self._bounce_channel = pygame.mixer.Channel(2)
+        self._reflect_sound = Ball._sounds[Ball.reflect_sound]
+        self._reflect_channel = pygame.mixer.Channel(3)
+
+    @classmethod
+    def read_sounds(cls):
+        """Read the sound effect files into memory without the mixer, so it
+        can be done on a background thread."""
+        for sound_path in (cls.bounce_sound, cls.reflect_sound):
+            if sound_path in cls._sounds or sound_path in cls._sound_files:
+                continue
+            try:
+                with open(sound_path, "rb") as sound_file:
+                    cls._sound_files[sound_path] = sound_file.read()
+            except OSError:
+                # load_sounds() opens it again and reports it.
+                pass
+
+    @classmethod
+    def load_sounds(cls):
+        """Load the sound effects shared by every ball, from memory if
+        read_sounds() read them. Only the first call loads them."""
+        for sound_path in (cls.bounce_sound, cls.reflect_sound):
+            if sound_path in cls._sounds:
+                continue
+            data = cls._sound_files.pop(sound_path, None)
+            try:
+                if data is not None:
+                    sound = pygame.mixer.Sound(file=BytesIO(data))
+                else:
+                    sound = pygame.mixer.Sound(sound_path)
+                sound.set_volume(1)
+            except pygame.error as pygame_error:
+                print(f"Cannot open {sound_path}")
+                raise SystemExit(1) from pygame_error
+            cls._sounds[sound_path] = sound
 
     def toggle_draw_text(self):
-        """Toggle the debugging text where each circle's name is drawn."""
+        """Toggle the debugging text where each circle's name is drawn. The
+        scene draws the names of all of its balls together, see
+        game.labels.GlyphAtlas."""
         self._draw_text = not self._draw_text
 
     def draw(self, surface):
         """Draw the circle to the surface."""
-        pygame.draw.circle(surface, self.color, self.center, self.radius)
-        if self._draw_text:
-            surface.blit(
-                self._name_text,
-                self._name_text.get_rect(center=self._circle.center),
-            )
+        pygame.draw.circle(
+            surface, self._color, self._center, self._circle._radius
+        )
 
     def wall_reflect(self, xmin, xmax, ymin, ymax):
-        """Reflect the ball off of a wall,
-        play a sound if the sound flag is on."""
-        # Condition for bottom left corner
+        """Reflect the ball off of a wall it touches and is heading into,
+        play a sound if the sound flag is on. The scene does this for all
+        of its balls at once with game.walls.BoundaryStage."""
         self._circle.stay_in_bounds(xmin, xmax, ymin, ymax)
+        (x, y) = self._center
+        (vx, vy) = self._velocity
+        radius = self._circle._radius
+        flip_x = (x <= xmin + radius and vx < 0) or (
+            x >= xmax - radius and vx > 0
+        )
+        flip_y = (y <= ymin + radius and vy < 0) or (
+            y >= ymax - radius and vy > 0
+        )
+        if flip_x or flip_y:
+            self.reflect(flip_x, flip_y)
 
-        if (
-            self._circle.center.x <= xmin + self._circle._radius
-            and self._circle.center.y <= ymin + self._circle._radius
-        ):
+    def reflect(self, flip_x, flip_y):
+        """Reflect the ball off of a wall by reversing the x and/or y part
+        of its velocity, play a sound if the sound flag is on."""
+        if flip_x:
             self._velocity.x *= -1
+        if flip_y:
             self._velocity.y *= -1
-            if self._sound_on and self._is_alive:
-                self._reflect_sound.play(0)
-
-        # Condition for top left corner
-        elif (
-            self._circle.center.x <= xmin + self._circle._radius
-            and self._circle.center.y + self._circle._radius >= ymax
-        ):
-            self._velocity.x *= -1
-            self._velocity.y *= -1
-            if self._sound_on and self._is_alive:
-                self._reflect_sound.play(0)
-
-        # Condition for bottom right corner
-        elif (
-            self._circle.center.x + self._circle._radius >= xmax
-            and self._circle.center.y <= ymin + self._circle._radius
-        ):
-            self._velocity.x *= -1
-            self._velocity.y *= -1
-            if self._sound_on and self._is_alive:
-                self._reflect_sound.play(0)
-
-        # Condition for top right corner
-        elif (
-            self._circle.center.x + self._circle._radius >= xmax
-            and self._circle.center.y + self._circle._radius >= ymax
-        ):
-            self._velocity.x *= -1
-            self._velocity.y *= -1
-            if self._sound_on and self._is_alive:
-                self._reflect_sound.play(0)
-
-        # Condition for left or right wall
-        elif (
-            self._circle.center.x <= xmin + self._circle._radius
-            or self._circle.center.x + self._circle._radius >= xmax
-        ):
-            self._velocity.x *= -1
-            if self._sound_on and self._is_alive:
-                self._reflect_sound.play(0)
-
-        # Condition for top or bottom wall
-        elif (
-            self._circle.center.y <= ymin + self._circle._radius
-            or self._circle.center.y + self._circle._radius >= ymax
-        ):
-            self._velocity.y *= -1
-            if self._sound_on and self._is_alive:
-                self._reflect_sound.play(0)
+        self.play_reflect_sound()
+
+    def play_reflect_sound(self):
+        """Play the reflect sound if the sound flag is on and the ball is
+        alive, and return whether it was played."""
+        if self._sound_on and self._is_alive:
+            self._reflect_sound.play(0)
+            return True
+        return False
+
+    def push_off(self, normal_x, normal_y, depth):
+        """Move the ball depth along the unit normal of an obstacle it
+        overlaps and, if it is heading into the obstacle, reflect it off of
+        it, play a sound if the sound flag is on."""
+        self._circle.move_ip(normal_x * depth, normal_y * depth)
+        heading = self._velocity.x * normal_x + self._velocity.y * normal_y
+        if heading < 0:
+            self._velocity.x -= 2 * heading * normal_x
+            self._velocity.y -= 2 * heading * normal_y
+            self.play_reflect_sound()
 
     def bounce(self, other_ball):
         """Bounce the ball off of another ball,
         play a sound if the ball is no alive."""
-        normal = other_ball.center - self.center
-        self._velocity = self._velocity.reflect(normal)
-        self._bounce_count -= 1
-        other_ball._bounce_count -= 1
+        normal_x = other_ball._center.x - self._center.x
+        normal_y = other_ball._center.y - self._center.y
+        length_squared = normal_x * normal_x + normal_y * normal_y
+        # Balls pressed onto the same spot have no normal to bounce off.
+        if length_squared > 1e-6:
+            # Vector2.reflect_ip worked out on floats, step for step, so
+            # no vector or bound method is made.
+            if abs(length_squared - 1) > 1e-6:
+                length = sqrt(length_squared)
+                normal_x /= length
+                normal_y /= length
+            velocity = self._velocity
+            dot = velocity.x * normal_x + velocity.y * normal_y
+            velocity.x = velocity.x - 2 * normal_x * dot
+            velocity.y = velocity.y - 2 * normal_y * dot
+        # Dead balls stay at zero.
+        if self._is_alive:
+            self._bounce_count -= 1
+        if other_ball._is_alive:
+            other_ball._bounce_count -= 1
         if self._bounce_count == 0:
             self._is_alive = False
             self.set_velocity(0, 0)
-            self._color = pygame.Color(255, 250, 250)
+            self._color = DEAD_COLOR
+            self._palette_index = None
         if other_ball._bounce_count == 0:
             other_ball._is_alive = False
             other_ball.set_velocity(0, 0)
-            other_ball._color = pygame.Color(255, 250, 250)
+            other_ball._color = DEAD_COLOR
+            other_ball._palette_index = None
 
     def collide_with(self, other_ball):
         """Return true if self collides with other_ball."""
-        return (
-            self._circle.distance_from(other_ball)
-            <= self._circle._radius +
-            other_ball._circle._radius
-        )
+        # Every Vector2 method call makes a new bound method, while
+        # arithmetic on floats allocates nothing.
+        center = self._center
+        other_center = other_ball._center
+        dx = other_center.x - center.x
+        dy = other_center.y - center.y
+        reach = self._circle._radius + other_ball._circle._radius
+        return dx * dx + dy * dy <= reach * reach
 
     def separate_from(self, other_ball, rect=0):
         """Separate a ball from the other
@@ -259,15 +384,15 @@ class Ball:
         )
         half_distance_to_change_by = (ideal_distance - distance_between) / 2
 
-        # Move first ball
-        velocity = self._velocity * -1
-        scale_velocity = velocity * half_distance_to_change_by
-        self._circle.move_ip(*scale_velocity)
-
-        # Move other ball
-        velocity = other_ball._velocity * -1
-        scale_velocity = velocity * half_distance_to_change_by
-        other_ball._circle.move_ip(*scale_velocity)
+        # Move each ball back along its velocity
+        self._circle.move_ip(
+            -self._velocity.x * half_distance_to_change_by,
+            -self._velocity.y * half_distance_to_change_by,
+        )
+        other_ball._circle.move_ip(
+            -other_ball._velocity.x * half_distance_to_change_by,
+            -other_ball._velocity.y * half_distance_to_change_by,
+        )
 
     @property
     def name(self):
@@ -287,49 +412,97 @@ class Ball:
     @property
     def center(self):
         """Return the ball's center."""
-        return self._circle.center
+        return self._center
 
     @property
     def radius(self):
         """Return the ball's radius"""
-        return self._circle.radius
+        return self._circle._radius
 
     @property
     def color(self):
         """Return the color of the ball."""
         return self._color
 
+    @property
+    def palette_index(self):
+        """Return the index of the ball's color in the shared palette,
+        looked up the first time it is asked for."""
+        if self._palette_index is None:
+            # pylint: disable-next=import-outside-toplevel
+            from game.palette import PALETTE
+
+            self._palette_index = PALETTE.index(self._color)
+        return self._palette_index
+
     @property
     def velocity(self):
         return self._velocity
 
+    @property
+    def bounce_count(self):
+        """Return how many more bounces the ball can take."""
+        return self._bounce_count
+
     @property
     def is_alive(self):
         """Return true if the ball is still alive."""
         return self._is_alive
 
+    @property
+    def sound_on(self):
+        """Return true if the ball's sound effects are on."""
+        return self._sound_on
+
+    @property
+    def draw_text(self):
+        """Return true if the ball's name is drawn."""
+        return self._draw_text
+
     def toggle_sound(self):
         """Turn off the sound effects."""
         self._sound_on = not self._sound_on
 
     def too_close(self, x, y, min_dist):
         """Is the ball too close to some point by some min_dist?"""
-        point = pygame.Vector2(x, y)
-        return (point - self._circle._center).length() < min_dist
+        delta_x = x - self._center.x
+        delta_y = y - self._center.y
+        return delta_x * delta_x + delta_y * delta_y < min_dist * min_dist
 
     def stop(self):
         """Stop the ball from moving."""
-        self._velocity = pygame.Vector2(0, 0)
+        self._velocity.update(0, 0)
+
+    def move_to(self, x, y):
+        """Move the ball's center to (x, y)."""
+        self._center.x = x
+        self._center.y = y
+        self._circle._rect_is_valid = False
 
     def set_velocity(self, x, y):
         """Set the ball's velocity."""
-        self._velocity = pygame.Vector2(x, y)
+        # Setting the parts makes no bound method, unlike update().
+        self._velocity.x = x
+        self._velocity.y = y
+
+    def restore_state(
+        self, center, velocity, radius, color, bounce_count, is_alive
+    ):
+        """Overwrite the ball's state, such as when it is restored from a
+        snapshot or rewound."""
+        self._circle.move_to(*center)
+        self.set_velocity(*velocity)
+        self._circle.radius = radius
+        self._color = pygame.Color(*color)
+        self._palette_index = None
+        self._bounce_count = bounce_count
+        self._is_alive = is_alive
 
     def update(self):
         """Update the ball's position"""
-        self._circle.move_ip(*self._velocity)
+        self._circle.move_by_ip(self._velocity)
 
     def __str__(self):
         """Ball stringify."""
         # name, center_x, center_y, sound_on=True
-        return f"Ball({self.name}, {self._circle.center})"
+        return f"Ball({self.name}, {self._center})"
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""A list of balls that can grow and shrink while the game runs.
+
+The balls stay packed at the front of a plain list, so everything that
+loops over the balls keeps working on it. Removing a ball moves the last
+ball into its place instead of shifting the rest down, so both adding
+and removing take constant time. Balls are referred to by handles: a
+slot number and the generation of that slot. A slot's generation goes
+up every time its ball is removed, so a handle to a removed ball is
+recognized as stale even after the slot has been reused."""
+
+from collections import namedtuple
+
+Handle = namedtuple("Handle", ("slot", "generation"))
+
+
+class BallStore:
+    """Balls packed into a list, referred to by generational handles."""
+
+    def __init__(self, balls=None):
+        """Manage the list balls, in place, or a new empty list."""
+        self._balls = [] if balls is None else balls
+        # Per slot: its generation and where its ball is in the list, or
+        # -1 when it is free. Per ball in the list: its slot. The lists
+        # only grow, by appending, so growing is amortized constant time.
+        self._generations = []
+        self._positions = []
+        self._slots = []
+        self._free = []
+        self.reset(self._balls)
+
+    @property
+    def balls(self):
+        """Return the packed list of balls. Its order changes whenever a
+        ball is removed."""
+        return self._balls
+
+    def __len__(self):
+        return len(self._balls)
+
+    def __contains__(self, handle):
+        return self.get(handle) is not None
+
+    def reset(self, balls):
+        """Manage the list balls, in place, instead. Every handle given
+        out before is stale afterwards."""
+        for slot in self._slots:
+            self._generations[slot] += 1
+            self._positions[slot] = -1
+            self._free.append(slot)
+        self._slots = []
+        self._balls = balls
+        for (position, _) in enumerate(self._balls):
+            self._slots.append(self._take_slot(position))
+
+    def _take_slot(self, position):
+        """Return a free slot, now holding the ball at position."""
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._generations)
+            self._generations.append(0)
+            self._positions.append(-1)
+        self._positions[slot] = position
+        return slot
+
+    def spawn(self, ball):
+        """Add ball and return its handle."""
+        position = len(self._balls)
+        self._balls.append(ball)
+        slot = self._take_slot(position)
+        self._slots.append(slot)
+        return Handle(slot, self._generations[slot])
+
+    def get(self, handle):
+        """Return the ball for handle, or None if it has been removed."""
+        (slot, generation) = handle
+        if slot >= len(self._generations):
+            return None
+        if self._generations[slot] != generation:
+            return None
+        return self._balls[self._positions[slot]]
+
+    def handle_at(self, position):
+        """Return the handle of the ball at position in the list."""
+        slot = self._slots[position]
+        return Handle(slot, self._generations[slot])
+
+    def despawn(self, handle):
+        """Remove the ball for handle and return it. The last ball in the
+        list takes its place. A stale handle raises a KeyError."""
+        ball = self.get(handle)
+        if ball is None:
+            raise KeyError(f"{handle} is stale, its ball was removed")
+        slot = handle.slot
+        position = self._positions[slot]
+        last = len(self._balls) - 1
+        if position != last:
+            moved_slot = self._slots[last]
+            self._balls[position] = self._balls[last]
+            self._slots[position] = moved_slot
+            self._positions[moved_slot] = position
+        self._balls.pop()
+        self._slots.pop()
+        self._generations[slot] += 1
+        self._positions[slot] = -1
+        self._free.append(slot)
+        return ball
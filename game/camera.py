@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""A camera looking at part of a world bigger than the screen.
+
+The whole world keeps moving every frame, but only the balls inside the
+camera's viewport are drawn. When the scene keeps a quadtree of the
+balls for stepping them, the balls in view are looked up in it, so
+drawing costs about the same however big the world is; otherwise each
+ball's bounds are tested against the viewport all at once with NumPy."""
+
+import numpy as np
+import pygame
+from game.lod import centers, radii
+
+# The closest the camera zooms in.
+MAX_ZOOM = 8.0
+
+
+class Camera:
+    """The part of the world shown on the screen, panned and zoomed."""
+
+    def __init__(self, screen_size, world_size, zoom=1.0):
+        """Look at the middle of a world of world_size on a screen of
+        screen_size, zoomed by zoom. The camera zooms out no further than
+        showing the whole world."""
+        self._screen_size = pygame.Vector2(screen_size)
+        self._world_size = pygame.Vector2(world_size)
+        self._min_zoom = min(
+            1.0,
+            self._screen_size.x / self._world_size.x,
+            self._screen_size.y / self._world_size.y,
+        )
+        self._zoom = min(MAX_ZOOM, max(self._min_zoom, zoom))
+        self._center = self._world_size / 2
+
+    @property
+    def zoom(self):
+        """Return how many screen pixels a unit of the world takes."""
+        return self._zoom
+
+    @property
+    def origin(self):
+        """Return the point of the world at the screen's top left."""
+        return self._center - self._screen_size / (2 * self._zoom)
+
+    def __str__(self):
+        return (
+            f"camera at ({self._center.x:.0f}, {self._center.y:.0f}),"
+            f" zoom x{self._zoom:.2f}"
+        )
+
+    def viewport(self):
+        """Return the part of the world on screen, (xmin, xmax, ymin,
+        ymax)."""
+        (left, top) = self.origin
+        (width, height) = self._screen_size / self._zoom
+        return (left, left + width, top, top + height)
+
+    def to_world(self, position):
+        """Return the point of the world at position on the screen."""
+        return self.origin + pygame.Vector2(position) / self._zoom
+
+    def pan(self, dx, dy):
+        """Move the view by (dx, dy) screen pixels."""
+        self._center += pygame.Vector2(dx, dy) / self._zoom
+        self._center.x = min(max(self._center.x, 0), self._world_size.x)
+        self._center.y = min(max(self._center.y, 0), self._world_size.y)
+
+    def zoom_at(self, factor, position):
+        """Zoom in by factor, or out if it is less than 1, keeping the
+        point of the world at position on the screen where it is."""
+        anchor = self.to_world(position)
+        self._zoom = min(MAX_ZOOM, max(self._min_zoom, self._zoom * factor))
+        self._center = anchor - (
+            pygame.Vector2(position) - self._screen_size / 2
+        ) / self._zoom
+        self.pan(0, 0)
+
+    def cull(self, balls, quadtree=None):
+        """Return the balls that overlap the viewport. If given, quadtree
+        is a game.quadtree.LooseQuadtree indexing balls."""
+        (xmin, xmax, ymin, ymax) = self.viewport()
+        if (
+            xmin <= 0
+            and ymin <= 0
+            and xmax >= self._world_size.x
+            and ymax >= self._world_size.y
+        ):
+            return balls
+        if quadtree is not None:
+            return [balls[i] for i in quadtree.query(xmin, xmax, ymin, ymax)]
+        sizes = radii(balls)
+        where = centers(balls)
+        inside = (where[:, 0] + sizes >= xmin) & (where[:, 0] - sizes <= xmax)
+        inside &= (where[:, 1] + sizes >= ymin) & (where[:, 1] - sizes <= ymax)
+        return [balls[i] for i in np.flatnonzero(inside).tolist()]
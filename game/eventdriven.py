@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""An event driven simulation of the bouncing balls.
+
+Between collisions every ball moves in a straight line, so instead of
+stepping frame by frame the engine predicts when each ball will next hit
+a wall or another ball, keeps the predictions in a priority queue and
+jumps from one event to the next. A prediction is dropped when either
+ball has collided since it was made. Each ball is only moved when it
+takes part in an event or when the frame is drawn, so stopped balls cost
+nothing and a fast forward costs one step per collision."""
+
+import heapq
+from math import inf
+import numpy as np
+from game.ball import contact_time, wall_time
+from game.neighbors import neighbor_lists
+from game.recording import gather
+
+# The most events processed per ball in one call to advance_to or sweep;
+# a ball wedged between a wall and a stopped ball could otherwise bounce
+# back and forth forever without time moving on.
+EVENTS_PER_BALL = 64
+
+# The kinds of event in the queue.
+_BALL = 0
+_WALL_X = 1
+_WALL_Y = 2
+
+
+class EventDrivenEngine:
+    """Advance balls inside a rectangle from collision to collision."""
+
+    def __init__(self, balls, bounds, on_collision, neighbors=None):
+        """Simulate balls inside bounds, (xmin, xmax, ymin, ymax).
+        on_collision(ball, other_ball) is called to resolve two balls
+        touching. A ball touching a wall is reflected off it. With
+        neighbors, for each ball the indices of the only balls it can
+        meet, contacts are only predicted between those."""
+        self._balls = balls
+        self._neighbors = neighbors
+        (self._xmin, self._xmax, self._ymin, self._ymax) = bounds
+        self._on_collision = on_collision
+        self._time = 0.0
+        # The time each ball's position was last brought up to date and
+        # how many events it has taken part in.
+        self._times = [0.0] * len(balls)
+        self._counts = [0] * len(balls)
+        self._queue = []
+        self._sequence = 0
+        self._events = 0
+        for i in range(len(balls)):
+            self._predict(i, first=i + 1)
+
+    @property
+    def time(self):
+        """Return the simulation time, in frames."""
+        return self._time
+
+    @property
+    def events(self):
+        """Return the number of collisions processed so far."""
+        return self._events
+
+    def _push(self, time, kind, i, j):
+        """Queue an event, remembering the event counts it depends on."""
+        self._sequence += 1
+        count_j = self._counts[j] if j >= 0 else 0
+        heapq.heappush(
+            self._queue,
+            (time, self._sequence, kind, i, j, self._counts[i], count_j),
+        )
+
+    def _position(self, i, time):
+        """Return where ball i is at time."""
+        ball = self._balls[i]
+        elapsed = time - self._times[i]
+        return (
+            ball.center.x + ball.velocity.x * elapsed,
+            ball.center.y + ball.velocity.y * elapsed,
+        )
+
+    def _sync(self, i, time):
+        """Move ball i along its straight line up to time."""
+        elapsed = time - self._times[i]
+        if elapsed:
+            ball = self._balls[i]
+            ball.circle.move_ip(
+                ball.velocity.x * elapsed, ball.velocity.y * elapsed
+            )
+            self._times[i] = time
+
+    def _wall_times(self, i):
+        """Return the time until ball i reaches a wall in x and in y."""
+        ball = self._balls[i]
+        (x, y) = self._position(i, self._time)
+        return (
+            wall_time(x, ball.velocity.x, ball.radius, self._xmin, self._xmax),
+            wall_time(y, ball.velocity.y, ball.radius, self._ymin, self._ymax),
+        )
+
+    def _contact_time(self, i, j):
+        """Return the time until balls i and j touch, or inf."""
+        ball = self._balls[i]
+        other_ball = self._balls[j]
+        (x_i, y_i) = self._position(i, self._time)
+        (x_j, y_j) = self._position(j, self._time)
+        return contact_time(
+            x_j - x_i,
+            y_j - y_i,
+            other_ball.velocity.x - ball.velocity.x,
+            other_ball.velocity.y - ball.velocity.y,
+            ball.radius + other_ball.radius,
+        )
+
+    def _predict(self, i, first=0):
+        """Queue the next wall events of ball i and its contacts with the
+        balls from first on."""
+        (time_x, time_y) = self._wall_times(i)
+        if time_x < inf:
+            self._push(self._time + time_x, _WALL_X, i, -1)
+        if time_y < inf:
+            self._push(self._time + time_y, _WALL_Y, i, -1)
+        others = (
+            range(len(self._balls))
+            if self._neighbors is None
+            else self._neighbors[i]
+        )
+        for j in others:
+            if j >= first and j != i:
+                contact = self._contact_time(i, j)
+                if contact < inf:
+                    self._push(self._time + contact, _BALL, i, j)
+
+    def _is_current(self, event):
+        """Has neither ball collided since the event was predicted?"""
+        (_, _, _, i, j, count_i, count_j) = event
+        return self._counts[i] == count_i and (
+            j < 0 or self._counts[j] == count_j
+        )
+
+    def advance(self, frames=1.0):
+        """Run the simulation forward by frames and bring every ball's
+        position up to date."""
+        self.advance_to(self._time + frames)
+        for i in range(len(self._balls)):
+            self._sync(i, self._time)
+
+    def advance_to(self, time):
+        """Process every event up to time. Only the balls that took part
+        in an event have up to date positions afterwards."""
+        budget = EVENTS_PER_BALL * len(self._balls)
+        while self._queue and self._queue[0][0] <= time:
+            if budget == 0:
+                # Pick up from here next time instead of hanging.
+                return
+            event = heapq.heappop(self._queue)
+            if not self._is_current(event):
+                continue
+            (self._time, _, kind, i, j, _, _) = event
+            self._events += 1
+            budget -= 1
+            self._sync(i, self._time)
+            if kind == _BALL:
+                self._sync(j, self._time)
+                self._on_collision(self._balls[i], self._balls[j])
+                self._counts[i] += 1
+                self._counts[j] += 1
+                self._predict(i)
+                self._predict(j)
+            else:
+                self._balls[i].reflect(kind == _WALL_X, kind == _WALL_Y)
+                self._counts[i] += 1
+                self._predict(i)
+        self._time = max(self._time, time)
+
+
+def _reachable(balls, frames):
+    """Return, for each ball, the indices of the balls it could meet
+    within frames, if no ball speeds up in the meantime: those closer than
+    the sum of their radii plus how far both can travel."""
+    num_balls = len(balls)
+    positions = np.zeros((num_balls, 2))
+    velocities = np.zeros((num_balls, 2))
+    gather(balls, positions, velocities, np.zeros(num_balls, np.bool_))
+    radii = np.array([ball.radius for ball in balls])
+    speeds = np.sqrt(np.einsum("ij,ij->i", velocities, velocities))
+    return neighbor_lists(positions, radii + speeds * frames)
+
+
+def sweep(balls, bounds, frames, on_collision):
+    """Move balls frames ahead inside bounds, (xmin, xmax, ymin, ymax),
+    without letting them pass through a wall or each other however long
+    the step is. The step is run by an EventDrivenEngine that only
+    predicts contacts between the balls that could meet within it, so
+    on_collision(ball, other_ball) may turn and stop balls but not speed
+    them up. Unlike a kept EventDrivenEngine nothing is kept between
+    calls, so balls can be added, removed or moved in between. Should the
+    events run out of budget, every ball stops where it was at the last
+    event rather than moving on through what it would have hit."""
+    engine = EventDrivenEngine(
+        balls, bounds, on_collision, _reachable(balls, frames)
+    )
+    engine.advance(frames)
@@ -12,6 +12,7 @@
 
 """Game objects to create PyGame based games."""
 
+from concurrent.futures import ThreadPoolExecutor
 from time import sleep
 import os
 import sys
@@ -21,6 +22,7 @@ from game.scene import (
     EmptyPressAnyKeyScene,
     BlinkingTitle,
     BouncingBallsScene,
+    ReplayScene,
     SplashScene,
 )
 
@@ -40,13 +42,32 @@ class VideoGame:
         window_width=800,
         window_height=600,
         window_title="My Awesome Game",
+        vsync=False,
     ):
-        """Initialize a new game with the given window size and window title."""
-        pygame.init()
+        """Initialize a new game with the given window size and window title.
+        Only the display is initialized here, each scene initializes the
+        other subsystems it needs when it is prepared. With vsync the
+        window is double buffered, scaled by the GPU when it is resized and
+        waits for vsync where the driver can."""
+        pygame.display.init()
         self._window_size = (window_width, window_height)
         self._clock = pygame.time.Clock()
-        self._screen = pygame.display.set_mode(self._window_size)
-        # screen = pygame.display.set_mode(window_size, pygame.DOUBLEBUF | pygame.OPENGL)
+        self._screen = None
+        if vsync:
+            # Without a renderer for SCALED, fall back to a plain window.
+            for (flags, sync) in (
+                (pygame.SCALED | pygame.DOUBLEBUF, 1),
+                (pygame.SCALED | pygame.DOUBLEBUF, 0),
+            ):
+                try:
+                    self._screen = pygame.display.set_mode(
+                        self._window_size, flags, vsync=sync
+                    )
+                    break
+                except pygame.error as mode_error:
+                    print(f"Could not open the window, {mode_error}.")
+        if self._screen is None:
+            self._screen = pygame.display.set_mode(self._window_size)
         self._title = window_title
         pygame.display.set_caption(self._title)
         self._game_is_over = False
@@ -66,20 +87,42 @@ class VideoGame:
         self._scene_graph.append(EmptyPressAnyKeyScene(self._screen, rgbcolors.orange))
 
     def run(self):
-        """Run the game; the main game loop."""
-        while not self._game_is_over:
-            for scene in self.scene_graph:
-                scene.start_scene()
-                while scene.is_valid():
-                    self._clock.tick(scene.frame_rate())
-                    for event in pygame.event.get():
-                        scene.process_event(event)
-                    scene.update_scene()
-                    scene.draw()
-                    scene.render_updates()
-                    pygame.display.update()
-                scene.end_scene()
-            self._game_is_over = True
+        """Run the game; the main game loop. While a scene is playing the
+        next scene in the scene graph reads its files on a background
+        thread so switching scenes does not stall the loop; the scene sets
+        up the rest on this thread when it starts."""
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            while not self._game_is_over:
+                next_scene = None
+                for index, scene in enumerate(self.scene_graph):
+                    if next_scene is not None:
+                        # Re-raises anything the prefetch raised.
+                        next_scene.result()
+                    next_scene = None
+                    upcoming = None
+                    if index + 1 < len(self.scene_graph):
+                        upcoming = self.scene_graph[index + 1]
+                    scene.start_scene()
+                    while scene.is_valid():
+                        self._clock.tick(scene.frame_rate())
+                        for event in pygame.event.get():
+                            scene.process_event(event)
+                        scene.update_scene()
+                        scene.draw()
+                        scene.render_updates()
+                        pygame.display.update()
+                        if (
+                            next_scene is None
+                            and upcoming is not None
+                            and not upcoming.is_prepared()
+                        ):
+                            # Wait for the scene's first frame so the
+                            # prefetch does not delay it.
+                            next_scene = prefetcher.submit(
+                                upcoming.prepare_scene
+                            )
+                    scene.end_scene()
+                self._game_is_over = True
         pygame.quit()
         sys.exit(0)
 
@@ -87,14 +130,19 @@ class VideoGame:
 class BounceDemo(VideoGame):
     """Bouncing balls demo."""
 
-    def __init__(self, num_balls):
-        """Init the bouncing balls demo."""
-        super().__init__(window_title="Bouncing Balls")
+    def __init__(self, num_balls, replay_path=None, vsync=False, options=None):
+        """Init the bouncing balls demo. When replay_path is given a
+        recording is played back in place of the bouncing scene, and vsync
+        asks for a window synced to the display. The bouncing scene is set
+        up by options, a SceneOptions, which it is given as it is."""
+        super().__init__(window_title="Bouncing Balls", vsync=vsync)
         self._main_dir = os.path.split(os.path.abspath(__file__))[0]
         self._data_dir = os.path.join(self._main_dir, "data")
         print(f"Our main directory is {self._main_dir}")
         print(f"Our data directory is {self._data_dir}")
         self._num_balls = num_balls
+        self._replay_path = replay_path
+        self._options = options
 
     def build_scene_graph(self):
         """Bouncing balls scene graph."""
@@ -104,6 +152,19 @@ class BounceDemo(VideoGame):
         credits_string = 'Programmed by: Nicholas Girmes Sound Effects: \
             Monkey.aiff and Boing.aiff from Mac OS 7. Soundtrack: Jack Pearcy, \
                 "Warm Rays, Good Waves", Deep Lake Records. Images: explosion1.gif from Pygame.'
+        if self._replay_path:
+            main_scene = ReplayScene(
+                self._screen, self._replay_path, rgbcolors.black, soundtrack
+            )
+        else:
+            main_scene = BouncingBallsScene(
+                self._num_balls,
+                self._screen,
+                rgbcolors.black,
+                60,
+                soundtrack,
+                self._options,
+            )
         self._scene_graph = [
             BlinkingTitle(
                 self._screen,
@@ -113,9 +174,7 @@ class BounceDemo(VideoGame):
                 rgbcolors.yellow,
                 soundtrack,
             ),
-            BouncingBallsScene(
-                self._num_balls, self._screen, rgbcolors.black, 60, soundtrack
-            ),
+            main_scene,
             SplashScene(self._screen, credits_string, soundtrack),
         ]
 
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""Heatmaps of where the balls spend their time and where they collide.
+
+The world is split into square cells and two histograms count, every
+step, how many ball centers are in each cell and how many collisions
+happened in it. The centers are gathered into an array and counted with
+one np.bincount of their cell indices, so a step adds O(N) NumPy work
+and no Python loop over the balls. A collision is already resolved in
+Python, so it only adds the two centers to a list, and the step's
+contact points are counted the same way.
+
+Drawn over the screen, the counts go through a log scale to colors from
+dark red to white, one pixel per cell stretched to the cell's size, and
+are added onto what is there, so cells nothing has touched add black
+and are left clear. Saved, the histograms are the arrays of an .npz
+file."""
+
+import numpy as np
+import pygame
+from game.lod import centers
+
+# The side of a cell, in pixels of the world.
+CELL = 16
+
+# How bright the overlay is, out of 255.
+ALPHA = 160
+
+# The colors counts are added with, from none to the most: black, which
+# leaves the screen as it is, then through red and yellow to white.
+_LEVELS = np.linspace(0.0, 1.0, 256)
+_COLORS = np.stack(
+    [
+        np.clip(0.25 + 0.75 * 3 * _LEVELS, 0, 1),
+        np.clip(3 * _LEVELS - 1, 0, 1),
+        np.clip(3 * _LEVELS - 2, 0, 1),
+    ],
+    axis=1,
+)
+_COLORS = (_COLORS * ALPHA).astype(np.uint8)
+_COLORS[0] = (0, 0, 0)
+
+
+class Heatmap:
+    """Histograms of ball positions and collisions over the world."""
+
+    def __init__(self, world_size, cell=CELL):
+        """Count into cells of cell pixels over a world of world_size,
+        (width, height)."""
+        (width, height) = world_size
+        self._world_size = (width, height)
+        self._cell = cell
+        # Indexed [column, row], like pygame.surfarray.
+        self._shape = (-(-int(width) // cell), -(-int(height) // cell))
+        self._occupancy = np.zeros(self._shape, np.int64)
+        self._collisions = np.zeros(self._shape, np.int64)
+        self._steps = 0
+        # The sums of the centers of the pairs that touched this step, x
+        # and y one after the other.
+        self._contacts = []
+
+    @property
+    def steps(self):
+        """Return how many steps have been counted."""
+        return self._steps
+
+    @property
+    def occupancy(self):
+        """Return how many ball centers each cell held, summed over the
+        steps, indexed [column, row]."""
+        return self._occupancy
+
+    @property
+    def collisions(self):
+        """Return how many collisions happened in each cell, indexed
+        [column, row]."""
+        return self._collisions
+
+    def __str__(self):
+        return (
+            f"heatmap of {self._shape[0]}x{self._shape[1]} cells over"
+            f" {self._steps} steps, {self._collisions.sum()} collisions"
+        )
+
+    def touched(self, ball, other_ball):
+        """Note that ball and other_ball collided, halfway between
+        them."""
+        self._contacts.extend(ball.center + other_ball.center)
+
+    def add(self, balls):
+        """Count where balls are and the collisions since the last
+        step."""
+        self._occupancy += self._count(centers(balls))
+        if self._contacts:
+            contacts = np.array(self._contacts).reshape(-1, 2)
+            self._collisions += self._count(contacts * 0.5)
+            self._contacts.clear()
+        self._steps += 1
+
+    def _count(self, points):
+        """Return how many of points, an (N, 2) array, are in each
+        cell."""
+        (columns, rows) = self._shape
+        # Multiplying and truncating is a few times faster than dividing
+        # with //, and the points off the world's low edges are clipped
+        # into it anyway.
+        cells = (points * (1 / self._cell)).astype(np.intp)
+        np.clip(cells[:, 0], 0, columns - 1, out=cells[:, 0])
+        np.clip(cells[:, 1], 0, rows - 1, out=cells[:, 1])
+        return np.bincount(
+            cells[:, 0] * rows + cells[:, 1], minlength=columns * rows
+        ).reshape(self._shape)
+
+    def clear(self):
+        """Forget the counts."""
+        self._occupancy[:] = 0
+        self._collisions[:] = 0
+        self._steps = 0
+        self._contacts.clear()
+
+    def save(self, path):
+        """Write the histograms to an .npz file at path."""
+        np.savez(
+            path,
+            occupancy=self._occupancy,
+            collisions=self._collisions,
+            cell=self._cell,
+            steps=self._steps,
+            world_size=self._world_size,
+        )
+
+    def draw(self, surface, collisions=False, scale=1.0, offset=(0, 0)):
+        """Draw the occupancy, or the collisions if collisions is set, over
+        surface, the world times scale and moved back by offset. Only the
+        cells on the surface are colored and stretched."""
+        counts = self._collisions if collisions else self._occupancy
+        size = self._cell * scale
+        (width, height) = surface.get_size()
+        (columns, rows) = self._shape
+        left = min(max(int(offset[0] // size), 0), columns)
+        top = min(max(int(offset[1] // size), 0), rows)
+        right = min(max(-int(-(offset[0] + width) // size), 0), columns)
+        bottom = min(max(-int(-(offset[1] + height) // size), 0), rows)
+        if left == right or top == bottom or not counts.any():
+            return
+        # A log scale, so the cells visited now and then still show, and
+        # a cell counted at all gets at least the first color.
+        shown = counts[left:right, top:bottom]
+        levels = 1 + np.log1p(shown) * (254 / np.log1p(counts.max()))
+        levels[shown == 0] = 0
+        image = pygame.transform.scale(
+            pygame.surfarray.make_surface(_COLORS[levels.astype(np.uint8)]),
+            (
+                round((right - left) * size),
+                round((bottom - top) * size),
+            ),
+        )
+        # Adding is many times faster than blending through a colorkey
+        # into a surface made new every frame.
+        surface.blit(
+            image,
+            (left * size - offset[0], top * size - offset[1]),
+            special_flags=pygame.BLEND_ADD,
+        )
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""Name labels drawn from one shared atlas of glyphs.
+
+Every one and two digit string is rendered once, side by side in a
+single surface. A label is then a row of subsurfaces of it, two
+characters at a time, and every label on screen is drawn with one
+Surface.blits call, so neither memory nor drawing time grows with a
+surface per ball. The glyphs are not antialiased: a color keyed blit
+is about twice as fast as an alpha blended one."""
+
+import pygame
+from game import rgbcolors
+
+DIGITS = "0123456789"
+
+
+class GlyphAtlas:
+    """Glyphs of one font and color, packed side by side in a surface."""
+
+    def __init__(self, size, color=rgbcolors.black):
+        """Render the digits and pairs of digits in the default font at
+        size, in color. Any other pieces of text are added the first time
+        a label uses them."""
+        self._font = pygame.font.SysFont(None, size)
+        self._color = color
+        self._glyphs = {}
+        self._height = 0
+        # Each label's glyphs and their offsets from its center.
+        self._layouts = {}
+        pairs = [first + second for first in DIGITS for second in DIGITS]
+        self._render(list(DIGITS) + pairs)
+
+    def _render(self, pieces):
+        """Render the atlas over again with pieces, strings of one or two
+        characters, in it."""
+        pieces = sorted(set(pieces) | self._glyphs.keys())
+        rendered = [
+            self._font.render(piece, False, self._color) for piece in pieces
+        ]
+        self._height = max(text.get_height() for text in rendered)
+        atlas = pygame.Surface(
+            (sum(text.get_width() for text in rendered), self._height)
+        )
+        # Any color but the glyphs' is transparent.
+        key = tuple(255 - channel for channel in self._color[:3])
+        atlas.fill(key)
+        atlas.set_colorkey(key)
+        self._glyphs = {}
+        left = 0
+        for (piece, text) in zip(pieces, rendered):
+            atlas.blit(text, (left, 0))
+            self._glyphs[piece] = atlas.subsurface(
+                (left, 0, text.get_width(), self._height)
+            )
+            left += text.get_width()
+        self._layouts.clear()
+
+    def layout(self, name):
+        """Return the glyphs of a label for name, each with its offset from
+        the center of the label."""
+        layout = self._layouts.get(name)
+        if layout is None:
+            text = str(name)
+            pieces = [text[i:i + 2] for i in range(0, len(text), 2)]
+            missing = set(pieces) - self._glyphs.keys()
+            if missing:
+                self._render(missing)
+            glyphs = [self._glyphs[piece] for piece in pieces]
+            width = sum(glyph.get_width() for glyph in glyphs)
+            offset = pygame.Vector2(-(width // 2), -(self._height // 2))
+            layout = []
+            for glyph in glyphs:
+                layout.append((glyph, pygame.Vector2(offset)))
+                offset.x += glyph.get_width()
+            layout = self._layouts[name] = tuple(layout)
+        return layout
+
+    def blits(self, surface, balls, scale=1.0, view_offset=(0, 0)):
+        """Draw the name of each ball centered on it, in one batch. The
+        centers are times scale and moved back by view_offset."""
+        layouts = self._layouts
+        # Adding Vector2s is quicker than unpacking the centers.
+        if scale == 1 and not any(view_offset):
+            centers = (ball.center for ball in balls)
+        else:
+            view_offset = pygame.Vector2(view_offset)
+            centers = (ball.center * scale - view_offset for ball in balls)
+        sequence = [
+            (glyph, center + offset)
+            for (ball, center) in zip(balls, centers)
+            for (glyph, offset) in (
+                layouts.get(ball.name) or self.layout(ball.name)
+            )
+        ]
+        surface.blits(sequence, False)
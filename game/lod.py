@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""Drawing many balls with less detail the smaller they are on screen.
+
+Balls are drawn as circles while drawing fits in its share of a frame.
+Once it does not, the balls smaller than a few pixels are written
+straight into the screen's pixels as single points, all at once, instead
+of one pygame.draw.circle call each, and the size below which balls are
+points goes up until drawing fits again.
+
+A circle only a pixel or two across costs pygame.draw.circle about as
+much as gathering the ball's color and position for a point does, so
+small balls are only turned into points when time runs short. Caching
+small circle sprites and drawing them with one Surface.blits call, a
+level between the two, was tried and dropped: picking and placing each
+ball's sprite cost more than pygame.draw.circle at every radius."""
+
+from itertools import chain
+from operator import attrgetter
+import time
+import numpy as np
+import pygame
+
+# Radii in pixels: once drawing is too slow, balls smaller than
+# POINT_RADIUS times the pressure are drawn as points. Names are only
+# drawn on balls of at least LABEL_RADIUS.
+POINT_RADIUS = 1.5
+LABEL_RADIUS = 10
+
+# The most the point radius is raised when drawing is too slow.
+MAX_PRESSURE = 16.0
+
+_radius = attrgetter("radius")
+_center = attrgetter("center")
+_color = attrgetter("color")
+_palette_index = attrgetter("palette_index")
+
+
+def radii(balls):
+    """Return the radius of each ball in an array."""
+    return np.fromiter(map(_radius, balls), float, len(balls))
+
+
+def packed_colors(balls):
+    """Return the color of each ball packed into an int, 0xRRGGBBAA."""
+    return np.fromiter(map(int, map(_color, balls)), np.uint32, len(balls))
+
+
+def centers(balls):
+    """Return the centers of balls as an (N, 2) array."""
+    count = len(balls)
+    return np.fromiter(
+        chain.from_iterable(map(_center, balls)), float, count * 2
+    ).reshape(count, 2)
+
+
+def color_getter(surface):
+    """Return a function giving the color to draw a ball with into
+    surface: its palette index for an 8 bit surface."""
+    return _palette_index if surface.get_bytesize() == 1 else _color
+
+
+def pixel_values(surface, balls):
+    """Return the pixel values of surface for the colors of balls."""
+    if surface.get_bytesize() == 1:
+        return np.fromiter(map(_palette_index, balls), np.uint8, len(balls))
+    return map_colors(surface, packed_colors(balls))
+
+
+def map_colors(surface, colors):
+    """Return the pixel values of surface for packed colors, the way
+    Surface.map_rgb does."""
+    (shifts, losses) = (surface.get_shifts(), surface.get_losses())
+    mapped = np.full(len(colors), surface.get_masks()[3], np.uint32)
+    for channel in range(3):
+        value = (colors >> (24 - 8 * channel)) & 0xFF
+        mapped |= (value >> losses[channel]) << shifts[channel]
+    return mapped
+
+
+class LevelOfDetail:
+    """Draws balls as circles or points by their size."""
+
+    def __init__(
+        self, budget=None, point_radius=POINT_RADIUS, label_radius=LABEL_RADIUS
+    ):
+        """Draw balls as circles. If budget, in seconds, is given, draw the
+        ones smaller than a raised point_radius pixels as points while
+        drawing the balls takes longer than budget."""
+        self._budget = budget
+        self._point_radius = point_radius
+        self._label_radius = label_radius
+        self._pressure = 1.0
+        self._counts = (0, 0)
+
+    @property
+    def pressure(self):
+        """Return how many times the point radius is raised, 1 when every
+        ball is drawn as a circle."""
+        return self._pressure
+
+    @property
+    def counts(self):
+        """Return how many balls the last draw drew as circles and as
+        points."""
+        return self._counts
+
+    def __str__(self):
+        (circles, points) = self._counts
+        return (
+            f"{circles} circles, {points} points,"
+            f" point radius x{self._pressure:.2f}"
+        )
+
+    def draw(self, surface, balls, scale=1.0, offset=(0, 0)):
+        """Draw balls, with their positions and sizes times scale and then
+        moved back by offset, and return the ones big enough to label."""
+        start = time.perf_counter()
+        label_radius = self._label_radius
+        labeled = []
+        (circles, points) = (balls, [])
+        if self._pressure > 1:
+            point_radius = self._point_radius * self._pressure
+            label_radius = max(label_radius, point_radius / scale)
+            small = radii(balls) * scale < point_radius
+            if small.any():
+                circles = [balls[i] for i in np.flatnonzero(~small).tolist()]
+                points = [balls[i] for i in np.flatnonzero(small).tolist()]
+        if scale == 1 and not any(offset) and surface.get_bytesize() != 1:
+            for ball in circles:
+                radius = ball.radius
+                pygame.draw.circle(surface, ball.color, ball.center, radius)
+                if radius >= label_radius:
+                    labeled.append(ball)
+        else:
+            color = color_getter(surface)
+            offset = pygame.Vector2(offset)
+            for ball in circles:
+                radius = ball.radius
+                pygame.draw.circle(
+                    surface,
+                    color(ball),
+                    ball.center * scale - offset,
+                    radius * scale,
+                )
+                if radius >= label_radius:
+                    labeled.append(ball)
+        if points:
+            self._draw_points(surface, points, scale, offset)
+        self._counts = (len(circles), len(points))
+        if self._budget:
+            self._adjust(time.perf_counter() - start)
+        return labeled
+
+    @staticmethod
+    def _draw_points(surface, balls, scale=1.0, offset=(0, 0)):
+        """Set the pixel under the center of each ball, times scale and
+        moved back by offset, to its color."""
+        (width, height) = surface.get_size()
+        where = np.floor(centers(balls) * scale - offset).astype(np.intp)
+        inside = (where[:, 0] >= 0) & (where[:, 0] < width)
+        inside &= (where[:, 1] >= 0) & (where[:, 1] < height)
+        if surface.get_bytesize() == 3:
+            # pixels2d needs whole 8, 16 or 32 bit pixels.
+            for i in np.flatnonzero(inside).tolist():
+                surface.set_at(where[i].tolist(), balls[i].color)
+            return
+        colors = pixel_values(surface, balls)[inside]
+        where = where[inside]
+        pixels = pygame.surfarray.pixels2d(surface)
+        pixels[where[:, 0], where[:, 1]] = colors
+        del pixels
+
+    def _adjust(self, elapsed):
+        """Raise the point radius if drawing took longer than the budget,
+        lower it again once drawing takes well under it."""
+        if elapsed > self._budget:
+            self._pressure = min(MAX_PRESSURE, self._pressure * 1.5)
+        elif elapsed < self._budget / 2:
+            self._pressure = max(1.0, self._pressure / 1.5)
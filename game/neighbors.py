@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""Verlet neighbor lists for the stepping engine.
+
+Every ball is listed with the balls within the sum of their radii plus a
+skin distance. Until the two balls that have moved furthest from where
+they were when the list was built have moved the skin together, no ball
+outside the list can have come close enough to touch, so only the listed
+pairs need to be checked and the list is reused frame after frame. The
+list is checked once the balls have moved for the frame, so pushes off
+of the walls and obstacles count, and again for the balls pushed apart
+during the frame, so the list never misses a pair. A thicker skin means
+fewer rebuilds but more pairs to check every frame; the skin can be
+tuned as the scene runs by timing both.
+
+The list is built by binning the balls into square cells at least as wide
+as the widest reach, so only the pairs in the same or neighboring cells
+are measured: O(N) work for balls spread over the arena instead of a
+distance between every two balls. The swept engine finds the balls that
+can meet within a step the same way."""
+
+from time import perf_counter
+import math
+import numpy as np
+from game.recording import gather
+
+# The cells, after the ball's own one, whose balls are paired with it. The
+# other four neighbors see the ball from their side.
+_HALF_NEIGHBORHOOD = ((1, 0), (-1, 1), (0, 1), (1, 1))
+
+
+def _ranges(starts, stops):
+    """Return the index pairs (i, k) for every k from starts[i] up to
+    stops[i], without a Python loop."""
+    counts = stops - starts
+    total = int(counts.sum())
+    firsts = np.repeat(np.arange(len(starts)), counts)
+    skipped = np.repeat(np.cumsum(counts) - counts - starts, counts)
+    return (firsts, np.arange(total) - skipped)
+
+
+def _binned_pairs(positions, cell):
+    """Return the index pairs of points in the same or neighboring square
+    cells of side cell, each pair once."""
+    cells = np.floor(positions * (1 / cell)).astype(np.int64)
+    cells -= cells.min(axis=0)
+    # A spare column on each side, so no neighbor wraps to a row.
+    columns = int(cells[:, 0].max()) + 3
+    keys = cells[:, 1] * columns + cells[:, 0] + 1
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    ranks = np.arange(len(keys))
+    # The points after each one in its own cell.
+    starts = [ranks + 1]
+    stops = [np.searchsorted(keys, keys, "right")]
+    for (across, down) in _HALF_NEIGHBORHOOD:
+        neighbor = keys + (down * columns + across)
+        starts.append(np.searchsorted(keys, neighbor, "left"))
+        stops.append(np.searchsorted(keys, neighbor, "right"))
+    (firsts, seconds) = _ranges(np.concatenate(starts), np.concatenate(stops))
+    return (order[firsts % len(keys)], order[seconds])
+
+
+def neighbor_lists(positions, reaches):
+    """Return, for each of positions, an (N, 2) array, the indices of the
+    other positions closer than the sum of their reaches, in increasing
+    order. The positions are binned into cells as wide as the two widest
+    reaches, so only the pairs in the same or neighboring cells are
+    measured."""
+    num_points = len(positions)
+    if num_points < 2:
+        return [[] for _ in range(num_points)]
+    (firsts, seconds) = _binned_pairs(positions, 2 * reaches.max())
+    offsets = positions[firsts] - positions[seconds]
+    reach = reaches[firsts] + reaches[seconds]
+    close = np.einsum("ij,ij->i", offsets, offsets) < reach * reach
+    (firsts, seconds) = (firsts[close], seconds[close])
+    # Both ways round, each point's list in increasing order.
+    points = np.concatenate((firsts, seconds))
+    others = np.concatenate((seconds, firsts))
+    order = np.lexsort((others, points))
+    ends = np.cumsum(np.bincount(points, minlength=num_points)).tolist()
+    others = others[order].tolist()
+    return [others[start:end] for (start, end) in zip([0] + ends, ends)]
+
+
+class NeighborList:
+    """Candidate pairs of touching balls, rebuilt only when stale."""
+
+    def __init__(self, skin=8.0, tune=False, tune_frames=120):
+        """Use a skin of skin pixels. When tune is set the skin is grown
+        or shrunk after every tune_frames frames, whichever made the
+        frames cheaper."""
+        self._skin = skin
+        self._tune = tune
+        self._tune_frames = tune_frames
+        self._balls = None
+        self._neighbors = []
+        self._built_at = None
+        # The two largest drifts since the build, or more than them.
+        self._largest = [0.0, 0.0]
+        self._margin = 0.0
+        self._positions = None
+        self._velocities = None
+        self._alive = None
+        self._frames = 0
+        self._builds = 0
+        self._listed = 0
+        # How long the frames since the last skin change took, and the
+        # cost per frame and direction of the previous change.
+        self._start = 0.0
+        self._window_frames = 0
+        self._window_time = 0.0
+        self._last_cost = None
+        self._step = 1.5
+
+    @property
+    def skin(self):
+        """Return the skin distance in pixels."""
+        return self._skin
+
+    @property
+    def frames(self):
+        """Return the number of frames the list has been used for."""
+        return self._frames
+
+    @property
+    def builds(self):
+        """Return the number of times the list has been built."""
+        return self._builds
+
+    @property
+    def rebuild_rate(self):
+        """Return the fraction of frames that rebuilt the list."""
+        return self._builds / max(1, self._frames)
+
+    @property
+    def mean_pairs(self):
+        """Return the mean number of pairs listed per frame."""
+        return self._listed / max(1, self._frames)
+
+    @property
+    def neighbors(self):
+        """Return, for each ball, the indices of the balls it may touch,
+        in increasing order."""
+        return self._neighbors
+
+    def _drifts(self):
+        """Return how far each ball is from where the list was built."""
+        moved = self._positions - self._built_at
+        return np.sqrt(np.einsum("ij,ij->i", moved, moved))
+
+    @staticmethod
+    def _two_largest(values):
+        """Return the two largest values, or fewer for fewer values."""
+        if len(values) < 2:
+            return values.tolist()
+        return np.partition(values, len(values) - 2)[-2:].tolist()
+
+    def _build(self):
+        """List every pair of balls within reach plus the skin."""
+        radii = np.array([ball.radius for ball in self._balls])
+        speeds = np.sqrt(
+            np.einsum("ij,ij->i", self._velocities, self._velocities)
+        )
+        self._margin = sum(self._two_largest(speeds))
+        self._neighbors = neighbor_lists(
+            self._positions, radii + 0.5 * self._skin
+        )
+        self._built_at = self._positions.copy()
+        self._largest = [0.0, 0.0]
+        self._builds += 1
+
+    def _is_stale(self):
+        """Could a ball outside the list touch another one now? A pair
+        listed apart can only touch once the distances both balls have
+        moved since the build add up to the skin."""
+        if self._balls is None:
+            return True
+        self._largest = self._two_largest(self._drifts())
+        return sum(self._largest) > self._skin
+
+    def invalidate(self):
+        """Rebuild the list next frame, such as after balls were added or
+        removed."""
+        self._balls = None
+
+    def start_frame(self, balls):
+        """Return, for each ball, the indices of the balls it may touch
+        this frame, rebuilding the lists first if they are stale. Call it
+        once the balls have moved for the frame."""
+        self._start = perf_counter()
+        if balls is not self._balls or len(balls) != len(self._neighbors):
+            num_balls = len(balls)
+            self._positions = np.zeros((num_balls, 2))
+            self._velocities = np.zeros((num_balls, 2))
+            self._alive = np.zeros(num_balls, np.bool_)
+            self._balls = None
+        gather(balls, self._positions, self._velocities, self._alive)
+        if self._is_stale():
+            self._balls = balls
+            self._build()
+        self._frames += 1
+        self._listed += sum(map(len, self._neighbors)) // 2
+        return self._neighbors
+
+    def pushed(self, *indices):
+        """Note that the balls at indices were moved since start_frame(),
+        such as pushed apart from each other. Return True if that made the
+        list stale; it is then built again from where the balls are now,
+        and neighbors holds the new lists."""
+        built_at = self._built_at
+        for i in indices:
+            (x, y) = self._balls[i].center
+            drift = math.hypot(x - built_at[i, 0], y - built_at[i, 1])
+            # Keeping the ball's older drift too only overestimates.
+            self._largest = sorted(self._largest + [drift])[-2:]
+        if sum(self._largest) <= self._skin:
+            return False
+        gather(self._balls, self._positions, self._velocities, self._alive)
+        self._build()
+        return True
+
+    def end_frame(self):
+        """Note that the frame is over; it times the frame for tuning."""
+        if not self._tune:
+            return
+        self._window_time += perf_counter() - self._start
+        self._window_frames += 1
+        if self._window_frames < self._tune_frames:
+            return
+        cost = self._window_time / self._window_frames
+        if self._last_cost is not None and cost > self._last_cost:
+            # The last change made it worse, go back the other way.
+            self._step = 1 / self._step
+        self._last_cost = cost
+        # A skin thinner than the fastest balls move in a frame has the
+        # list rebuilt every frame anyway, so there is nothing to learn
+        # below it.
+        self._skin = min(200.0, max(self._margin, self._skin * self._step))
+        self._window_frames = 0
+        self._window_time = 0.0
+        # Force a rebuild with the new skin.
+        self._balls = None
+
+    def __str__(self):
+        return (
+            f"Neighbor list: {self._builds} builds in {self._frames} frames"
+            f" ({self.rebuild_rate:.1%}), {self.mean_pairs:.1f} pairs per"
+            f" frame, skin {self._skin:.1f} px"
+        )
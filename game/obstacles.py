@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""Static obstacles the balls bounce off of, such as mazes.
+
+Obstacles are line segments and circles read from a JSON scene
+description:
+
+    {"segments": [[x1, y1, x2, y2], ...], "circles": [[x, y, radius], ...]}
+
+They never move, so they are indexed once into a bounding volume
+hierarchy and each ball only tests the few obstacles whose boxes
+overlap its own."""
+
+import json
+from math import sqrt
+import pygame
+
+
+class Segment:
+    """A line segment from (x1, y1) to (x2, y2)."""
+
+    __slots__ = ("_start", "_end", "_box")
+
+    def __init__(self, x1, y1, x2, y2):
+        self._start = (x1, y1)
+        self._end = (x2, y2)
+        self._box = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+
+    @property
+    def box(self):
+        """Return the bounding box, (xmin, ymin, xmax, ymax)."""
+        return self._box
+
+    def contact(self, x, y, radius):
+        """Return the unit normal pointing from the segment to a circle at
+        (x, y) and how deep the circle is in the segment, or None if they
+        do not touch."""
+        ((x1, y1), (x2, y2)) = (self._start, self._end)
+        (dx, dy) = (x2 - x1, y2 - y1)
+        length = dx * dx + dy * dy
+        along = 0.0
+        if length:
+            along = ((x - x1) * dx + (y - y1) * dy) / length
+            along = min(1.0, max(0.0, along))
+        (nx, ny) = (x - x1 - along * dx, y - y1 - along * dy)
+        distance = sqrt(nx * nx + ny * ny)
+        if distance >= radius:
+            return None
+        if not distance:
+            # The center is on the segment, push it out sideways.
+            scale = sqrt(length) or 1.0
+            return (-dy / scale, dx / scale, radius)
+        return (nx / distance, ny / distance, radius - distance)
+
+    def draw(self, surface, color, scale=1.0, offset=(0, 0)):
+        """Draw the segment, times scale and moved back by offset."""
+        offset = pygame.Vector2(offset)
+        pygame.draw.line(
+            surface,
+            color,
+            pygame.Vector2(self._start) * scale - offset,
+            pygame.Vector2(self._end) * scale - offset,
+            max(1, round(3 * scale)),
+        )
+
+
+class CircleObstacle:
+    """A solid circle centered at (x, y)."""
+
+    __slots__ = ("_center", "_radius", "_box")
+
+    def __init__(self, x, y, radius):
+        self._center = (x, y)
+        self._radius = radius
+        self._box = (x - radius, y - radius, x + radius, y + radius)
+
+    @property
+    def box(self):
+        """Return the bounding box, (xmin, ymin, xmax, ymax)."""
+        return self._box
+
+    def contact(self, x, y, radius):
+        """Return the unit normal pointing from the obstacle to a circle at
+        (x, y) and how deep the circle is in the obstacle, or None if they
+        do not touch."""
+        (nx, ny) = (x - self._center[0], y - self._center[1])
+        reach = self._radius + radius
+        squared_distance = nx * nx + ny * ny
+        if squared_distance >= reach * reach:
+            return None
+        distance = sqrt(squared_distance)
+        if not distance:
+            return (0.0, -1.0, reach)
+        return (nx / distance, ny / distance, reach - distance)
+
+    def draw(self, surface, color, scale=1.0, offset=(0, 0)):
+        """Draw the circle, times scale and moved back by offset."""
+        pygame.draw.circle(
+            surface,
+            color,
+            pygame.Vector2(self._center) * scale - pygame.Vector2(offset),
+            self._radius * scale,
+        )
+
+
+def load_obstacles(path):
+    """Return the obstacles in the JSON scene description at path."""
+    with open(path, encoding="utf-8") as description_file:
+        description = json.load(description_file)
+    obstacles = [
+        Segment(*points) for points in description.get("segments", [])
+    ]
+    obstacles += [
+        CircleObstacle(*circle) for circle in description.get("circles", [])
+    ]
+    return obstacles
+
+
+class BoundingVolumeHierarchy:
+    """A tree of boxes around static obstacles. Each node's box holds its
+    children's boxes, and each leaf holds a few obstacles, so finding the
+    obstacles near a ball visits O(log m) nodes."""
+
+    def __init__(self, obstacles, leaf_size=4):
+        """Build the tree over obstacles, splitting a node in half along
+        its longer side until it has at most leaf_size obstacles."""
+        self._obstacles = list(obstacles)
+        self._leaf_size = leaf_size
+        # Nodes are flat tuples, (xmin, ymin, xmax, ymax, first, count,
+        # right). A leaf holds count obstacles from first on; an inner
+        # node has count 0, its left child right after it and its right
+        # child at index right.
+        self._nodes = []
+        if self._obstacles:
+            self._build(0, len(self._obstacles))
+
+    def __len__(self):
+        return len(self._obstacles)
+
+    @property
+    def obstacles(self):
+        """Return the obstacles, in the tree's order."""
+        return self._obstacles
+
+    @property
+    def depth(self):
+        """Return the number of levels in the tree."""
+        depths = [0] * len(self._nodes)
+        for (index, node) in enumerate(self._nodes):
+            if not node[5]:
+                depths[index + 1] = depths[node[6]] = depths[index] + 1
+        return max(depths, default=-1) + 1
+
+    def _build(self, first, last):
+        """Build the node for obstacles[first:last], return its index."""
+        boxes = [obstacle.box for obstacle in self._obstacles[first:last]]
+        box = (
+            min(b[0] for b in boxes),
+            min(b[1] for b in boxes),
+            max(b[2] for b in boxes),
+            max(b[3] for b in boxes),
+        )
+        index = len(self._nodes)
+        if last - first <= self._leaf_size:
+            self._nodes.append((*box, first, last - first, 0))
+            return index
+        self._nodes.append(None)
+        axis = 0 if box[2] - box[0] >= box[3] - box[1] else 1
+        self._obstacles[first:last] = sorted(
+            self._obstacles[first:last],
+            key=lambda obstacle: obstacle.box[axis] + obstacle.box[axis + 2],
+        )
+        middle = (first + last) // 2
+        self._build(first, middle)
+        right = self._build(middle, last)
+        self._nodes[index] = (*box, first, 0, right)
+        return index
+
+    def query(self, xmin, ymin, xmax, ymax):
+        """Return the obstacles whose boxes overlap the box."""
+        found = []
+        if not self._nodes:
+            return found
+        nodes = self._nodes
+        stack = [0]
+        while stack:
+            index = stack.pop()
+            (left, top, right, bottom, first, count, other) = nodes[index]
+            if left > xmax or right < xmin or top > ymax or bottom < ymin:
+                continue
+            if count:
+                for obstacle in self._obstacles[first:first + count]:
+                    box = obstacle.box
+                    if not (
+                        box[0] > xmax
+                        or box[2] < xmin
+                        or box[1] > ymax
+                        or box[3] < ymin
+                    ):
+                        found.append(obstacle)
+            else:
+                stack.append(other)
+                stack.append(index + 1)
+        return found
+
+    def collide(self, ball):
+        """Push ball out of every obstacle it overlaps and bounce it off of
+        them. Return True if it touched any."""
+        (x, y) = ball.center
+        radius = ball.radius
+        touched = False
+        nearby = self.query(x - radius, y - radius, x + radius, y + radius)
+        for obstacle in nearby:
+            contact = obstacle.contact(x, y, radius)
+            if contact:
+                ball.push_off(*contact)
+                (x, y) = ball.center
+                touched = True
+        return touched
+
+    def draw(self, surface, color, box=None, scale=1.0, offset=(0, 0)):
+        """Draw every obstacle, or only the ones overlapping box, (xmin,
+        ymin, xmax, ymax), times scale and moved back by offset."""
+        obstacles = self._obstacles if box is None else self.query(*box)
+        for obstacle in obstacles:
+            obstacle.draw(surface, color, scale, offset)
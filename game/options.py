@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""The options of the bouncing balls scene, gathered in one place so the
+demo can hand them to the scene as they are."""
+
+from dataclasses import dataclass
+
+
+@dataclass
+class SceneOptions:
+    """How the bouncing balls scene records, moves and draws its balls.
+
+    Recording: the trajectories are recorded to record_path until a ball
+    is spawned or despawned, as a recording holds a fixed set of balls.
+    The scene resumes from snapshot_path if it exists and saves to it
+    every snapshot_every steps. The rewind history uses up to
+    rewind_memory bytes, 0 turns it off, and goes on across spawns.
+
+    Physics: engine is "step" to move the balls frame by frame, "swept" to
+    move them physics_step frames at a time without missing collisions, or
+    "event" to jump from collision to collision. A neighbor_skin turns on
+    neighbor lists for the "step" engine, tuned as it runs if tune_skin is
+    set. The balls bounce off of the obstacles described in the JSON file
+    at obstacles_path. With quadtree set the "step" engine finds nearby
+    balls in a loose quadtree. Holding the left mouse button spawns
+    emit_rate balls a second at the mouse. A world_size, (width, height),
+    makes the arena that big, seen through a camera.
+
+    Rendering: the balls are drawn within draw_budget seconds a frame.
+    With stamp on, small balls are drawn by stamping them into the
+    screen's pixels, and with render_threads the screen is drawn in tiles
+    on that many threads. The balls are drawn at render_scale times the
+    window's resolution, lowered while frames run long with
+    dynamic_resolution set. With palette on the balls are drawn into 8 bit
+    pixels indexing a shared palette. With trails, a fraction between 0
+    and 1, the balls leave trails keeping that much of their brightness
+    every frame. With heatmap on, where the balls are and where they
+    collide is counted and, if heatmap_path is given, saved to it at the
+    end of the scene."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    # Recording.
+    record_path: str = None
+    snapshot_path: str = None
+    snapshot_every: int = None
+    rewind_memory: int = 16 * 2**20
+
+    # Physics.
+    engine: str = "step"
+    physics_step: float = 1
+    neighbor_skin: float = None
+    tune_skin: bool = False
+    obstacles_path: str = None
+    quadtree: bool = False
+    emit_rate: float = 60
+    world_size: tuple = None
+
+    # Rendering.
+    draw_budget: float = None
+    stamp: bool = False
+    render_threads: int = 0
+    render_scale: float = 1.0
+    dynamic_resolution: bool = False
+    palette: bool = False
+    trails: float = None
+    heatmap: bool = False
+    heatmap_path: str = None
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""A shared palette of 256 colors for drawing into 8 bit surfaces.
+
+The first 216 entries are a 6x6x6 color cube, six even levels of red,
+green and blue, and any color is quantized to the nearest level of each.
+The rest of the entries are kept for colors that have to be exact, like
+the color of a dead ball. A ball looks up its index into the palette
+the first time it is drawn into an 8 bit surface and keeps it next to
+its color until the color changes, so without a palette no ball looks
+one up at all.
+
+A pixel of an 8 bit surface is a quarter of the size of a 32 bit one,
+so filling and copying one moves a quarter of the bytes."""
+
+import pygame
+from game.ball import DEAD_COLOR
+
+# The levels of each channel in the color cube.
+LEVELS = 6
+_STEP = 255 // (LEVELS - 1)
+
+
+class Palette:
+    """256 colors: a color cube and a few exact colors."""
+
+    def __init__(self):
+        """Make a palette of the color cube alone."""
+        self._colors = [
+            pygame.Color(red * _STEP, green * _STEP, blue * _STEP)
+            for red in range(LEVELS)
+            for green in range(LEVELS)
+            for blue in range(LEVELS)
+        ]
+        # From a color packed into an int to its exact entry.
+        self._exact = {}
+
+    def __len__(self):
+        return len(self._colors)
+
+    def reserve(self, color):
+        """Add an exact entry for color and return its index. Surfaces made
+        before do not have it."""
+        key = int(pygame.Color(color))
+        if key not in self._exact:
+            if len(self._colors) == 256:
+                raise ValueError("The palette is full.")
+            self._exact[key] = len(self._colors)
+            self._colors.append(pygame.Color(color))
+        return self._exact[key]
+
+    def index(self, color):
+        """Return the index of color if it has an exact entry, or else of
+        the nearest color in the cube."""
+        color = pygame.Color(color)
+        index = self._exact.get(int(color))
+        if index is None:
+            (red, green, blue) = (
+                (channel + _STEP // 2) // _STEP for channel in color[:3]
+            )
+            index = (red * LEVELS + green) * LEVELS + blue
+        return index
+
+    def color(self, index):
+        """Return the color at index."""
+        return self._colors[index]
+
+    def surface(self, size):
+        """Return a new 8 bit surface of size using the palette."""
+        surface = pygame.Surface(size, 0, 8)
+        surface.set_palette(self._colors)
+        return surface
+
+
+# The palette every ball indexes into, with the dead balls' color exact.
+PALETTE = Palette()
+PALETTE.reserve(DEAD_COLOR)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""A loose quadtree broad phase for balls of very different sizes.
+
+Each level of the tree splits the arena into cells half the size of the
+level above. A ball is kept in a single cell: the one holding its center
+on the deepest level whose cells are at least twice its diameter. As
+every cell's contents reach at most a quarter cell past its edges,
+finding the balls that may touch a ball only needs the cells around it
+on each level, and a ball that moves is just taken out of one cell and put in
+another. Small balls live deep in the tree and big balls near the root,
+so neither crowds the other's cells as they would in a uniform grid."""
+
+from math import floor, log2
+
+
+class LooseQuadtree:
+    """The cells of a loose quadtree, holding ball indices."""
+
+    def __init__(self, bounds, max_depth=8):
+        """Cover bounds, (xmin, xmax, ymin, ymax), splitting it at most
+        max_depth times."""
+        (self._xmin, xmax, self._ymin, ymax) = bounds
+        self._size = max(xmax - self._xmin, ymax - self._ymin, 1)
+        self._max_depth = max_depth
+        self._widths = [
+            self._size / (1 << depth) for depth in range(max_depth + 1)
+        ]
+        # One dictionary of cells per level, from (column, row) to the
+        # indices in that cell, and the cell each index is kept in.
+        self._levels = [{} for _ in range(max_depth + 1)]
+        self._where = {}
+
+    def __len__(self):
+        return len(self._where)
+
+    def _depth(self, radius):
+        """Return the deepest level with cells at least four radii wide."""
+        if radius <= 0:
+            return self._max_depth
+        depth = floor(log2(self._size / (4 * radius)))
+        return min(self._max_depth, max(0, depth))
+
+    def _cell(self, depth, x, y):
+        """Return the cell on level depth holding the point (x, y)."""
+        cells = 1 << depth
+        width = self._widths[depth]
+        column = min(cells - 1, max(0, int((x - self._xmin) // width)))
+        row = min(cells - 1, max(0, int((y - self._ymin) // width)))
+        return (column, row)
+
+    def insert(self, index, x, y, radius):
+        """Add the ball index centered at (x, y)."""
+        depth = self._depth(radius)
+        cell = self._cell(depth, x, y)
+        self._levels[depth].setdefault(cell, []).append(index)
+        self._where[index] = (depth, cell)
+
+    def remove(self, index):
+        """Take the ball index out of the tree."""
+        (depth, cell) = self._where.pop(index)
+        members = self._levels[depth][cell]
+        members.remove(index)
+        if not members:
+            del self._levels[depth][cell]
+
+    def move(self, index, x, y, radius):
+        """Update the ball index, now centered at (x, y). Nothing changes
+        unless it left its cell or its size changed level."""
+        depth = self._depth(radius)
+        cell = self._cell(depth, x, y)
+        if self._where.get(index) != (depth, cell):
+            if index in self._where:
+                self.remove(index)
+            self._levels[depth].setdefault(cell, []).append(index)
+            self._where[index] = (depth, cell)
+
+    def near(self, x, y, radius):
+        """Return, in ascending order, the indices of the balls that may
+        overlap a circle of radius at (x, y)."""
+        return self.query(x - radius, x + radius, y - radius, y + radius)
+
+    def query(self, xmin, xmax, ymin, ymax):
+        """Return, in ascending order, the indices of the balls that may
+        overlap the box from (xmin, ymin) to (xmax, ymax)."""
+        found = []
+        (xmin, xmax) = (xmin - self._xmin, xmax - self._xmin)
+        (ymin, ymax) = (ymin - self._ymin, ymax - self._ymin)
+        for (depth, cells) in enumerate(self._levels):
+            if not cells:
+                continue
+            last = (1 << depth) - 1
+            width = self._widths[depth]
+            # Members reach at most a quarter cell past their own cell.
+            reach = width / 4
+            # Balls outside the arena are kept in its edge cells.
+            first_column = min(last, max(0, int((xmin - reach) // width)))
+            last_column = min(last, max(0, int((xmax + reach) // width)))
+            first_row = min(last, max(0, int((ymin - reach) // width)))
+            last_row = min(last, max(0, int((ymax + reach) // width)))
+            columns = last_column - first_column + 1
+            if columns * (last_row - first_row + 1) > len(cells):
+                # Fewer cells are in use than are in reach.
+                for ((column, row), members) in cells.items():
+                    if (
+                        first_column <= column <= last_column
+                        and first_row <= row <= last_row
+                    ):
+                        found.extend(members)
+            else:
+                for column in range(first_column, last_column + 1):
+                    for row in range(first_row, last_row + 1):
+                        members = cells.get((column, row))
+                        if members:
+                            found.extend(members)
+        found.sort()
+        return found
+
+    def rebuild(self, balls):
+        """Replace the contents with balls, indexed by their position in
+        the list."""
+        self._levels = [{} for _ in range(self._max_depth + 1)]
+        self._where = {}
+        for (index, ball) in enumerate(balls):
+            self.insert(index, *ball.center, ball.radius)
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""Record ball trajectories to a memory-mapped file and replay them.
+
+The file is a fixed header followed by fixed-width columns and then the
+frames. The per-ball columns (name, radius, color) are written once.
+Each frame is a fixed-size record of the step and every ball's position,
+velocity and alive flag, so frame n always lives at the same offset and
+seeking to it is a slice of the map. The file grows a chunk of frames at
+a time as the recording goes on, so a short run leaves a short file."""
+
+import numpy as np
+import pygame
+from game.ball import DEAD_COLOR
+
+MAGIC = b"BBTRAJ"
+VERSION = 2
+
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S6"),
+        ("version", "<u2"),
+        ("num_balls", "<u4"),
+        # The frames there is room for in the file so far.
+        ("capacity", "<u4"),
+        ("frames", "<u4"),
+        ("width", "<u4"),
+        ("height", "<u4"),
+    ]
+)
+
+_ALIGNMENT = 64
+
+
+def column_layout(columns, offset):
+    """Lay out (name, dtype, shape) columns one after the other starting
+    at offset, each aligned to a cache line. Return
+    {name: (offset, dtype, shape)} and the total file size."""
+    layout = {}
+    for (name, dtype, shape) in columns:
+        offset = -(-offset // _ALIGNMENT) * _ALIGNMENT
+        layout[name] = (offset, np.dtype(dtype), shape)
+        offset += np.dtype(dtype).itemsize * int(np.prod(shape))
+    return layout, offset
+
+
+def map_columns(path, mode, layout):
+    """Memory-map each column of a layout."""
+    return {
+        name: np.memmap(path, dtype, mode, offset, shape)
+        for (name, (offset, dtype, shape)) in layout.items()
+    }
+
+
+def _layout(num_balls):
+    """Return the layout of the per-ball columns of a trajectory file,
+    the dtype of its frames and the offset the frames start at."""
+    columns = [
+        ("name", "<i8", (num_balls,)),
+        ("radius", "<f4", (num_balls,)),
+        ("color", "u1", (num_balls, 3)),
+    ]
+    (layout, offset) = column_layout(columns, HEADER_DTYPE.itemsize)
+    frame_dtype = np.dtype(
+        [
+            ("step", "<i8"),
+            ("position", "<f4", (num_balls, 2)),
+            ("velocity", "<f4", (num_balls, 2)),
+            ("alive", "u1", (num_balls,)),
+        ]
+    )
+    return (layout, frame_dtype, -(-offset // _ALIGNMENT) * _ALIGNMENT)
+
+
+def elements(array):
+    """Return a flat memoryview of the elements of a C contiguous array,
+    for setting them one by one without NumPy making an array or a scalar
+    for each."""
+    return memoryview(array).cast("B").cast(array.dtype.char)
+
+
+def gather(balls, positions, velocities, alive, bounce_counts=None):
+    """Copy the state of each ball into preallocated, C contiguous arrays.
+    The elements are set one by one through memoryviews of the arrays, so
+    nothing the size of the balls is allocated; this is also faster than
+    building each column with np.fromiter and copying it in."""
+    position_elements = elements(positions)
+    velocity_elements = elements(velocities)
+    alive_elements = elements(alive)
+    x = 0
+    for (i, ball) in enumerate(balls):
+        (position_elements[x], position_elements[x + 1]) = ball.center
+        (velocity_elements[x], velocity_elements[x + 1]) = ball.velocity
+        alive_elements[i] = ball.is_alive
+        x += 2
+    if bounce_counts is not None:
+        count_elements = elements(bounce_counts)
+        for (i, ball) in enumerate(balls):
+            count_elements[i] = ball.bounce_count
+
+
+class TrajectoryRecorder:
+    """Stream the state of a fixed set of balls into a trajectory file."""
+
+    def __init__(self, path, balls, size, capacity=36000, chunk=600):
+        """Create the file at path and record up to capacity frames,
+        growing the file chunk frames at a time."""
+        self._path = path
+        self._capacity = capacity
+        self._chunk = chunk
+        self._frames = 0
+        num_balls = len(balls)
+        (layout, self._frame_dtype, self._frames_offset) = _layout(num_balls)
+        with open(path, "wb") as trajectory_file:
+            trajectory_file.truncate(self._frames_offset)
+        self._header = np.memmap(path, HEADER_DTYPE, "r+", 0, (1,))
+        self._header[0] = (MAGIC, VERSION, num_balls, 0, 0, *size)
+        self._columns = map_columns(path, "r+", layout)
+        for (i, ball) in enumerate(balls):
+            self._columns["name"][i] = int(ball.name)
+            self._columns["radius"][i] = ball.radius
+            self._columns["color"][i] = tuple(ball.color)[:3]
+        self._records = None
+        self._room = 0
+        self._grow()
+
+    def _grow(self):
+        """Make room in the file for another chunk of frames and map
+        them."""
+        if self._records is not None:
+            self._records.flush()
+            # Unmapped before the file changes size under it.
+            self._records = None
+        self._room = min(self._room + self._chunk, self._capacity)
+        with open(self._path, "r+b") as trajectory_file:
+            trajectory_file.truncate(
+                self._frames_offset + self._room * self._frame_dtype.itemsize
+            )
+        self._records = np.memmap(
+            self._path,
+            self._frame_dtype,
+            "r+",
+            self._frames_offset,
+            (self._room,),
+        )
+        self._header["capacity"][0] = self._room
+
+    @property
+    def frames(self):
+        """Return the number of frames recorded so far."""
+        return self._frames
+
+    def is_full(self):
+        """Has the recorder used all of its preallocated frames?"""
+        return self._frames >= self._capacity
+
+    def record(self, step, balls):
+        """Append the state of the balls at simulation step. Returns
+        False once the file is full."""
+        if self.is_full():
+            return False
+        frame = self._frames
+        if frame == self._room:
+            self._grow()
+        records = self._records
+        records["step"][frame] = step
+        gather(
+            balls,
+            records["position"][frame],
+            records["velocity"][frame],
+            records["alive"][frame],
+        )
+        self._frames += 1
+        self._header["frames"][0] = self._frames
+        return True
+
+    def close(self):
+        """Flush the recording to disk."""
+        self._header.flush()
+        for column in self._columns.values():
+            column.flush()
+        self._records.flush()
+
+
+class TrajectoryReplay:
+    """Read-only view of a trajectory file."""
+
+    def __init__(self, path):
+        """Map the trajectory file at path."""
+        header = np.memmap(path, HEADER_DTYPE, "r", 0, (1,))[0]
+        if header["magic"] != MAGIC or header["version"] != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} trajectory")
+        self._frames = int(header["frames"])
+        self._size = (int(header["width"]), int(header["height"]))
+        (layout, frame_dtype, frames_offset) = _layout(
+            int(header["num_balls"])
+        )
+        self._columns = map_columns(path, "r", layout)
+        self._records = np.memmap(
+            path,
+            frame_dtype,
+            "r",
+            frames_offset,
+            (max(1, int(header["capacity"])),),
+        )
+        self._colors = [
+            pygame.Color(*color) for color in self._columns["color"].tolist()
+        ]
+        self._radii = self._columns["radius"].tolist()
+
+    def __len__(self):
+        """Return the number of recorded frames."""
+        return self._frames
+
+    @property
+    def size(self):
+        """Return the size of the window the trajectory was recorded in."""
+        return self._size
+
+    def step(self, frame):
+        """Return the simulation step of a frame."""
+        return int(self._records["step"][frame])
+
+    def frame(self, frame):
+        """Return (positions, velocities, alive) arrays for a frame."""
+        return (
+            self._records["position"][frame],
+            self._records["velocity"][frame],
+            self._records["alive"][frame],
+        )
+
+    def draw(self, surface, frame):
+        """Draw every ball as it was in the given frame."""
+        (positions, _, alive) = self.frame(frame)
+        for (center, is_alive, color, radius) in zip(
+            positions.tolist(), alive.tolist(), self._colors, self._radii
+        ):
+            pygame.draw.circle(
+                surface, color if is_alive else DEAD_COLOR, center, radius
+            )
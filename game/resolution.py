@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""Drawing the scene at a lower resolution than the window.
+
+The balls are drawn into a canvas a fraction of the screen's size, which
+is then stretched over the screen. Filling and drawing cost grows with
+the number of pixels, so a canvas at half scale has a quarter of the
+pixels to fill. With a budget the scale is dynamic: it goes down while
+frames take longer than the budget and back up once they take well
+under it.
+
+The arena stays the size of the screen, so the balls move the same at
+any scale; only where they are drawn is scaled. With a palette the
+canvas is an 8 bit surface using it, at any scale."""
+
+import pygame
+
+# The smallest scale a dynamic resolution goes down to.
+MIN_SCALE = 0.25
+
+
+class RenderScale:
+    """A canvas at a fraction of the screen's resolution."""
+
+    def __init__(
+        self, scale=1.0, budget=None, min_scale=MIN_SCALE, palette=None
+    ):
+        """Draw at scale times the screen's resolution. If budget, in
+        seconds, is given, lower the scale, down to min_scale, while frames
+        take longer than budget and raise it again, up to scale, once they
+        take well under it. With a palette, a game.palette.Palette, draw
+        into 8 bit pixels."""
+        self._scale = scale
+        self._max_scale = scale
+        self._min_scale = min(min_scale, scale)
+        self._budget = budget
+        self._palette = palette
+        self._canvas = None
+        # An 8 bit canvas is stretched into this before the screen.
+        self._stretched = None
+        # Whether this frame made a new canvas, which makes it slow.
+        self._resized = False
+        # The static layer last scaled, and it scaled to the canvas.
+        self._layer = None
+        self._scaled_layer = None
+
+    @property
+    def scale(self):
+        """Return the fraction of the screen's resolution drawn at."""
+        return self._scale
+
+    def __str__(self):
+        if self._canvas is None:
+            return f"render scale {self._scale:.2f}"
+        (width, height) = self._canvas.get_size()
+        return (
+            f"render scale {self._scale:.2f}, {width}x{height}"
+            f" {self._canvas.get_bitsize()} bit"
+        )
+
+    def canvas(self, screen):
+        """Return the canvas to draw into for screen at the current
+        scale."""
+        (width, height) = screen.get_size()
+        size = (
+            max(1, round(width * self._scale)),
+            max(1, round(height * self._scale)),
+        )
+        if self._canvas is None or self._canvas.get_size() != size:
+            if self._palette is not None:
+                self._canvas = self._palette.surface(size)
+            else:
+                # In the screen's pixel format, so stretching it is a copy.
+                self._canvas = pygame.Surface(size, 0, screen)
+            self._layer = None
+            self._resized = True
+        return self._canvas
+
+    def scaled(self, layer):
+        """Return layer, a surface the size of the screen, scaled to the
+        canvas. It is scaled again only when the layer or the canvas
+        changes."""
+        if layer is not self._layer:
+            self._layer = layer
+            size = self._canvas.get_size()
+            if layer.get_size() != size:
+                stretch = pygame.transform.scale
+                if layer.get_bitsize() in (24, 32):
+                    stretch = pygame.transform.smoothscale
+                layer = stretch(layer, size)
+            if self._palette is not None:
+                # Each color is mapped to the nearest one in the palette.
+                indexed = self._palette.surface(size)
+                indexed.blit(layer, (0, 0))
+                layer = indexed
+            self._scaled_layer = layer
+        return self._scaled_layer
+
+    def present(self, screen):
+        """Stretch the canvas over screen."""
+        size = screen.get_size()
+        canvas = self._canvas
+        if canvas.get_size() != size:
+            if not self._palette:
+                pygame.transform.scale(canvas, size, screen)
+                return
+            # Stretching keeps the pixel format, so stretch the 8 bit
+            # canvas into 8 bit pixels and convert them while blitting.
+            if self._stretched is None or self._stretched.get_size() != size:
+                self._stretched = self._palette.surface(size)
+            pygame.transform.scale(canvas, size, self._stretched)
+            canvas = self._stretched
+        screen.blit(canvas, (0, 0))
+
+    def adjust(self, elapsed):
+        """Lower the scale if a frame took elapsed seconds, more than the
+        budget, raise it again once frames take well under it. A frame
+        that changed the scale is not counted."""
+        if not self._budget or self._resized:
+            self._resized = False
+            return
+        if elapsed > self._budget:
+            self._scale = max(self._min_scale, self._scale / 1.25)
+        elif elapsed < self._budget / 2:
+            self._scale = min(self._max_scale, self._scale * 1.25)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""A fixed size history of the balls that can be scrubbed back and forth.
+
+Every keyframe_interval frames, and whenever the set of balls changes, the
+full state of the balls is kept as a keyframe. The frames in between only
+keep their position and velocity as float32 offsets from their keyframe,
+which halves their size and does not drift. Each frame remembers which
+balls it holds, so rewinding past a spawn takes the spawned balls away
+again. All of the storage is allocated up front from the memory limit and
+reused as a ring of rows, one row per ball per frame."""
+
+from collections import deque
+from operator import is_
+
+import numpy as np
+import pygame
+from game.ball import DEAD_COLOR
+from game.recording import gather
+
+
+class _Rows:
+    """Ring of rows of ball state, handed out a frame at a time."""
+
+    def __init__(self, num_rows, dtype):
+        """Allocate num_rows rows with positions and velocities of dtype."""
+        self.position = np.zeros((num_rows, 2), dtype)
+        self.velocity = np.zeros((num_rows, 2), dtype)
+        self.bounce_count = np.zeros(num_rows, np.float32)
+        self.alive = np.zeros(num_rows, np.bool_)
+        self.head = 0
+        # (start, end, frame) of the rows written, oldest first.
+        self.written = deque()
+
+    @property
+    def nbytes(self):
+        """Return the number of bytes the rows occupy."""
+        return (
+            self.position.nbytes
+            + self.velocity.nbytes
+            + self.bounce_count.nbytes
+            + self.alive.nbytes
+        )
+
+    def claim(self, num_rows, frame):
+        """Return the first of num_rows rows for frame and the frames whose
+        rows it overwrites, oldest first."""
+        start = self.head
+        wrapped = start + num_rows > len(self.alive)
+        if wrapped:
+            start = 0
+        end = start + num_rows
+        overwritten = []
+        while self.written:
+            (row, row_end, row_frame) = self.written[0]
+            # Wrapping around skips the rows at the end, which are older.
+            if not (row < end and start < row_end) and not (
+                wrapped and row >= self.head
+            ):
+                break
+            self.written.popleft()
+            overwritten.append(row_frame)
+        self.written.append((start, end, frame))
+        self.head = end
+        return (start, overwritten)
+
+    def truncate(self, frame):
+        """Give back the rows of the frames after frame."""
+        while self.written and self.written[-1][2] > frame:
+            self.written.pop()
+        self.head = self.written[-1][1] if self.written else 0
+
+
+class RewindBuffer:
+    """Ring buffer of keyframes and per-frame deltas of ball state."""
+
+    def __init__(self, balls, memory_limit=16 * 2**20, keyframe_interval=30):
+        """Size the buffer for balls so it uses about memory_limit bytes."""
+        self._memory_limit = memory_limit
+        self._interval = keyframe_interval
+        self._allocate(len(balls))
+        self._newest = -1
+        # Only moved forward, when a keyframe overwrites the oldest block;
+        # truncating the history never brings overwritten frames back.
+        self._oldest = 0
+        # (frame, balls, colors, key row, delta row or -1) of every frame
+        # from the oldest to the newest.
+        self._frames = deque()
+        self._balls = []
+        self._colors = []
+        self._key = -1
+
+    def _allocate(self, num_balls):
+        """Size the rows so at least two blocks of num_balls balls fit."""
+        num_balls = max(1, num_balls)
+        key_bytes = num_balls * (8 * 2 + 8 * 2 + 4 + 1)
+        delta_bytes = num_balls * (4 * 2 + 4 * 2 + 4 + 1)
+        block_bytes = key_bytes + delta_bytes * (self._interval - 1)
+        num_keys = max(2, self._memory_limit // block_bytes)
+        self._keys = _Rows(num_keys * num_balls, np.float64)
+        self._deltas = _Rows(
+            num_keys * (self._interval - 1) * num_balls, np.float32
+        )
+        # Scratch space the balls are gathered into every frame.
+        self._scratch_position = np.zeros((num_keys * num_balls // 2, 2))
+        self._scratch_velocity = np.zeros_like(self._scratch_position)
+        self._scratch_bounce_count = np.zeros(
+            len(self._scratch_position), np.float32
+        )
+        self._scratch_alive = np.zeros(len(self._scratch_position), np.bool_)
+
+    @property
+    def nbytes(self):
+        """Return the number of bytes the history occupies."""
+        return self._keys.nbytes + self._deltas.nbytes
+
+    @property
+    def newest(self):
+        """Return the number of the newest frame, or -1 if it is empty."""
+        return self._newest
+
+    @property
+    def oldest(self):
+        """Return the number of the oldest frame that can be restored."""
+        return self._oldest
+
+    def _forget(self, rows, frames):
+        """Drop the frames whose rows were overwritten, and every frame
+        before them."""
+        for frame in frames:
+            if frame < self._oldest:
+                continue
+            if rows is self._deltas:
+                self._oldest = max(self._oldest, frame + 1)
+            else:
+                # The frames up to the next keyframe are offsets from it.
+                self._oldest = max(self._oldest, rows.written[0][2])
+        while self._frames and self._frames[0][0] < self._oldest:
+            self._frames.popleft()
+
+    def _same_balls(self, balls):
+        """Return whether balls are the balls of the newest frame."""
+        return len(balls) == len(self._balls) and all(
+            map(is_, balls, self._balls)
+        )
+
+    def capture(self, balls):
+        """Append the current state of the balls as the newest frame."""
+        self._newest += 1
+        frame = self._newest
+        num_balls = len(balls)
+        if num_balls > len(self._scratch_alive):
+            # Too many balls for two blocks; start over with bigger rows.
+            self._allocate(num_balls)
+            self._frames.clear()
+            self._oldest = frame
+            self._key = -1
+        if not self._same_balls(balls):
+            # The balls kept keep the colors they had alive.
+            colors = dict(zip(map(id, self._balls), self._colors))
+            self._balls = list(balls)
+            self._colors = [
+                colors.get(id(ball), None) or pygame.Color(ball.color)
+                for ball in balls
+            ]
+            self._key = -1
+        gather(
+            balls,
+            self._scratch_position,
+            self._scratch_velocity,
+            self._scratch_alive,
+            self._scratch_bounce_count,
+        )
+        if self._key < 0 or frame % self._interval == 0:
+            (row, overwritten) = self._keys.claim(num_balls, frame)
+            self._forget(self._keys, overwritten)
+            self._write(self._keys, row, num_balls)
+            self._key = row
+            self._frames.append((frame, self._balls, self._colors, row, -1))
+            return
+        (row, overwritten) = self._deltas.claim(num_balls, frame)
+        self._forget(self._deltas, overwritten)
+        rows = slice(row, row + num_balls)
+        keys = slice(self._key, self._key + num_balls)
+        np.subtract(
+            self._scratch_position[:num_balls],
+            self._keys.position[keys],
+            out=self._deltas.position[rows],
+            casting="same_kind",
+        )
+        np.subtract(
+            self._scratch_velocity[:num_balls],
+            self._keys.velocity[keys],
+            out=self._deltas.velocity[rows],
+            casting="same_kind",
+        )
+        self._deltas.bounce_count[rows] = self._scratch_bounce_count[
+            :num_balls
+        ]
+        self._deltas.alive[rows] = self._scratch_alive[:num_balls]
+        self._frames.append(
+            (frame, self._balls, self._colors, self._key, row)
+        )
+
+    def _write(self, rows, row, num_balls):
+        """Copy the gathered balls into rows from row on."""
+        span = slice(row, row + num_balls)
+        rows.position[span] = self._scratch_position[:num_balls]
+        rows.velocity[span] = self._scratch_velocity[:num_balls]
+        rows.bounce_count[span] = self._scratch_bounce_count[:num_balls]
+        rows.alive[span] = self._scratch_alive[:num_balls]
+
+    def clamp(self, frame):
+        """Return the nearest frame to frame that can be restored."""
+        return max(self.oldest, min(frame, self._newest))
+
+    def truncate(self, frame):
+        """Make frame the newest frame, dropping everything after it."""
+        self._newest = self.clamp(frame)
+        while self._frames and self._frames[-1][0] > self._newest:
+            self._frames.pop()
+        self._keys.truncate(self._newest)
+        self._deltas.truncate(self._newest)
+        if self._frames:
+            (_, self._balls, self._colors, self._key, _) = self._frames[-1]
+
+    def balls_at(self, frame):
+        """Return the list of the balls there were at frame."""
+        if not self._frames:
+            return self._balls
+        return self._frames[self.clamp(frame) - self._oldest][1]
+
+    def restore(self, frame, balls):
+        """Put the balls back the way they were at frame. The list balls is
+        changed to hold the balls there were at frame."""
+        frame = self.clamp(frame)
+        if not self._frames:
+            return frame
+        (_, members, colors, key, row) = self._frames[frame - self._oldest]
+        if balls != members:
+            balls[:] = members
+        keys = slice(key, key + len(members))
+        positions = self._keys.position[keys]
+        velocities = self._keys.velocity[keys]
+        if row < 0:
+            bounce_counts = self._keys.bounce_count[keys]
+            alive = self._keys.alive[keys]
+        else:
+            rows = slice(row, row + len(members))
+            positions = positions + self._deltas.position[rows]
+            velocities = velocities + self._deltas.velocity[rows]
+            bounce_counts = self._deltas.bounce_count[rows]
+            alive = self._deltas.alive[rows]
+        for (ball, center, velocity, color, bounce_count, is_alive) in zip(
+            balls,
+            positions.tolist(),
+            velocities.tolist(),
+            colors,
+            bounce_counts.tolist(),
+            alive.tolist(),
+        ):
+            ball.restore_state(
+                center,
+                velocity,
+                ball.radius,
+                color if is_alive else DEAD_COLOR,
+                bounce_count,
+                is_alive,
+            )
+        return frame
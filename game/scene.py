@@ -12,14 +12,44 @@
 
 """Scene objects for making games with PyGame."""
 
+import os.path
+from io import BytesIO
+from itertools import product
 from random import randint
+import time
 import pygame
-from more_itertools import grouper
 from game import rgbcolors
 from game.ball import Ball
 from game.animation import Explosion
+from game.eventdriven import EventDrivenEngine, sweep
+from game.lod import LABEL_RADIUS, LevelOfDetail
+from game.options import SceneOptions
+from game.rewind import RewindBuffer
+from game.walls import BoundaryStage
 import math
 
+# How far from the mouse the right button removes balls.
+ERASER_RADIUS = 30
+
+# How many screen pixels a frame the arrow keys pan the camera.
+CAMERA_SPEED = 12
+
+
+def _init_font():
+    """Initialize the font subsystem unless it is already running."""
+    if not pygame.font.get_init():
+        pygame.font.init()
+
+
+def _init_mixer():
+    """Initialize the mixer subsystem unless it is already running."""
+    if not pygame.mixer.get_init():
+        try:
+            pygame.mixer.init()
+        except pygame.error as pygame_error:
+            print("Cannot open the mixer?")
+            raise SystemExit("broken!!") from pygame_error
+
 
 class Scene:
     """Base class for making PyGame Scenes."""
@@ -32,12 +62,18 @@ class Scene:
         self._frame_rate = 60
         self._is_valid = True
         self._soundtrack = soundtrack
+        self._soundtrack_data = None
+        self._is_prepared = False
         self._render_updates = None
 
     def draw(self):
         """Draw the scene."""
         self._screen.blit(self._background, (0, 0))
 
+    def set_background_color(self, color):
+        """Fill the background with color."""
+        self._background.fill(color)
+
     def process_event(self, event):
         """Process a game event by the scene."""
         if event.type == pygame.QUIT:
@@ -59,15 +95,52 @@ class Scene:
         """Update the scene state."""
         pass
 
-    def start_scene(self):
-        """Start the scene."""
+    def init_subsystems(self):
+        """Initialize the pygame subsystems, other than the display, that
+        the scene needs. Nothing else is initialized at start up."""
+        if self._soundtrack:
+            _init_mixer()
+
+    def prepare_scene(self):
+        """Read and decode the scene's files. This may run on a background
+        thread while the previous scene is playing, so it only does file
+        I/O and decoding: initializing subsystems, converting surfaces and
+        drawing wait for start_scene() on the main thread."""
         if self._soundtrack:
             try:
+                with open(self._soundtrack, "rb") as soundtrack_file:
+                    self._soundtrack_data = soundtrack_file.read()
+            except OSError:
+                # Fall back to loading by path so the mixer reports it.
+                self._soundtrack_data = None
+        self._is_prepared = True
+
+    def is_prepared(self):
+        """Has prepare_scene() already been run?"""
+        return self._is_prepared
+
+    def _load_soundtrack(self):
+        """Load the soundtrack into the mixer, from memory if prefetched."""
+        try:
+            if self._soundtrack_data is not None:
+                pygame.mixer.music.load(
+                    BytesIO(self._soundtrack_data),
+                    os.path.splitext(self._soundtrack)[1],
+                )
+            else:
                 pygame.mixer.music.load(self._soundtrack)
-                pygame.mixer.music.set_volume(0.1)
-            except pygame.error as pygame_error:
-                print("Cannot open the mixer?")
-                raise SystemExit("broken!!") from pygame_error
+        except pygame.error as pygame_error:
+            print("Cannot open the mixer?")
+            raise SystemExit("broken!!") from pygame_error
+
+    def start_scene(self):
+        """Start the scene."""
+        if not self._is_prepared:
+            self.prepare_scene()
+        self.init_subsystems()
+        if self._soundtrack:
+            self._load_soundtrack()
+            pygame.mixer.music.set_volume(0.1)
             pygame.mixer.music.play(-1)
 
     def end_scene(self):
@@ -107,9 +180,17 @@ class SplashScene(EmptyPressAnyKeyScene):
         self._message = message
         self._words_per_line = 5
 
+    def init_subsystems(self):
+        super().init_subsystems()
+        _init_font()
+
     def _split_message(self):
         """Given a message, split it up according
          to how many words per line."""
+        # Only the credits use it, so it is not imported at start up.
+        # pylint: disable-next=import-outside-toplevel
+        from more_itertools import grouper
+
         lines = [
             " ".join(x).rstrip()
             for x in grouper(self._message.split(), self._words_per_line, "")
@@ -155,17 +236,17 @@ class BlinkingTitle(EmptyPressAnyKeyScene):
         self._t = 0.0
         self._delta_t = 0.01
 
+    def init_subsystems(self):
+        super().init_subsystems()
+        _init_font()
+
     def _interpolate(self):
-        # This can be done with pygame.Color.lerp
         self._t += self._delta_t
         if self._t > 1.0 or self._t < 0.0:
             self._delta_t *= -1
-        c = rgbcolors.sum_color(
-            rgbcolors.mult_color((1.0 - self._t),
-                self._message_complement_color),
-            rgbcolors.mult_color(self._t, self._message_color),
+        return pygame.Color(self._message_complement_color).lerp(
+            self._message_color, min(max(self._t, 0.0), 1.0)
         )
-        return c
 
     def draw(self):
         super().draw()
@@ -188,22 +269,239 @@ class BouncingBallsScene(Scene):
     """Bounding balls demo."""
 
     def __init__(
-        self, num_balls, screen, background_color, frame_rate, soundtrack=None
+        self,
+        num_balls,
+        screen,
+        background_color,
+        frame_rate,
+        soundtrack=None,
+        options=None,
     ):
+        """Init the scene of num_balls balls, set up by options, a
+        SceneOptions, or the defaults without it."""
         super().__init__(screen, background_color, soundtrack)
+        options = options or SceneOptions()
         self._pause_game = False
-        self._boundary_rect = self._screen.get_rect()
         self._balls = []
         self._num_balls = num_balls
-        (self._width, self._height) = self._screen.get_size()
+        world_size = options.world_size
+        (self._width, self._height) = world_size or self._screen.get_size()
+        self._camera = None
+        if world_size:
+            # pylint: disable-next=import-outside-toplevel
+            from game.camera import Camera
+
+            self._camera = Camera(self._screen.get_size(), world_size)
         self._render_updates = None
         self._explosions = True
+        self._step = 0
+        self._record_path = options.record_path
+        self._recorder = None
+        self._snapshot_path = options.snapshot_path
+        self._snapshot_every = options.snapshot_every
+        self._rewind_memory = options.rewind_memory
+        self._rewind = None
+        self._rewind_frame = None
+        self._engine = options.engine
+        self._event_engine = None
+        self._physics_step = options.physics_step
+        self._physics_lag = 0
+        self._neighbor_list = None
+        if options.neighbor_skin:
+            # pylint: disable-next=import-outside-toplevel
+            from game.neighbors import NeighborList
 
-    def start_scene(self):
-        super().start_scene()
-        # TODO
-        # Create the balls
-        (width, height) = self._screen.get_size()
+            self._neighbor_list = NeighborList(
+                options.neighbor_skin, options.tune_skin
+            )
+        self._obstacles_path = options.obstacles_path
+        # Read by prepare_scene(), set by start_scene().
+        self._loaded_obstacles = None
+        self._obstacles = None
+        self._boundary = None
+        self._store = None
+        self._balls_changed = False
+        self._next_name = num_balls
+        self._emit_rate = options.emit_rate
+        self._emit_lag = 0.0
+        self._emitting = False
+        self._erasing = False
+        self._labels = None
+        self._draw_budget = options.draw_budget
+        self._stamp = options.stamp
+        self._render_threads = options.render_threads
+        self._resolution = None
+        if (
+            options.render_scale != 1
+            or options.dynamic_resolution
+            or options.palette
+        ):
+            # pylint: disable-next=import-outside-toplevel
+            from game.resolution import RenderScale
+
+            # pylint: disable-next=import-outside-toplevel
+            from game.palette import PALETTE
+
+            self._resolution = RenderScale(
+                options.render_scale,
+                1 / frame_rate if options.dynamic_resolution else None,
+                palette=PALETTE if options.palette else None,
+            )
+        self._frame_start = None
+        self._trails = None
+        self._trails_view = None
+        if options.trails:
+            if options.palette:
+                raise ValueError("Trails need colors, not a palette.")
+            # pylint: disable-next=import-outside-toplevel
+            from game.trails import Trails
+
+            self._trails = Trails(options.trails)
+        self._heatmap = None
+        self._heatmap_path = options.heatmap_path
+        # 0 hides the heatmap, 1 shows the occupancy, 2 the collisions.
+        self._heatmap_shown = 0
+        if options.heatmap or options.heatmap_path:
+            # pylint: disable-next=import-outside-toplevel
+            from game.heatmap import Heatmap
+
+            self._heatmap = Heatmap((self._width, self._height))
+        self._renderer = None
+        # The background, obstacles and border, drawn once.
+        self._static_layer = None
+        self._quadtree = None
+        self._quadtree_balls = None
+        if options.quadtree:
+            # pylint: disable-next=import-outside-toplevel
+            from game.quadtree import LooseQuadtree
+
+            self._quadtree = LooseQuadtree((0, self._width, 0, self._height))
+
+    def init_subsystems(self):
+        super().init_subsystems()
+        # The name labels need fonts and the balls' sound effects the mixer.
+        _init_font()
+        _init_mixer()
+
+    def prepare_scene(self):
+        super().prepare_scene()
+        Ball.read_sounds()
+        Explosion.read_image()
+        if self._obstacles_path:
+            # pylint: disable-next=import-outside-toplevel
+            from game.obstacles import load_obstacles
+
+            self._loaded_obstacles = load_obstacles(self._obstacles_path)
+
+    def set_obstacles(self, obstacles):
+        """Replace the static obstacles the balls bounce off of. They are
+        not seen by the event driven engine."""
+        # pylint: disable-next=import-outside-toplevel
+        from game.obstacles import BoundingVolumeHierarchy
+
+        self._obstacles = BoundingVolumeHierarchy(obstacles)
+        self._static_layer = None
+
+    def set_background_color(self, color):
+        super().set_background_color(color)
+        self._static_layer = None
+
+    def _static(self):
+        """Return the layer of everything that does not move, drawn again
+        only after it changes or the screen changes size."""
+        size = self._screen.get_size()
+        layer = self._static_layer
+        if layer is None or layer.get_size() != size:
+            # In the screen's pixel format, so blitting it is a plain copy.
+            layer = pygame.Surface(size, 0, self._screen)
+            background = self._background
+            if background.get_size() != size:
+                background = pygame.transform.scale(background, size)
+            layer.blit(background, (0, 0))
+            if self._obstacles:
+                self._obstacles.draw(layer, rgbcolors.yellow)
+            self._draw_boundaries(layer)
+            self._static_layer = layer
+        return layer
+
+    def _ball_store(self):
+        """Return the store that adds and removes balls in self._balls,
+        starting over when the list was replaced or filled directly."""
+        if self._store is None:
+            # pylint: disable-next=import-outside-toplevel
+            from game.ballstore import BallStore
+
+            self._store = BallStore(self._balls)
+        elif self._store.balls is not self._balls or len(self._store) != len(
+            self._balls
+        ):
+            self._store.reset(self._balls)
+        return self._store
+
+    def _ball_set_changed(self):
+        """Drop everything that depends on which balls there are. The
+        recorder is dealt with once per frame; the rewind history keeps
+        track of which balls each frame had by itself."""
+        self._balls_changed = True
+        self._event_engine = None
+        self._quadtree_balls = None
+        if self._boundary:
+            self._boundary.invalidate()
+        if self._neighbor_list:
+            self._neighbor_list.invalidate()
+
+    def spawn_ball(self, x, y, velocity=None):
+        """Add a ball centered at (x, y), moving at velocity or a random
+        velocity, and return its handle."""
+        sound_on = self._balls[0].sound_on if self._balls else True
+        ball = Ball(self._next_name, x, y, sound_on)
+        self._next_name += 1
+        if velocity:
+            ball.set_velocity(*velocity)
+        handle = self._ball_store().spawn(ball)
+        self._ball_set_changed()
+        return handle
+
+    def despawn_ball(self, handle):
+        """Remove the ball for handle and return it. A stale handle raises
+        a KeyError."""
+        ball = self._ball_store().despawn(handle)
+        self._ball_set_changed()
+        return ball
+
+    def ball(self, handle):
+        """Return the ball for handle, or None if it was removed."""
+        return self._ball_store().get(handle)
+
+    def _despawn_where(self, condition):
+        """Remove every ball condition(ball) is true for."""
+        store = self._ball_store()
+        # Backwards, so the ball moved into a freed place is one that has
+        # already been looked at.
+        for position in range(len(store) - 1, -1, -1):
+            if condition(store.balls[position]):
+                self.despawn_ball(store.handle_at(position))
+
+    def _emit(self):
+        """Spawn balls at the mouse while the left button is held and
+        remove the balls under it while the right button is held."""
+        (x, y) = pygame.mouse.get_pos()
+        if self._camera:
+            (x, y) = self._camera.to_world((x, y))
+        if self._emitting:
+            self._emit_lag += self._emit_rate / self._frame_rate
+            while self._emit_lag >= 1:
+                self.spawn_ball(x, y)
+                self._emit_lag -= 1
+        if self._erasing:
+            self._despawn_where(
+                lambda ball: ball.too_close(x, y, ball.radius + ERASER_RADIUS)
+            )
+
+    def _create_balls(self):
+        """Create the balls, placing each one so it does not touch
+        the world's boundaries or any other ball."""
+        (width, height) = (self._width, self._height)
         self._balls.append(Ball(0, width / 2, height / 2, True))
         self._balls[0].set_velocity(5, 5)
         self._balls[0]._bounce_count = math.inf
@@ -225,19 +523,155 @@ class BouncingBallsScene(Scene):
                     == False
                 ):
                     self._balls.append(Ball(ball + 1, center_x, center_y, True))
+
+    def save_snapshot(self, path):
+        """Save the whole world, including the random number generator, to
+        a snapshot file at path."""
+        # pylint: disable-next=import-outside-toplevel
+        from game import snapshot
+
+        snapshot.save_snapshot(
+            path, self._balls, self._step, (self._width, self._height)
+        )
+
+    def load_snapshot(self, path):
+        """Replace the world with the one saved in the snapshot at path.
+        Raise ValueError, leaving the world as it is, if the snapshot is
+        not one or was saved in a world of another size."""
+        # pylint: disable-next=import-outside-toplevel
+        from game.snapshot import Snapshot
+
+        snapshot = Snapshot(path)
+        if snapshot.size != (self._width, self._height):
+            raise ValueError(
+                f"{path} was saved in a {snapshot.size[0]}x"
+                f"{snapshot.size[1]} world, not {self._width}x{self._height}"
+            )
+        sound_on = self._balls[0].sound_on if self._balls else True
+        self._balls = []
+        columns = zip(
+            snapshot["name"].tolist(),
+            snapshot["position"].tolist(),
+            snapshot["velocity"].tolist(),
+            snapshot["radius"].tolist(),
+            snapshot["color"].tolist(),
+            snapshot["bounce_count"].tolist(),
+            snapshot["alive"].tolist(),
+        )
+        for (name, center, *state) in columns:
+            ball = Ball(name, *center, sound_on)
+            ball.restore_state(center, *state)
+            self._balls.append(ball)
+        # Balls spawned from now on do not take the name of a loaded one.
+        self._next_name = (
+            max((ball.name for ball in self._balls), default=-1) + 1
+        )
+        self._step = snapshot.step
+        # Last, so building the balls does not disturb the saved state.
+        snapshot.restore_random_state()
+        self._ball_set_changed()
+        self._reset_rewind()
+
+    def _resume(self):
+        """Load the snapshot if there is one to resume from and return
+        whether it was loaded."""
+        if not self._snapshot_path or not os.path.exists(self._snapshot_path):
+            return False
+        try:
+            self.load_snapshot(self._snapshot_path)
+        except ValueError as snapshot_error:
+            print(f"Could not resume, {snapshot_error}.")
+            return False
+        return True
+
+    def _reset_rewind(self):
+        """Start a new rewind history for the current balls."""
+        self._rewind = None
+        self._rewind_frame = None
+        if self._rewind_memory:
+            self._rewind = RewindBuffer(self._balls, self._rewind_memory)
+            self._rewind.capture(self._balls)
+
+    def _toggle_rewind(self):
+        """Enter rewind mode, or resume playing from the frame shown."""
+        if not self._rewind:
+            return
+        if self._rewind_frame is None:
+            self._rewind_frame = self._rewind.newest
+        else:
+            self._step -= self._rewind.newest - self._rewind_frame
+            self._rewind.truncate(self._rewind_frame)
+            self._rewind_frame = None
+
+    def _scrub(self):
+        """Move through the rewind history while an arrow key is held."""
+        pressed = pygame.key.get_pressed()
+        speed = 4 if pygame.key.get_mods() & pygame.KMOD_SHIFT else 1
+        frame = self._rewind_frame
+        if pressed[pygame.K_LEFT]:
+            frame -= speed
+        if pressed[pygame.K_RIGHT]:
+            frame += speed
+        frame = self._rewind.clamp(frame)
+        if frame != self._rewind_frame:
+            changed = self._rewind.balls_at(frame) != self._balls
+            self._rewind_frame = self._rewind.restore(frame, self._balls)
+            self._event_engine = None
+            self._quadtree_balls = None
+            if self._boundary:
+                self._boundary.invalidate()
+            if changed:
+                # Rewinding past a spawn or a despawn; the handles given out
+                # since are stale.
+                self._ball_set_changed()
+                if self._store:
+                    self._store.reset(self._balls)
+
+    def start_scene(self):
+        super().start_scene()
+        # Balls hold their sounds, so they are made once the mixer is up.
+        Ball.load_sounds()
+        Explosion.load_images()
+        if self._loaded_obstacles is not None:
+            self.set_obstacles(self._loaded_obstacles)
+            self._loaded_obstacles = None
+        if not self._resume():
+            self._create_balls()
+            self._reset_rewind()
+        # The recorder below is made for the balls there are now.
+        self._balls_changed = False
         self._render_updates = pygame.sprite.RenderUpdates()
         Explosion.containers = self._render_updates
+        if self._record_path:
+            # pylint: disable-next=import-outside-toplevel
+            from game.recording import TrajectoryRecorder
+
+            self._recorder = TrajectoryRecorder(
+                self._record_path, self._balls, (self._width, self._height)
+            )
 
     def end_scene(self):
         super().end_scene()
-        # TODO
+        if self._recorder:
+            self._recorder.close()
+            print(f"Recorded {self._recorder.frames} frames.")
+            self._recorder = None
+        if self._neighbor_list:
+            print(self._neighbor_list)
+        if self._render_threads and self._renderer:
+            # A TileRenderer, whose threads would outlive the scene.
+            self._renderer.close()
+        self._renderer = None
+        if self._heatmap_path:
+            self._heatmap.save(self._heatmap_path)
+            print(f"Saved the {self._heatmap} to {self._heatmap_path}.")
 
-    def _draw_boundaries(self):
-        (w, h) = self._screen.get_size()
+    def _draw_boundaries(self, surface, rect=None):
+        w = surface.get_width()
         pygame.draw.rect(
-            self._screen,
+            surface,
             rgbcolors.yellow,
-            self._boundary_rect,
+            rect or surface.get_rect(),
             (w // 100),
             (w // 200),
         )
@@ -252,6 +686,10 @@ class BouncingBallsScene(Scene):
         elif event.type == pygame.KEYDOWN and event.key == pygame.K_e:
             self._explosions = not self._explosions
 
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+            if self._heatmap:
+                self._heatmap_shown = (self._heatmap_shown + 1) % 3
+
         elif event.type == pygame.KEYDOWN and event.key == pygame.K_p:
             self._pause_game = not self._pause_game
 
@@ -265,54 +703,468 @@ class BouncingBallsScene(Scene):
                 pygame.mixer.music.stop()
             else:
                 if self._soundtrack:
-                    try:
-                        pygame.mixer.music.load(self._soundtrack)
-                    except pygame.error as pygame_error:
-                        print("Cannot open the mixer?")
-                        raise SystemExit("broken!!") from pygame_error
+                    self._load_soundtrack()
                     pygame.mixer.music.play(-1)
 
         elif event.type == pygame.KEYDOWN and event.key == pygame.K_x:
             self._is_valid = False
 
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_r:
+            self._toggle_rewind()
+
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_c:
+            if self._rewind_frame is None:
+                self._despawn_where(lambda ball: not ball.is_alive)
+
+        elif event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+            held = event.type == pygame.MOUSEBUTTONDOWN
+            if event.button == 1:
+                self._emitting = held
+            elif event.button == 3:
+                self._erasing = held
+
+        elif event.type == pygame.MOUSEWHEEL and self._camera:
+            self._camera.zoom_at(1.25**event.y, pygame.mouse.get_pos())
+
+        elif event.type == pygame.MOUSEMOTION and self._camera:
+            if event.buttons[1]:
+                self._camera.pan(-event.rel[0], -event.rel[1])
+
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_f:
+            if self._rewind_frame is None:
+                self.fast_forward(self._frame_rate * 10)
+
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+            if self._snapshot_path:
+                self.save_snapshot(self._snapshot_path)
+                print(f"Saved a snapshot to {self._snapshot_path}.")
+
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F9:
+            if self._resume():
+                print(f"Loaded the snapshot {self._snapshot_path}.")
+
     def render_updates(self):
-        if self._render_updates:
-            self._render_updates.clear(self._screen, self._background)
+        if self._render_updates and (
+            self._tiles_draw_sprites() or self._camera
+        ):
+            # The explosions were drawn along with the balls.
+            self._render_updates.update()
+        elif self._render_updates:
+            self._render_updates.clear(self._screen, self._static())
             self._render_updates.update()
             dirty = self._render_updates.draw(self._screen)
 
+    def _tiles_draw_sprites(self):
+        """Return whether the tiles draw the explosions. At a lower
+        resolution or through a camera they are drawn over the screen
+        afterwards instead."""
+        return (
+            self._render_threads
+            and self._resolution is None
+            and self._camera is None
+        )
+
     def draw(self):
-        super().draw()
-        # TODO
-        for ball in self._balls:
-            ball.draw(self._screen)
-        self._draw_boundaries()
+        if self._renderer is None:
+            self._renderer = self._make_renderer()
+        (surface, scale) = (self._screen, 1.0)
+        if self._resolution:
+            surface = self._resolution.canvas(self._screen)
+            scale = self._resolution.scale
+        (balls, zoom, offset) = (self._balls, 1.0, pygame.Vector2())
+        if self._camera:
+            zoom = self._camera.zoom
+            offset = self._camera.origin * zoom
+            balls = self._visible_balls()
+            self._draw_view(surface, zoom * scale, offset * scale)
+        elif self._resolution:
+            surface.blit(self._resolution.scaled(self._static()), (0, 0))
+        else:
+            surface.blit(self._static(), (0, 0))
+        if self._trails:
+            view = (tuple(offset), zoom)
+            if view != self._trails_view:
+                # The trails were left in the old view.
+                self._trails.clear()
+                self._trails_view = view
+            self._trails.under(surface)
+        if self._tiles_draw_sprites():
+            drawn = self._renderer.draw(
+                surface, balls, self._render_updates or ()
+            )
+        else:
+            drawn = self._renderer.draw(
+                surface, balls, scale=zoom * scale, offset=offset * scale
+            )
+        if self._trails:
+            self._trails.capture(surface)
+        if self._resolution:
+            self._resolution.present(self._screen)
+        if self._heatmap_shown:
+            self._heatmap.draw(
+                self._screen, self._heatmap_shown == 2, zoom, offset
+            )
+        if self._camera and self._render_updates:
+            self._screen.blits(
+                [
+                    (
+                        sprite.image,
+                        sprite.image.get_rect(
+                            center=pygame.Vector2(sprite.rect.center) * zoom
+                            - offset
+                        ),
+                    )
+                    for sprite in self._render_updates
+                ],
+                False,
+            )
+        labeled = [ball for ball in drawn if ball.draw_text]
+        if labeled and zoom < 1:
+            # Only name the balls still big enough on screen.
+            labeled = [
+                ball
+                for ball in labeled
+                if ball.radius * zoom >= LABEL_RADIUS
+            ]
+        if labeled:
+            if self._labels is None:
+                # pylint: disable-next=import-outside-toplevel
+                from game.labels import GlyphAtlas
+
+                self._labels = GlyphAtlas(Ball.default_radius)
+            self._labels.blits(self._screen, labeled, zoom, offset)
+        if self._resolution and self._frame_start is not None:
+            self._resolution.adjust(time.perf_counter() - self._frame_start)
+
+    def _visible_balls(self):
+        """Return the balls in the camera's view, looked up in the
+        quadtree when stepping keeps one of the current balls."""
+        if self._quadtree_balls is self._balls:
+            return self._camera.cull(self._balls, self._quadtree)
+        return self._camera.cull(self._balls)
+
+    def _draw_view(self, surface, scale, offset):
+        """Draw the background, the obstacles in the camera's view and the
+        world's border, times scale and moved back by offset."""
+        surface.fill(self._background.get_at((0, 0)))
+        if self._obstacles:
+            (xmin, xmax, ymin, ymax) = self._camera.viewport()
+            box = (xmin, ymin, xmax, ymax)
+            self._obstacles.draw(
+                surface, rgbcolors.yellow, box, scale, offset
+            )
+        border = pygame.Rect(
+            -offset, (self._width * scale, self._height * scale)
+        )
+        self._draw_boundaries(surface, border)
+
+    def _make_renderer(self):
+        """Return what draws the balls: a TileRenderer when drawing on
+        threads, a StampRenderer with the stamp option on, or else a
+        LevelOfDetail."""
+        if self._render_threads:
+            # pylint: disable-next=import-outside-toplevel
+            from game.tiles import TileRenderer
+
+            return TileRenderer(
+                self._screen.get_size(), workers=self._render_threads
+            )
+        if self._stamp:
+            # pylint: disable-next=import-outside-toplevel
+            from game.stamp import StampRenderer
+
+            return StampRenderer()
+        return LevelOfDetail(self._draw_budget or 0.5 / self._frame_rate)
+
+    def _collide(self, ball, other_ball, separate=True):
+        """Resolve two balls touching, blowing up a dead ball that a live
+        ball hits."""
+        if self._heatmap:
+            self._heatmap.touched(ball, other_ball)
+        if (
+            ball._is_alive and not other_ball._is_alive
+        ) and self._explosions == True:
+            Explosion(other_ball)
+        elif (
+            other_ball._is_alive
+            and not ball._is_alive
+            and self._explosions == True
+        ):
+            Explosion(ball)
+        if separate:
+            ball.separate_from(other_ball)
+        ball.bounce(other_ball)
+        other_ball.bounce(ball)
+        if self._boundary:
+            self._boundary.pushed(ball, other_ball)
+        if (ball._is_alive and ball._sound_on) or (
+            other_ball._is_alive and other_ball._sound_on
+        ):
+            ball._bounce_sound.play(0)
+
+    def _move_balls(self):
+        """Move every ball one frame, keep them inside the walls and off
+        of the obstacles. The moves and the walls are done for every ball
+        at once, then one reflect sound is played if any ball that can
+        make a sound bounced off of one."""
+        if self._boundary is None:
+            self._boundary = BoundaryStage((0, self._width, 0, self._height))
+        balls = self._balls
+        hits = self._boundary.apply(balls)
+        if hits.any():
+            for i in hits.nonzero()[0].tolist():
+                if balls[i].play_reflect_sound():
+                    break
+        if self._obstacles:
+            for ball in balls:
+                if self._obstacles.collide(ball):
+                    self._boundary.pushed(ball)
+
+    def _step_balls(self):
+        """Move every ball one frame, then bounce each ball off of any ball
+        it overlaps. With a neighbor list only the balls listed as close
+        to a ball are checked against it."""
+        if self._quadtree is not None:
+            self._step_balls_in_quadtree()
+            return
+        balls = self._balls
+        self._move_balls()
+        if self._neighbor_list:
+            self._collide_neighbors(balls)
+            return
+        # One iterator over every pair, where a loop per ball would make
+        # an iterator per ball.
+        for (ball, other_ball) in product(balls, repeat=2):
+            if other_ball is ball:
+                continue
+            elif ball.collide_with(other_ball):
+                self._collide(ball, other_ball)
+
+    def _collide_neighbors(self, balls):
+        """Bounce each ball off of the balls its neighbor list holds. Each
+        pair pushed apart is reported to the list, which is built again
+        once the pushes could have brought an unlisted ball within reach;
+        the ball then goes on with the balls after the one it hit in its
+        new list, as in the order every pair is checked in."""
+        neighbor_list = self._neighbor_list
+        neighbors = neighbor_list.start_frame(balls)
+        for (i, ball) in enumerate(balls):
+            others = neighbors[i]
+            position = 0
+            while position < len(others):
+                j = others[position]
+                position += 1
+                other_ball = balls[j]
+                if not ball.collide_with(other_ball):
+                    continue
+                self._collide(ball, other_ball)
+                if neighbor_list.pushed(i, j):
+                    neighbors = neighbor_list.neighbors
+                    others = [k for k in neighbors[i] if k > j]
+                    position = 0
+        neighbor_list.end_frame()
+
+    def _step_balls_in_quadtree(self):
+        """Step the balls like _step_balls, finding the balls that may
+        touch each one in the quadtree. Every ball that is pushed apart is
+        moved in the tree straight away, so the same pairs collide in the
+        same order as when every pair is checked."""
+        balls = self._balls
+        tree = self._quadtree
+        self._move_balls()
+        if self._quadtree_balls is not balls:
+            tree.rebuild(balls)
+            self._quadtree_balls = balls
+        else:
+            for (i, ball) in enumerate(balls):
+                tree.move(i, *ball.center, ball.radius)
+        for (i, ball) in enumerate(balls):
+            candidates = tree.near(*ball.center, ball.radius)
+            position = 0
+            while position < len(candidates):
+                j = candidates[position]
+                position += 1
+                other_ball = balls[j]
+                if other_ball is ball or not ball.collide_with(other_ball):
+                    continue
+                self._collide(ball, other_ball)
+                tree.move(i, *ball.center, ball.radius)
+                tree.move(j, *other_ball.center, other_ball.radius)
+                # The ball was pushed away, look around where it is now.
+                candidates = [
+                    k for k in tree.near(*ball.center, ball.radius) if k > j
+                ]
+                position = 0
+
+    def _advance_events(self, frames):
+        """Move every ball frames ahead with the event driven engine."""
+        if not self._event_engine:
+            self._event_engine = EventDrivenEngine(
+                self._balls,
+                (0, self._width, 0, self._height),
+                lambda ball, other_ball: self._collide(
+                    ball, other_ball, separate=False
+                ),
+            )
+        self._event_engine.advance(frames)
+
+    def _sweep_balls(self, frames):
+        """Move every ball frames ahead in physics steps of
+        self._physics_step frames, sweeping each step so no collision is
+        missed however long it is."""
+        bounds = (0, self._width, 0, self._height)
+        while frames > 0:
+            step = min(frames, self._physics_step)
+            sweep(
+                self._balls,
+                bounds,
+                step,
+                lambda ball, other_ball: self._collide(
+                    ball, other_ball, separate=False
+                ),
+            )
+            if self._obstacles:
+                # Obstacles are only checked once per step, they are not
+                # swept.
+                for ball in self._balls:
+                    self._obstacles.collide(ball)
+            frames -= step
+
+    def fast_forward(self, frames):
+        """Skip frames ahead in one go. Only the event driven engine can
+        jump; the swept engine runs every physics step in between and the
+        stepping engine every frame."""
+        if self._engine == "event":
+            self._advance_events(frames)
+            self._step += frames
+        elif self._engine == "swept":
+            self._sweep_balls(frames)
+            self._step += frames
+        else:
+            for _ in range(frames):
+                self._step_balls()
+                self._step += 1
+        if self._rewind:
+            # The history is per frame, it cannot span the jump.
+            self._reset_rewind()
 
     def update_scene(self):
-        if not self._pause_game:
+        self._frame_start = time.perf_counter()
+        if self._camera and self._rewind_frame is None:
+            # The arrow keys scrub while rewinding and pan otherwise.
+            pressed = pygame.key.get_pressed()
+            across = pressed[pygame.K_RIGHT] - pressed[pygame.K_LEFT]
+            down = pressed[pygame.K_DOWN] - pressed[pygame.K_UP]
+            self._camera.pan(CAMERA_SPEED * across, CAMERA_SPEED * down)
+        if self._rewind_frame is not None:
+            self._scrub()
+        elif not self._pause_game:
             super().update_scene()
-            for ball in self._balls:
-                ball.update()
-                ball.wall_reflect(0, self._width, 0, self._height)
-                for other_ball in self._balls:
-                    if other_ball == ball:
-                        continue
-                    elif ball.collide_with(other_ball):
-                        if (
-                            ball._is_alive and not other_ball._is_alive
-                        ) and self._explosions == True:
-                            Explosion(other_ball)
-                        elif (
-                            other_ball._is_alive
-                            and not ball._is_alive
-                            and self._explosions == True
-                        ):
-                            Explosion(ball)
-                        ball.separate_from(other_ball)
-                        ball.bounce(other_ball)
-                        other_ball.bounce(ball)
-                        if (ball._is_alive and ball._sound_on) or (
-                            other_ball._is_alive and other_ball._sound_on
-                        ):
-                            ball._bounce_sound.play(0)
+            if self._emitting or self._erasing:
+                self._emit()
+            if self._engine == "event":
+                self._advance_events(1)
+            elif self._engine == "swept":
+                # With a physics step longer than a frame the balls move
+                # once every few frames.
+                self._physics_lag += 1
+                if self._physics_lag >= self._physics_step:
+                    self._sweep_balls(self._physics_lag)
+                    self._physics_lag = 0
+            else:
+                self._step_balls()
+            self._step += 1
+            if self._heatmap:
+                self._heatmap.add(self._balls)
+            if self._balls_changed:
+                self._balls_changed = False
+                if self._recorder:
+                    # A recording has a column per ball.
+                    print("The set of balls changed, recording stopped.")
+                    self._recorder.close()
+                    self._recorder = None
+            if self._recorder and not self._recorder.record(
+                self._step, self._balls
+            ):
+                print("The recording is full, recording stopped.")
+                self._recorder.close()
+                self._recorder = None
+            if self._rewind:
+                self._rewind.capture(self._balls)
+            elif self._rewind_memory:
+                self._reset_rewind()
+            if (
+                self._snapshot_path
+                and self._snapshot_every
+                and self._step % self._snapshot_every == 0
+            ):
+                self.save_snapshot(self._snapshot_path)
         # print('\n'.join(map(str, self._balls)))
+
+
+class ReplayScene(Scene):
+    """Play back a recorded trajectory file without running any physics."""
+
+    def __init__(self, screen, replay_path, background_color, soundtrack=None):
+        super().__init__(screen, background_color, soundtrack)
+        self._replay_path = replay_path
+        self._replay = None
+        self._frame = 0
+        self._pause_game = False
+        self._scrubbing = False
+
+    def prepare_scene(self):
+        super().prepare_scene()
+        # pylint: disable-next=import-outside-toplevel
+        from game.recording import TrajectoryReplay
+
+        self._replay = TrajectoryReplay(self._replay_path)
+
+    def _seek(self, frame):
+        """Jump to a frame, clamped to the recording."""
+        self._frame = max(0, min(frame, len(self._replay) - 1))
+
+    def _scrub_to(self, x_position):
+        """Seek to the frame under the mouse along the window's width."""
+        (width, _) = self._screen.get_size()
+        self._seek(int(x_position / width * len(self._replay)))
+
+    def process_event(self, event):
+        super().process_event(event)
+        if event.type == pygame.KEYDOWN:
+            step = 60 if event.mod & pygame.KMOD_SHIFT else 1
+            if event.key == pygame.K_p or event.key == pygame.K_SPACE:
+                self._pause_game = not self._pause_game
+            elif event.key == pygame.K_RIGHT:
+                self._seek(self._frame + step)
+            elif event.key == pygame.K_LEFT:
+                self._seek(self._frame - step)
+            elif event.key == pygame.K_HOME:
+                self._seek(0)
+            elif event.key == pygame.K_END:
+                self._seek(len(self._replay) - 1)
+            elif event.key == pygame.K_x:
+                self._is_valid = False
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            self._scrubbing = True
+            self._scrub_to(event.pos[0])
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            self._scrubbing = False
+        elif event.type == pygame.MOUSEMOTION and self._scrubbing:
+            self._scrub_to(event.pos[0])
+
+    def update_scene(self):
+        super().update_scene()
+        if not self._pause_game and not self._scrubbing:
+            self._seek(self._frame + 1)
+
+    def draw(self):
+        super().draw()
+        if not len(self._replay):
+            return
+        self._replay.draw(self._screen, self._frame)
+        (w, h) = self._screen.get_size()
+        progress = (self._frame + 1) / len(self._replay)
+        pygame.draw.rect(
+            self._screen, rgbcolors.yellow, (0, h - 4, int(w * progress), 4)
+        )
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""Save and restore the full state of the bouncing balls world.
+
+A snapshot is a fixed header followed by one column per ball attribute
+and the state of the random number generator, laid out like the
+trajectory files in game.recording. Loading maps the file instead of
+reading it. Saving writes a new file next to the old one and only then
+puts it in its place, so a save that is cut short leaves the last
+snapshot as it was."""
+
+import os
+import random
+import tempfile
+import numpy as np
+from game.recording import column_layout, gather, map_columns
+
+MAGIC = b"BBSNAP"
+VERSION = 1
+
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S6"),
+        ("version", "<u2"),
+        ("num_balls", "<u4"),
+        ("rng_version", "<u4"),
+        ("rng_length", "<u4"),
+        ("has_gauss", "u1"),
+        ("gauss_next", "<f8"),
+        ("step", "<u8"),
+        ("width", "<u4"),
+        ("height", "<u4"),
+    ]
+)
+
+
+def _layout(num_balls, rng_length):
+    """Return the column layout and size of a snapshot file."""
+    columns = [
+        ("name", "<i8", (num_balls,)),
+        ("position", "<f8", (num_balls, 2)),
+        ("velocity", "<f8", (num_balls, 2)),
+        ("radius", "<f4", (num_balls,)),
+        ("color", "u1", (num_balls, 3)),
+        # Float so the immortal ball's infinite count survives the trip.
+        ("bounce_count", "<f4", (num_balls,)),
+        ("alive", "u1", (num_balls,)),
+        ("rng", "<u4", (rng_length,)),
+    ]
+    return column_layout(columns, HEADER_DTYPE.itemsize)
+
+
+def save_snapshot(path, balls, step, size):
+    """Write the balls, the simulation step, the window size and the
+    state of the random module to path, replacing it only once the new
+    snapshot is all on disk."""
+    (directory, name) = os.path.split(os.path.abspath(path))
+    (handle, temporary_path) = tempfile.mkstemp(
+        ".tmp", name + ".", directory
+    )
+    os.close(handle)
+    try:
+        _write_snapshot(temporary_path, balls, step, size)
+        with open(temporary_path, "rb") as snapshot_file:
+            os.fsync(snapshot_file.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def _write_snapshot(path, balls, step, size):
+    """Write a snapshot to path, a new file."""
+    (rng_version, rng_internal, gauss_next) = random.getstate()
+    (layout, file_size) = _layout(len(balls), len(rng_internal))
+    with open(path, "wb") as snapshot_file:
+        snapshot_file.truncate(file_size)
+    header = np.memmap(path, HEADER_DTYPE, "r+", 0, (1,))
+    header[0] = (
+        MAGIC,
+        VERSION,
+        len(balls),
+        rng_version,
+        len(rng_internal),
+        gauss_next is not None,
+        gauss_next or 0.0,
+        step,
+        *size,
+    )
+    columns = map_columns(path, "r+", layout)
+    gather(
+        balls,
+        columns["position"],
+        columns["velocity"],
+        columns["alive"],
+        columns["bounce_count"],
+    )
+    for (i, ball) in enumerate(balls):
+        columns["name"][i] = int(ball.name)
+        columns["radius"][i] = ball.radius
+        columns["color"][i] = tuple(ball.color)[:3]
+    columns["rng"][:] = rng_internal
+    header.flush()
+    for column in columns.values():
+        column.flush()
+
+
+class Snapshot:
+    """A memory-mapped snapshot. The columns are read-only arrays."""
+
+    def __init__(self, path):
+        """Map the snapshot file at path."""
+        header = np.memmap(path, HEADER_DTYPE, "r", 0, (1,))[0]
+        if header["magic"] != MAGIC or header["version"] != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} snapshot")
+        self._header = header
+        (layout, _) = _layout(
+            int(header["num_balls"]), int(header["rng_length"])
+        )
+        self._columns = map_columns(path, "r", layout)
+
+    def __len__(self):
+        """Return the number of balls in the snapshot."""
+        return int(self._header["num_balls"])
+
+    def __getitem__(self, column):
+        """Return a column such as "position" or "alive"."""
+        return self._columns[column]
+
+    @property
+    def step(self):
+        """Return the simulation step the snapshot was taken at."""
+        return int(self._header["step"])
+
+    @property
+    def size(self):
+        """Return the size of the window the snapshot was taken in."""
+        return (int(self._header["width"]), int(self._header["height"]))
+
+    def restore_random_state(self):
+        """Put the random module back in the state it was saved in."""
+        gauss_next = None
+        if self._header["has_gauss"]:
+            gauss_next = float(self._header["gauss_next"])
+        random.setstate(
+            (
+                int(self._header["rng_version"]),
+                tuple(self._columns["rng"].tolist()),
+                gauss_next,
+            )
+        )
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""Drawing small balls all at once by writing into the screen's pixels.
+
+Each whole pixel radius has a mask, the offsets of the pixels inside a
+circle of that radius. The balls are grouped by radius and the mask of
+each group is added to all of its centers at once, so the screen's pixel
+array is written with one NumPy scatter per group instead of one
+pygame.draw.circle call per ball. Within a group later balls are drawn
+over earlier ones, but smaller balls are drawn over bigger ones.
+
+A mask writes every pixel of the circle on its own, while
+pygame.draw.circle fills whole rows, so balls bigger than
+MAX_STAMP_RADIUS are still drawn with pygame.draw.circle."""
+
+import numpy as np
+import pygame
+from game.lod import (
+    LABEL_RADIUS,
+    centers,
+    color_getter,
+    pixel_values,
+    radii,
+)
+
+# The biggest radius, in pixels, stamped rather than drawn.
+MAX_STAMP_RADIUS = 4
+
+# The most pixel writes stamped in one batch, to bound the index arrays.
+BATCH_PIXELS = 1 << 20
+
+
+class StampRenderer:
+    """Draws balls by stamping circle masks into a surface's pixels."""
+
+    def __init__(
+        self, max_stamp_radius=MAX_STAMP_RADIUS, label_radius=LABEL_RADIUS
+    ):
+        """Stamp balls up to max_stamp_radius pixels, and return balls of
+        at least label_radius to label from draw."""
+        self._max_stamp_radius = max_stamp_radius
+        self._label_radius = label_radius
+        # From a radius to the column and row offsets of its pixels.
+        self._masks = {}
+
+    def _mask(self, radius):
+        """Return the offsets of the pixels inside a circle of radius."""
+        mask = self._masks.get(radius)
+        if mask is None:
+            span = np.arange(-radius, radius + 1)
+            (columns, rows) = np.meshgrid(span, span, indexing="ij")
+            inside = columns**2 + rows**2 <= radius * radius
+            mask = self._masks[radius] = (columns[inside], rows[inside])
+        return mask
+
+    def draw(self, surface, balls, scale=1.0, offset=(0, 0)):
+        """Draw balls, with their positions and sizes times scale and then
+        moved back by offset, and return the ones big enough to label."""
+        sizes = radii(balls) * scale
+        small = sizes <= self._max_stamp_radius
+        if surface.get_bytesize() == 3:
+            # pixels2d needs whole 8, 16 or 32 bit pixels.
+            small[:] = False
+        color = color_getter(surface)
+        offset = pygame.Vector2(offset)
+        labeled = []
+        for i in np.flatnonzero(~small).tolist():
+            ball = balls[i]
+            radius = ball.radius
+            pygame.draw.circle(
+                surface,
+                color(ball),
+                ball.center * scale - offset,
+                radius * scale,
+            )
+            if radius >= self._label_radius:
+                labeled.append(ball)
+        if small.any():
+            stamped = [balls[i] for i in np.flatnonzero(small).tolist()]
+            self.stamp(
+                surface,
+                centers(stamped) * scale - offset,
+                sizes[small],
+                pixel_values(surface, stamped),
+            )
+        return labeled
+
+    def stamp(self, surface, where, sizes, colors):
+        """Stamp circles centered at the rows of where, an (N, 2) array,
+        of radii sizes in the pixel values colors, into surface."""
+        (width, height) = surface.get_size()
+        where = np.rint(where).astype(np.intp)
+        sizes = np.rint(sizes).astype(np.intp)
+        pixels = pygame.surfarray.pixels2d(surface)
+        for radius in np.unique(sizes)[::-1].tolist():
+            group = np.flatnonzero(sizes == radius)
+            (dx, dy) = self._mask(radius)
+            step = max(1, BATCH_PIXELS // len(dx))
+            for first in range(0, len(group), step):
+                batch = group[first:first + step]
+                x = (where[batch, 0, np.newaxis] + dx).ravel()
+                y = (where[batch, 1, np.newaxis] + dy).ravel()
+                inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+                color = np.repeat(colors[batch], len(dx))
+                pixels[x[inside], y[inside]] = color[inside]
+        del pixels
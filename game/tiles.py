@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""Drawing the balls in tiles, on a pool of threads.
+
+The screen is split into a grid of tiles, each a subsurface of it, so
+the tiles share the screen's pixels and need no compositing. Every frame
+the balls and sprites are sorted into the tiles their bounding boxes
+overlap and the tiles are drawn at the same time on a thread pool; a
+ball across a tile edge is drawn, clipped, in each tile it touches.
+pygame lets go of the GIL while it blits surfaces, so blitting sprites
+into different tiles runs on different cores, but drawing each circle
+still holds it."""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import numpy as np
+import pygame
+from game.lod import LABEL_RADIUS, centers, color_getter, radii
+
+
+class TileRenderer:
+    """Draws balls and sprites in tiles, several tiles at a time."""
+
+    def __init__(
+        self, size, grid=(4, 4), workers=None, label_radius=LABEL_RADIUS
+    ):
+        """Split a screen of size into grid, (columns, rows), tiles drawn
+        by workers threads, one per core unless given. Return balls of at
+        least label_radius to label from draw."""
+        self._grid = grid
+        self._split(size)
+        # The surface drawn to last and the tiles of it.
+        self._surface = None
+        self._tiles = []
+        self._workers = workers or os.cpu_count() or 1
+        self._pool = ThreadPoolExecutor(self._workers)
+        self._label_radius = label_radius
+
+    @property
+    def workers(self):
+        """Return the number of threads drawing tiles."""
+        return self._workers
+
+    def close(self):
+        """Stop the threads."""
+        self._pool.shutdown()
+
+    def _split(self, size):
+        """Split a screen of size into the tiles."""
+        self._size = size
+        (width, height) = size
+        (columns, rows) = self._grid
+        self._columns = columns
+        # The left edges of the tile columns and the tops of the rows.
+        self._lefts = np.array(
+            [width * column // columns for column in range(columns)]
+        )
+        self._tops = np.array([height * row // rows for row in range(rows)])
+        self._rects = [
+            pygame.Rect(
+                width * column // columns,
+                height * row // rows,
+                width * (column + 1) // columns - width * column // columns,
+                height * (row + 1) // rows - height * row // rows,
+            )
+            for row in range(rows)
+            for column in range(columns)
+        ]
+        self._offsets = [pygame.Vector2(rect.topleft) for rect in self._rects]
+
+    def draw(self, surface, balls, sprites=(), scale=1.0, offset=(0, 0)):
+        """Draw balls, with their positions and sizes times scale and then
+        moved back by offset, then sprites with an image and a rect, over
+        surface and return the balls big enough to label."""
+        if surface is not self._surface:
+            if surface.get_size() != self._size:
+                self._split(surface.get_size())
+            self._surface = surface
+            self._tiles = [surface.subsurface(rect) for rect in self._rects]
+        sizes = radii(balls)
+        where = centers(balls)
+        if scale != 1 or any(offset):
+            sizes = sizes * scale
+            where = where * scale - offset
+        ball_bins = self._bin(
+            balls,
+            where[:, 0] - sizes,
+            where[:, 0] + sizes,
+            where[:, 1] - sizes,
+            where[:, 1] + sizes,
+        )
+        sprites = list(sprites)
+        boxes = np.array(
+            [
+                (s.rect.left, s.rect.right - 1, s.rect.top, s.rect.bottom - 1)
+                for s in sprites
+            ],
+            float,
+        ).reshape(-1, 4)
+        sprite_bins = self._bin(sprites, *boxes.T)
+        jobs = [
+            self._pool.submit(
+                self._draw_tile,
+                index,
+                tile_balls,
+                tile_sprites,
+                scale,
+                pygame.Vector2(offset),
+            )
+            for (index, (tile_balls, tile_sprites)) in enumerate(
+                zip(ball_bins, sprite_bins)
+            )
+        ]
+        for job in jobs:
+            job.result()
+        return [
+            balls[i]
+            for i in np.flatnonzero(
+                sizes >= self._label_radius * scale
+            ).tolist()
+        ]
+
+    def _bin(self, things, xmin, xmax, ymin, ymax):
+        """Return a list of the things in each tile, given the bounding
+        box of each thing."""
+        last = (len(self._lefts) - 1, len(self._tops) - 1)
+        first_columns = np.searchsorted(self._lefts, xmin, "right") - 1
+        last_columns = np.searchsorted(self._lefts, xmax, "right") - 1
+        first_rows = np.searchsorted(self._tops, ymin, "right") - 1
+        last_rows = np.searchsorted(self._tops, ymax, "right") - 1
+        np.clip(first_columns, 0, last[0], out=first_columns)
+        np.clip(last_columns, 0, last[0], out=last_columns)
+        np.clip(first_rows, 0, last[1], out=first_rows)
+        np.clip(last_rows, 0, last[1], out=last_rows)
+        tiles = first_rows * self._columns + first_columns
+        # Most things are inside one tile: sort those into their tiles in
+        # one go, keeping their order, and add the rest one by one.
+        single = (first_columns == last_columns) & (first_rows == last_rows)
+        inside = np.flatnonzero(single)
+        order = inside[np.argsort(tiles[inside], kind="stable")]
+        counts = np.bincount(tiles[inside], minlength=len(self._rects))
+        bins = []
+        start = 0
+        order = order.tolist()
+        for count in counts.tolist():
+            bins.append([things[i] for i in order[start:start + count]])
+            start += count
+        spanning = np.flatnonzero(~single)
+        for (i, left, right, top, bottom) in zip(
+            spanning.tolist(),
+            first_columns[spanning].tolist(),
+            last_columns[spanning].tolist(),
+            first_rows[spanning].tolist(),
+            last_rows[spanning].tolist(),
+        ):
+            for row in range(top, bottom + 1):
+                for column in range(left, right + 1):
+                    bins[row * self._columns + column].append(things[i])
+        return bins
+
+    def _draw_tile(self, index, balls, sprites, scale, view_offset):
+        """Draw balls, times scale and moved back by view_offset, and
+        sprites into tile index."""
+        tile = self._tiles[index]
+        offset = self._offsets[index]
+        (left, top) = self._rects[index].topleft
+        if scale == 1 and not any(view_offset) and tile.get_bytesize() != 1:
+            for ball in balls:
+                pygame.draw.circle(
+                    tile,
+                    ball.color,
+                    ball.center - offset,
+                    ball.radius,
+                )
+        else:
+            color = color_getter(tile)
+            offset = offset + view_offset
+            for ball in balls:
+                pygame.draw.circle(
+                    tile,
+                    color(ball),
+                    ball.center * scale - offset,
+                    ball.radius * scale,
+                )
+        if sprites:
+            tile.blits(
+                [
+                    (sprite.image, sprite.rect.move(-left, -top))
+                    for sprite in sprites
+                ],
+                False,
+            )
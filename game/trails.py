@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""Motion trails from a layer that keeps fading copies of past frames.
+
+Each frame the trail layer is blended over the background, taking the
+brighter of the two in each channel, and the balls are drawn on top as
+usual. The finished frame is then copied into the layer, which is
+darkened with one multiplying fill. Where a ball was k frames ago the
+layer holds its color times the fade to the k, so every ball leaves a
+trail without any ball's past positions being kept or drawn again: the
+trails cost the same four whole surface operations a frame however
+many balls there are and however long the trails are.
+
+Multiplying rounds up, so it never takes a dim channel down to zero;
+subtracting a little after it lets the trails fade out. Both are blits
+of solid surfaces rather than fills, since pygame blends blits with
+SIMD but blends fills a pixel at a time, many times slower.
+
+The blending only makes sense for pixels that hold colors, so the
+trails need a 16 or 32 bit surface, not an 8 bit palette."""
+
+import pygame
+
+# How much of its brightness the trail keeps each frame.
+FADE = 0.9
+
+# Taken off of every channel each frame after fading, which is more
+# than multiplying rounds up by.
+_FLOOR = (2, 2, 2)
+
+
+class Trails:
+    """A fading layer of the frames drawn so far."""
+
+    def __init__(self, fade=FADE):
+        """Keep fade, between 0 and 1, of the trails' brightness every
+        frame."""
+        level = round(255 * min(max(fade, 0.0), 1.0))
+        self._fade = (level, level, level)
+        self._layer = None
+        # Solid surfaces of the fade and the floor the size of the layer.
+        self._fader = None
+        self._floor = None
+
+    def clear(self):
+        """Forget the trails, as when the view moves."""
+        if self._layer is not None:
+            self._layer.fill((0, 0, 0))
+
+    def under(self, surface):
+        """Blend the trails over surface, under what is drawn next."""
+        if self._layer is None or self._layer.get_size() != surface.get_size():
+            self._layer = pygame.Surface(surface.get_size(), 0, surface)
+            self._layer.fill((0, 0, 0))
+            self._fader = pygame.Surface(surface.get_size(), 0, surface)
+            self._fader.fill(self._fade)
+            self._floor = pygame.Surface(surface.get_size(), 0, surface)
+            self._floor.fill(_FLOOR)
+        surface.blit(self._layer, (0, 0), special_flags=pygame.BLEND_MAX)
+
+    def capture(self, surface):
+        """Replace the trails with the frame drawn on surface, faded."""
+        self._layer.blit(surface, (0, 0))
+        self._layer.blit(self._fader, (0, 0), special_flags=pygame.BLEND_MULT)
+        self._layer.blit(self._floor, (0, 0), special_flags=pygame.BLEND_SUB)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""Move every ball and keep it inside the arena with a few array operations.
+
+The positions, velocities and radii of the balls are kept in arrays from
+one frame to the next. Each frame the positions are moved by the
+velocities, clamped to the arena and the velocities flipped where a ball
+is heading out of it, all at once, and the new centers are written back
+to the balls. Only the balls that something else pushed since the last
+frame are read back into the arrays; everything is gathered again when
+the set of balls changes."""
+
+import numpy as np
+from game.recording import elements, gather
+
+
+class BoundaryStage:
+    """Move balls and clamp and reflect them against the walls of a
+    rectangle."""
+
+    def __init__(self, bounds):
+        """Use the walls of bounds, (xmin, xmax, ymin, ymax)."""
+        (xmin, xmax, ymin, ymax) = bounds
+        self._low = np.array([xmin, ymin], np.float64)
+        self._high = np.array([xmax, ymax], np.float64)
+        self._balls = None
+        self._index = {}
+        self._hits = np.zeros(0, np.bool_)
+
+    def _allocate(self, num_balls):
+        """Make the arrays for num_balls, reused every frame."""
+        # The walls and the radii repeated for every ball, since NumPy
+        # allocates a buffer the size of the result when it broadcasts.
+        self._low_walls = np.tile(self._low, (num_balls, 1))
+        self._high_walls = np.tile(self._high, (num_balls, 1))
+        self._positions = np.zeros((num_balls, 2))
+        self._velocities = np.zeros((num_balls, 2))
+        self._alive = np.zeros(num_balls, np.bool_)
+        self._radii = np.zeros((num_balls, 2))
+        self._lowest = np.zeros((num_balls, 2))
+        self._highest = np.zeros((num_balls, 2))
+        self._below = np.zeros((num_balls, 2), np.bool_)
+        self._above = np.zeros((num_balls, 2), np.bool_)
+        self._heading = np.zeros((num_balls, 2), np.bool_)
+        self._flip = np.zeros((num_balls, 2), np.bool_)
+        self._touched = np.zeros(num_balls, np.bool_)
+        self._hits = np.zeros(num_balls, np.bool_)
+        self._pushed = np.zeros(num_balls, np.bool_)
+
+    def invalidate(self):
+        """Gather every ball again on the next frame, such as after the
+        set of balls changed or the balls were restored."""
+        self._balls = None
+
+    def pushed(self, *balls):
+        """Note that balls were moved or had their velocity changed since
+        they were written back, so they are read again next frame."""
+        index = self._index
+        for ball in balls:
+            i = index.get(ball)
+            if i is not None:
+                self._pushed[i] = True
+
+    def _gather(self, balls):
+        """Read every ball into the arrays and cache the radii."""
+        if len(balls) != len(self._hits):
+            self._allocate(len(balls))
+        gather(balls, self._positions, self._velocities, self._alive)
+        radii = elements(self._radii)
+        x = 0
+        for ball in balls:
+            radii[x] = radii[x + 1] = ball.radius
+            x += 2
+        np.add(self._low_walls, self._radii, out=self._lowest)
+        np.subtract(self._high_walls, self._radii, out=self._highest)
+        self._index = {ball: i for (i, ball) in enumerate(balls)}
+        self._pushed[:] = False
+        self._balls = balls
+
+    def _read_pushed(self, balls):
+        """Read the balls that were pushed since the last frame."""
+        positions = elements(self._positions)
+        velocities = elements(self._velocities)
+        for i in np.flatnonzero(self._pushed).tolist():
+            ball = balls[i]
+            (positions[2 * i], positions[2 * i + 1]) = ball.center
+            (velocities[2 * i], velocities[2 * i + 1]) = ball.velocity
+        self._pushed[:] = False
+
+    def apply(self, balls):
+        """Move every ball by its velocity, move every ball that is past a
+        wall back inside and reverse the part of its velocity heading into
+        the wall. Return a mask of the balls that bounced off of a wall,
+        to play sounds for; it is overwritten by the next call."""
+        if not balls:
+            return self._hits[:0]
+        if balls is not self._balls or len(balls) != len(self._hits):
+            self._gather(balls)
+        elif self._pushed.any():
+            self._read_pushed(balls)
+        positions = self._positions
+        velocities = self._velocities
+        np.add(positions, velocities, out=positions)
+        # The range each center is in is self._lowest to self._highest.
+        np.less_equal(positions, self._lowest, out=self._below)
+        np.greater_equal(positions, self._highest, out=self._above)
+        # Bounce off of the low walls when heading down, and the high
+        # walls when heading up.
+        np.less(velocities, 0, out=self._heading)
+        np.logical_and(self._below, self._heading, out=self._flip)
+        np.greater(velocities, 0, out=self._heading)
+        np.logical_and(self._above, self._heading, out=self._heading)
+        np.logical_or(self._flip, self._heading, out=self._flip)
+        np.logical_or(self._flip[:, 0], self._flip[:, 1], out=self._hits)
+        np.logical_or(self._below, self._above, out=self._below)
+        np.logical_or(self._below[:, 0], self._below[:, 1], out=self._touched)
+        if self._touched.any():
+            np.maximum(positions, self._lowest, out=positions)
+            np.minimum(positions, self._highest, out=positions)
+            np.negative(velocities, out=velocities, where=self._flip)
+            for i in np.flatnonzero(self._hits).tolist():
+                balls[i].set_velocity(*velocities[i].tolist())
+        position_elements = elements(positions)
+        x = 0
+        for ball in balls:
+            ball.move_to(position_elements[x], position_elements[x + 1])
+            x += 2
+        return self._hits
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""Run the tests against the game package in this checkout, without a
+window or a sound card."""
+
+import os
+import sys
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+# pylint: disable-next=wrong-import-position
+import pygame
+
+
+@pytest.fixture
+def screen():
+    """Return a headless window with the mixer up, for making balls."""
+    pygame.display.init()
+    pygame.mixer.init()
+    yield pygame.display.set_mode((800, 600))
+    pygame.quit()
+
+
+@pytest.fixture
+def make_scene(screen):
+    """Return a function making a started BouncingBallsScene of a number
+    of balls, with the rewind history, explosions and sounds off."""
+    # pylint: disable-next=import-outside-toplevel
+    from game.options import SceneOptions
+    # pylint: disable-next=import-outside-toplevel
+    from game.scene import BouncingBallsScene
+
+    def make(num_balls, **options):
+        options.setdefault("rewind_memory", 0)
+        scene = BouncingBallsScene(
+            num_balls, screen, (0, 0, 0), 60, options=SceneOptions(**options)
+        )
+        scene.start_scene()
+        for key in (pygame.K_e, pygame.K_s):
+            scene.process_event(pygame.event.Event(pygame.KEYDOWN, key=key))
+        return scene
+
+    return make
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""The allocations a frame makes must not grow with the number of balls."""
+
+import sys
+import tracemalloc
+
+# How many more bytes the most balls may allocate at once in a frame than
+# the fewest, for allocations that happen to land at different moments.
+SLACK = 1024
+
+# How many more blocks the most balls may allocate in a frame than the
+# fewest, for the odd ball that dies and is recolored.
+BLOCK_SLACK = 16
+
+
+def worst_peak(scene, frames=100):
+    """Return the most bytes update_scene held at once in any of frames
+    frames, above what was allocated before the frame."""
+    for _ in range(10):
+        scene.update_scene()
+    worst = 0
+    tracemalloc.start()
+    try:
+        for _ in range(frames):
+            (before, _) = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            scene.update_scene()
+            worst = max(worst, tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return worst
+
+
+def allocations(function):
+    """Return how many blocks function() allocates. A temporary is freed
+    as soon as it is used, so the blocks are counted after every bytecode
+    instead of once at the end: an object still on the stack between two
+    bytecodes of the same frame was allocated by the first one."""
+    state = {"frame": None, "blocks": 0, "count": 0}
+
+    def trace(frame, event, _):
+        blocks = sys.getallocatedblocks()
+        if event == "opcode" and frame is state["frame"]:
+            state["count"] += max(0, blocks - state["blocks"])
+        # Calls in between allocate the traced frames themselves.
+        state["frame"] = frame if event == "opcode" else None
+        frame.f_trace_opcodes = True
+        frame.f_trace_lines = False
+        del blocks
+        state["blocks"] = sys.getallocatedblocks()
+        return trace
+
+    sys.settrace(trace)
+    try:
+        function()
+    finally:
+        sys.settrace(None)
+    return state["count"]
+
+
+def fewest_allocations(scene, frames=5):
+    """Return the fewest blocks update_scene allocated in any of frames
+    frames."""
+    for _ in range(10):
+        scene.update_scene()
+    return min(allocations(scene.update_scene) for _ in range(frames))
+
+
+def test_peak_per_frame_is_flat_in_the_ball_count(make_scene):
+    """Eight times the balls may not allocate more at once per frame, so
+    no array the size of the balls is made every frame."""
+    peaks = [worst_peak(make_scene(num_balls)) for num_balls in (10, 80)]
+    assert peaks[1] <= peaks[0] + SLACK, peaks
+
+
+def test_allocations_per_frame_are_flat_in_the_ball_count(make_scene):
+    """Four times the balls may not allocate more blocks per frame, so
+    no temporary is made per ball or per pair."""
+    counts = [
+        fewest_allocations(make_scene(num_balls)) for num_balls in (10, 40)
+    ]
+    assert counts[1] <= counts[0] + BLOCK_SLACK, counts
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""A handle finds its ball until the ball is removed, and never after."""
+
+import pytest
+from game.ballstore import BallStore
+
+
+def test_a_despawned_handle_is_stale():
+    """get returns None and despawn raises once the ball is removed."""
+    store = BallStore()
+    handle = store.spawn("a")
+    assert store.get(handle) == "a"
+    assert store.despawn(handle) == "a"
+    assert store.get(handle) is None
+    assert handle not in store
+    with pytest.raises(KeyError):
+        store.despawn(handle)
+
+
+def test_a_reused_slot_has_a_new_generation():
+    """The ball spawned into a freed slot is not found by the old handle."""
+    store = BallStore()
+    old = store.spawn("a")
+    store.despawn(old)
+    new = store.spawn("b")
+    assert new.slot == old.slot
+    assert new.generation != old.generation
+    assert store.get(old) is None
+    assert store.get(new) == "b"
+
+
+def test_despawn_moves_the_last_ball_into_the_hole():
+    """The last ball fills the removed ball's place and its handle still
+    finds it there."""
+    balls = []
+    store = BallStore(balls)
+    handles = [store.spawn(name) for name in "abcd"]
+    store.despawn(handles[1])
+    assert balls == ["a", "d", "c"]
+    assert store.handle_at(1) == handles[3]
+    for (handle, name) in zip((handles[0], handles[2], handles[3]), "acd"):
+        assert store.get(handle) == name
+    # Removing the ball that was moved removes the right one.
+    store.despawn(handles[3])
+    assert balls == ["a", "c"]
+    assert store.get(handles[2]) == "c"
+
+
+def test_reset_makes_every_handle_stale():
+    """Handles given out before a reset find nothing afterwards."""
+    store = BallStore()
+    handle = store.spawn("a")
+    store.reset(["a"])
+    assert store.get(handle) is None
+    assert store.get(store.handle_at(0)) == "a"
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""A sweep never lets a ball pass through a wall or another ball."""
+
+import pytest
+from game.ball import Ball
+from game.eventdriven import sweep
+
+BOUNDS = (0, 800, 0, 600)
+
+
+def turn_back(ball, other_ball):
+    """Send both balls back the way they came."""
+    for each_ball in (ball, other_ball):
+        each_ball.set_velocity(-each_ball.velocity.x, -each_ball.velocity.y)
+
+
+def test_fast_balls_bounce_instead_of_passing(screen):
+    """Balls that would cross each other within the step meet first."""
+    balls = [Ball(0, 300, 300, False, 10), Ball(1, 500, 300, False, 10)]
+    balls[0].set_velocity(60, 0)
+    balls[1].set_velocity(-60, 0)
+    sweep(balls, BOUNDS, 3, turn_back)
+    # They meet halfway through the step and go back as far.
+    assert balls[0].center.x == pytest.approx(300)
+    assert balls[1].center.x == pytest.approx(500)
+
+
+def test_running_out_of_events_moves_no_ball_on(screen):
+    """A ball wedged between a wall and a stopped ball uses up the
+    budget; the other balls stop rather than pass through a wall."""
+    balls = [
+        Ball(0, 10, 300, False, 10),
+        Ball(1, 30, 300, False, 10),
+        Ball(2, 700, 300, False, 10),
+    ]
+    balls[0].set_velocity(-5, 0)
+    balls[1].set_velocity(0, 0)
+    balls[2].set_velocity(40, 0)
+    sweep(balls, BOUNDS, 20, turn_back)
+    assert balls[2].center.x + balls[2].radius <= 800
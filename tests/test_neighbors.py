@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""Neighbor lists hold every pair within reach, however the balls move."""
+
+import random
+from game.ball import Ball
+from game.neighbors import NeighborList
+
+
+def within(balls, skin):
+    """Return the set of index pairs within reach plus skin, measuring
+    every pair."""
+    return {
+        (i, j)
+        for (i, ball) in enumerate(balls)
+        for (j, other_ball) in enumerate(balls)
+        if i != j
+        and ball.center.distance_to(other_ball.center)
+        < ball.radius + other_ball.radius + skin
+    }
+
+
+def listed(neighbors):
+    """Return the set of index pairs in the lists."""
+    return {(i, j) for (i, others) in enumerate(neighbors) for j in others}
+
+
+def test_the_cells_find_every_pair_in_reach(screen):
+    """Binning the balls lists the same pairs as measuring them all."""
+    random.seed(3)
+    balls = [
+        Ball(
+            name,
+            random.uniform(-20, 820),
+            random.uniform(-20, 620),
+            False,
+            random.uniform(2, 30),
+        )
+        for name in range(300)
+    ]
+    neighbors = NeighborList(skin=6).start_frame(balls)
+    assert listed(neighbors) == within(balls, 6)
+    assert all(others == sorted(others) for others in neighbors)
+
+
+def test_a_ball_pushed_past_the_skin_rebuilds_the_list(screen):
+    """Moves made during the frame are counted toward the skin."""
+    balls = [Ball(0, 100, 300, False, 10), Ball(1, 140, 300, False, 10)]
+    neighbor_list = NeighborList(skin=16)
+    assert neighbor_list.start_frame(balls) == [[], []]
+    balls[0].circle.move_to(105, 300)
+    assert not neighbor_list.pushed(0)
+    balls[1].circle.move_to(128, 300)
+    assert neighbor_list.pushed(1)
+    assert neighbor_list.neighbors == [[1], [0]]
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""A ball only looks up its palette index when it is drawn with one."""
+
+from game.ball import DEAD_COLOR, Ball
+from game.palette import PALETTE
+
+
+def test_the_palette_index_is_looked_up_when_asked_for(screen):
+    """No index is found until one is asked for, and a dead ball's index
+    is the exact entry of the dead color."""
+    balls = [Ball(0, 100, 300, False), Ball(1, 120, 300, False)]
+    assert balls[0]._palette_index is None
+    assert balls[0].palette_index == PALETTE.index(balls[0].color)
+    balls[0]._bounce_count = balls[1]._bounce_count = 1
+    balls[0].bounce(balls[1])
+    assert not balls[0].is_alive
+    assert balls[0]._palette_index is None
+    assert PALETTE.color(balls[0].palette_index) == DEAD_COLOR
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""Rewinding restores the frames still in the history, and only those."""
+
+from game.ball import Ball
+from game.rewind import RewindBuffer
+
+
+def history(balls, frames):
+    """Return a history of two keyframes 30 frames apart, so room for 60
+    frames, after capturing frames frames with the first ball at x = 100
+    plus the frame number."""
+    # Below the size of two blocks, which is the least it keeps.
+    rewind = RewindBuffer(balls, memory_limit=1, keyframe_interval=30)
+    for frame in range(frames):
+        balls[0].circle.move_to(100 + frame, 300)
+        rewind.capture(balls)
+    return rewind
+
+
+def test_restore_after_the_ring_wraps(screen):
+    """Each frame still held comes back as it was."""
+    balls = [Ball(0, 100, 300, False), Ball(1, 500, 300, False)]
+    rewind = history(balls, 66)
+    assert (rewind.oldest, rewind.newest) == (30, 65)
+    for frame in range(rewind.oldest, rewind.newest + 1):
+        assert rewind.restore(frame, balls) == frame
+        assert balls[0].center.x == 100 + frame
+
+
+def test_truncate_after_the_ring_wraps_keeps_the_oldest(screen):
+    """Dropping the newest frames does not bring back overwritten ones."""
+    balls = [Ball(0, 100, 300, False), Ball(1, 500, 300, False)]
+    rewind = history(balls, 66)
+    rewind.truncate(40)
+    assert (rewind.oldest, rewind.newest) == (30, 40)
+    for frame in (0, 5, 29):
+        assert rewind.restore(frame, balls) == 30
+        assert balls[0].center.x == 130
+    # Capturing again after the truncation goes on from frame 41.
+    balls[0].circle.move_to(1000, 300)
+    rewind.capture(balls)
+    assert rewind.restore(41, balls) == 41
+    assert balls[0].center.x == 1000
+    assert rewind.restore(35, balls) == 35
+    assert balls[0].center.x == 135
+
+
+def test_rewind_past_a_spawn_and_a_despawn(screen):
+    """Each frame brings back the balls it had, keeping the history from
+    before the set of balls changed."""
+    balls = [Ball(0, 100, 300, False), Ball(1, 500, 300, False)]
+    rewind = RewindBuffer(balls, keyframe_interval=30)
+    for frame in range(10):
+        balls[0].circle.move_to(100 + frame, 300)
+        rewind.capture(balls)
+    balls.append(Ball(2, 700, 300, False))
+    rewind.capture(balls)
+    del balls[1]
+    rewind.capture(balls)
+    assert (rewind.oldest, rewind.newest) == (0, 11)
+    (first, second, third) = rewind.balls_at(10)
+    assert rewind.restore(5, balls) == 5
+    assert balls == [first, second]
+    assert balls[0].center.x == 105
+    assert rewind.restore(10, balls) == 10
+    assert balls == [first, second, third]
+    assert rewind.restore(11, balls) == 11
+    assert balls == [first, third]
+    assert third.center.x == 700
+
+
+def test_spawning_keeps_the_scene_history(make_scene):
+    """Spawning a ball every frame no longer starts the history over."""
+    scene = make_scene(5, rewind_memory=2**20)
+    for _ in range(5):
+        scene.spawn_ball(400, 300)
+        scene.update_scene()
+    assert (scene._rewind.oldest, scene._rewind.newest) == (0, 5)
+    assert len(scene._rewind.balls_at(0)) == 5
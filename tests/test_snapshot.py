@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""Snapshots survive failed saves and only load into a matching world."""
+
+import os
+import pytest
+from game import snapshot
+
+
+def test_a_failed_save_keeps_the_last_snapshot(make_scene, tmp_path):
+    """A save cut short leaves the old file and no temporary one."""
+    path = tmp_path / "world.snap"
+    scene = make_scene(5)
+    scene.save_snapshot(path)
+    saved = path.read_bytes()
+
+    def fail(*_):
+        raise OSError("disk full")
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(snapshot, "_write_snapshot", fail)
+        scene.update_scene()
+        with pytest.raises(OSError):
+            scene.save_snapshot(path)
+    assert path.read_bytes() == saved
+    assert os.listdir(tmp_path) == ["world.snap"]
+
+
+def test_loading_resumes_names_after_the_snapshot(make_scene, tmp_path):
+    """A ball spawned after loading gets a name no loaded ball has."""
+    path = tmp_path / "world.snap"
+    make_scene(5).save_snapshot(path)
+    scene = make_scene(3)
+    scene.load_snapshot(path)
+    names = {ball.name for ball in scene._balls}
+    handle = scene.spawn_ball(400, 300)
+    assert scene.ball(handle).name not in names
+
+
+def test_a_snapshot_of_another_size_is_refused(make_scene, tmp_path):
+    """Loading a snapshot of a bigger world raises and keeps the balls."""
+    path = tmp_path / "world.snap"
+    make_scene(5, world_size=(1600, 1200)).save_snapshot(path)
+    scene = make_scene(3)
+    balls = scene._balls
+    with pytest.raises(ValueError):
+        scene.load_snapshot(path)
+    assert scene._balls is balls
+
+
+@pytest.mark.parametrize("saved, recording", [(20, 5), (5, 20)])
+def test_loading_another_number_of_balls_stops_the_recording(
+    make_scene, tmp_path, saved, recording
+):
+    """The recording has a column per ball, so it stops at a load that
+    changes the balls, and the loaded balls keep the sounds off."""
+    path = tmp_path / "world.snap"
+    make_scene(saved).save_snapshot(path)
+    scene = make_scene(recording, record_path=tmp_path / "world.traj")
+    scene.update_scene()
+    scene.load_snapshot(path)
+    scene.update_scene()
+    assert scene._recorder is None
+    assert len(scene._balls) == saved
+    assert not any(ball.sound_on for ball in scene._balls)
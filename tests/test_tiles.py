@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""Drawing on threads leaves no threads behind once the scene ends."""
+
+import threading
+
+
+def test_ending_the_scene_stops_the_tile_threads(make_scene):
+    """The tile renderer's pool is shut down by end_scene."""
+    before = set(threading.enumerate())
+    scene = make_scene(20, render_threads=2)
+    scene.draw()
+    assert set(threading.enumerate()) - before
+    scene.end_scene()
+    assert not set(threading.enumerate()) - before
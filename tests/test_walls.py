@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# Nicholas Girmes
+# CPSC 386-04
+# 2022-05-03
+# n.girmes@csu.fullerton.edu
+# @ngirmes
+#
+# Lab 00-05
+#
+# This program runs Bouncing Balls!
+#
+
+"""The boundary stage moves the balls from where they really are."""
+
+from game.ball import Ball
+from game.walls import BoundaryStage
+
+
+def make_balls():
+    """Return a ball heading into the right wall and one in the middle."""
+    balls = [Ball(0, 790, 300, False), Ball(1, 400, 300, False)]
+    balls[0].set_velocity(5, 0)
+    balls[1].set_velocity(0, 1)
+    return balls
+
+
+def test_a_ball_past_a_wall_is_clamped_and_reflected(screen):
+    """The ball heading out is put back inside and turned around."""
+    balls = make_balls()
+    hits = BoundaryStage((0, 800, 0, 600)).apply(balls)
+    assert hits.tolist() == [True, False]
+    assert balls[0].center.x == 800 - balls[0].radius
+    assert tuple(balls[0].velocity) == (-5, 0)
+    assert tuple(balls[1].center) == (400, 301)
+
+
+def test_a_pushed_ball_is_read_again(screen):
+    """A ball moved between frames moves on from its new place, once the
+    stage is told, and every ball after invalidate."""
+    balls = make_balls()
+    stage = BoundaryStage((0, 800, 0, 600))
+    stage.apply(balls)
+    balls[1].circle.move_to(200, 100)
+    balls[1].set_velocity(2, 0)
+    stage.pushed(balls[1])
+    stage.apply(balls)
+    assert tuple(balls[1].center) == (202, 100)
+    balls[0].circle.move_to(100, 100)
+    stage.invalidate()
+    stage.apply(balls)
+    assert tuple(balls[0].center) == (95, 100)